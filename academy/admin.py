@@ -4,15 +4,30 @@
 تخصيص عرض وإدارة النماذج في لوحة تحكم Django Admin
 """
 
-from django.contrib import admin
+import os
+import uuid
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
 from django.utils.html import format_html
-from django.db.models import Count
 from .models import (
     User, Department, Specialization, Course,
     Enrollment, LectureFile, Notification,
-    AISummary, AIQuestion, RolePermission
+    AISummary, AIQuestion, RolePermission, InboxEntry, Job, TextExtraction,
+    related_aggregate
 )
+from .paginators import EstimatedCountPaginator
+from .directory import directory_filter
+from .enrollments import describe_counts, schedule_cohort
+from .forms import CohortEnrollmentForm, StudentImportForm
+from .imports import ImportFileError, read_rows
+from .jobs import enqueue
 
 
 # =============================================================================
@@ -24,12 +39,29 @@ admin.site.site_title = "S-ACM Admin"
 admin.site.index_title = "لوحة التحكم الرئيسية"
 
 
+# =============================================================================
+# وضع الأداء (Performance Mode)
+# =============================================================================
+
+class PerformanceAdminMixin:
+    """
+    وضع الأداء لقوائم لوحة التحكم:
+    - عدد الصفوف من تقدير PostgreSQL للجداول الكبيرة بدلاً من COUNT(*)
+    - عدم تنفيذ COUNT إضافي لعدد النتائج الكلي عند البحث أو الفلترة
+    
+    عدد الاستعلامات في كل قائمة ثابت ولا يعتمد على حجم الصفحة، لذلك يجب
+    تحميل العلاقات المعروضة عبر list_select_related والأعداد عبر get_queryset
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
 # =============================================================================
 # 1. إدارة المستخدمين (User Admin)
 # =============================================================================
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(PerformanceAdminMixin, BaseUserAdmin):
     """إدارة المستخدمين مع الحقول المخصصة"""
     
     list_display = [
@@ -37,12 +69,21 @@ class UserAdmin(BaseUserAdmin):
         'department', 'level', 'is_active', 'date_joined'
     ]
     
+    list_select_related = ['department']
+    
     list_filter = ['role', 'is_active', 'department', 'level', 'date_joined']
     
     search_fields = ['username', 'email', 'first_name', 'last_name', 'academic_id']
     
     ordering = ['-date_joined']
     
+    def get_search_results(self, request, queryset, search_term):
+        """
+        البحث عبر دليل المستخدمين المفهرس بدلاً من icontains على كل الحقول
+        (يستخدم أيضاً في الإكمال التلقائي لحقول student/teacher/...)
+        """
+        return directory_filter(queryset, search_term), False
+    
     # تقسيم الحقول في صفحة التعديل
     fieldsets = (
         ('معلومات الحساب', {
@@ -75,6 +116,55 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
     
+    def get_urls(self):
+        return [
+            path(
+                'import/',
+                self.admin_site.admin_view(self.import_students_view),
+                name='academy_user_import',
+            ),
+        ] + super().get_urls()
+    
+    def import_students_view(self, request):
+        """
+        رفع ملف طلاب CSV/XLSX: يحفظ الملف ويتحقق من أعمدته ثم يستورد في مهمة خلفية
+        (academy.tasks.import_students_file) ويصل الملخص للمسؤول كإشعار
+        """
+        if not self.has_add_permission(request):
+            return redirect('admin:academy_user_changelist')
+        
+        form = StudentImportForm(request.POST or None, request.FILES or None)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            extension = os.path.splitext(upload.name)[1].lower()
+            os.makedirs(settings.STUDENT_IMPORT_DIR, exist_ok=True)
+            stored = os.path.join(settings.STUDENT_IMPORT_DIR, f'{uuid.uuid4().hex}{extension}')
+            with open(stored, 'wb') as destination:
+                for chunk in upload.chunks():
+                    destination.write(chunk)
+            
+            try:
+                with open(stored, 'rb') as handle:
+                    next(read_rows(handle, stored), None)
+            except ImportFileError as error:
+                os.remove(stored)
+                form.add_error('file', str(error))
+            else:
+                from .tasks import import_students_file
+                enqueue(import_students_file, stored, request.user.pk)
+                self.message_user(
+                    request, 'تمت إضافة الاستيراد إلى الطابور، وستصلك النتيجة في الإشعارات', messages.SUCCESS
+                )
+                return redirect('admin:academy_user_changelist')
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'استيراد الطلاب',
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/academy/user/import_students.html', context)
+    
     def full_name_display(self, obj):
         """عرض الاسم الكامل"""
         return obj.get_full_name() or '-'
@@ -101,22 +191,31 @@ class UserAdmin(BaseUserAdmin):
 # =============================================================================
 
 @admin.register(Department)
-class DepartmentAdmin(admin.ModelAdmin):
+class DepartmentAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     """إدارة الأقسام الأكاديمية"""
     
     list_display = ['name', 'head', 'specializations_count', 'users_count', 'created_at']
     list_filter = ['created_at']
+    list_select_related = ['head']
     search_fields = ['name', 'description']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            specializations_total=related_aggregate(Specialization.objects.all(), 'department'),
+            users_total=related_aggregate(User.objects.all(), 'department'),
+        )
+    
     def specializations_count(self, obj):
         """عدد التخصصات في القسم"""
-        return obj.specializations.count()
+        return obj.specializations_total
     specializations_count.short_description = 'عدد التخصصات'
+    specializations_count.admin_order_field = 'specializations_total'
     
     def users_count(self, obj):
         """عدد المستخدمين في القسم"""
-        return obj.users.count()
+        return obj.users_total
     users_count.short_description = 'عدد المستخدمين'
+    users_count.admin_order_field = 'users_total'
 
 
 # =============================================================================
@@ -124,17 +223,24 @@ class DepartmentAdmin(admin.ModelAdmin):
 # =============================================================================
 
 @admin.register(Specialization)
-class SpecializationAdmin(admin.ModelAdmin):
+class SpecializationAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     """إدارة التخصصات"""
     
     list_display = ['name', 'department', 'courses_count', 'created_at']
     list_filter = ['department', 'created_at']
+    list_select_related = ['department']
     search_fields = ['name', 'description']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            courses_total=related_aggregate(Course.objects.all(), 'specialization'),
+        )
+    
     def courses_count(self, obj):
         """عدد المقررات في التخصص"""
-        return obj.courses.count()
+        return obj.courses_total
     courses_count.short_description = 'عدد المقررات'
+    courses_count.admin_order_field = 'courses_total'
 
 
 # =============================================================================
@@ -147,6 +253,9 @@ class EnrollmentInline(admin.TabularInline):
     extra = 0
     readonly_fields = ['enrolled_at']
     autocomplete_fields = ['student']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('student')
 
 
 class LectureFileInline(admin.TabularInline):
@@ -158,7 +267,7 @@ class LectureFileInline(admin.TabularInline):
 
 
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     """إدارة المقررات الدراسية"""
     
     list_display = [
@@ -166,6 +275,8 @@ class CourseAdmin(admin.ModelAdmin):
         'teacher', 'enrolled_count', 'files_count', 'is_active'
     ]
     
+    list_select_related = ['specialization__department', 'teacher']
+    
     list_filter = [
         'specialization__department', 'specialization', 'level',
         'semester', 'is_active', 'academic_year'
@@ -187,18 +298,53 @@ class CourseAdmin(admin.ModelAdmin):
         ('التفاصيل', {
             'fields': ('teacher', 'credit_hours', 'is_active')
         }),
+        ('الإحصائيات', {
+            'fields': ('students_count', 'files_count', 'downloads_count'),
+            'classes': ('collapse',)
+        }),
     )
     
+    readonly_fields = ['students_count', 'files_count', 'downloads_count']
+    
+    actions = ['enroll_cohort']
+    
+    @admin.action(description='تسجيل دفعة في المقررات المحددة (أو إلغاء تسجيلها)', permissions=['change'])
+    def enroll_cohort(self, request, queryset):
+        """
+        صفحة وسيطة لاختيار الدفعة ثم التسجيل باستعلام INSERT ... SELECT واحد
+        (academy.enrollments)؛ الدفعات الكبيرة تنفذ كمهمة خلفية
+        """
+        form = CohortEnrollmentForm(request.POST if 'apply' in request.POST else None)
+        if form.is_valid():
+            counts = schedule_cohort(
+                queryset.values_list('pk', flat=True),
+                form.cohort(),
+                deactivate=form.cleaned_data['deactivate'],
+                requested_by=request.user.pk,
+            )
+            if counts is None:
+                self.message_user(
+                    request, 'الدفعة كبيرة فأضيفت إلى الطابور، وستصلك النتيجة في الإشعارات', messages.SUCCESS
+                )
+            else:
+                self.message_user(request, describe_counts(counts), messages.SUCCESS)
+            return None
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'تسجيل دفعة في المقررات',
+            'form': form,
+            'queryset': queryset,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(request, 'admin/academy/course/enroll_cohort.html', context)
+    
     def enrolled_count(self, obj):
         """عدد الطلاب المسجلين"""
-        count = obj.enrollments.count()
-        return format_html('<strong>{}</strong> طالب', count)
+        return format_html('<strong>{}</strong> طالب', obj.students_count)
     enrolled_count.short_description = 'المسجلون'
-    
-    def files_count(self, obj):
-        """عدد الملفات"""
-        return obj.lecture_files.count()
-    files_count.short_description = 'الملفات'
+    enrolled_count.admin_order_field = 'students_count'
 
 
 # =============================================================================
@@ -206,14 +352,14 @@ class CourseAdmin(admin.ModelAdmin):
 # =============================================================================
 
 @admin.register(Enrollment)
-class EnrollmentAdmin(admin.ModelAdmin):
+class EnrollmentAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     """إدارة تسجيل الطلاب في المقررات"""
     
     list_display = ['student', 'course', 'enrolled_at', 'is_active']
     list_filter = ['is_active', 'course__specialization', 'enrolled_at']
+    list_select_related = ['student', 'course']
     search_fields = ['student__username', 'student__first_name', 'course__name']
     autocomplete_fields = ['student', 'course']
-    date_hierarchy = 'enrolled_at'
 
 
 # =============================================================================
@@ -221,24 +367,24 @@ class EnrollmentAdmin(admin.ModelAdmin):
 # =============================================================================
 
 @admin.register(LectureFile)
-class LectureFileAdmin(admin.ModelAdmin):
+class LectureFileAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     """إدارة ملفات المحاضرات"""
     
     list_display = [
         'title', 'course', 'file_type_badge', 'chapter',
-        'uploaded_by', 'file_size_display', 'download_count', 'uploaded_at'
+        'uploaded_by', 'file_size_display', 'downloads_display', 'uploaded_at'
     ]
     
     list_filter = ['file_type', 'course__specialization', 'uploaded_at', 'is_active']
     
+    list_select_related = ['course', 'uploaded_by']
+    
     search_fields = ['title', 'description', 'course__name']
     
     autocomplete_fields = ['course', 'uploaded_by']
     
     readonly_fields = ['file_size', 'download_count', 'uploaded_at']
     
-    date_hierarchy = 'uploaded_at'
-    
     fieldsets = (
         ('معلومات الملف', {
             'fields': ('title', 'description', 'file', 'file_type')
@@ -284,6 +430,12 @@ class LectureFileAdmin(admin.ModelAdmin):
         else:
             return f"{size / (1024 * 1024):.1f} MB"
     file_size_display.short_description = 'الحجم'
+    
+    def downloads_display(self, obj):
+        """عدد التحميلات شاملاً التحميلات المعلقة"""
+        return obj.total_downloads
+    downloads_display.short_description = 'عدد التحميلات'
+    downloads_display.admin_order_field = 'download_count'
 
 
 # =============================================================================
@@ -291,7 +443,7 @@ class LectureFileAdmin(admin.ModelAdmin):
 # =============================================================================
 
 @admin.register(Notification)
-class NotificationAdmin(admin.ModelAdmin):
+class NotificationAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     """إدارة الإشعارات"""
     
     list_display = [
@@ -301,12 +453,12 @@ class NotificationAdmin(admin.ModelAdmin):
     
     list_filter = ['notification_type', 'priority', 'is_read', 'created_at']
     
+    list_select_related = ['sender', 'course']
+    
     search_fields = ['title', 'content']
     
     autocomplete_fields = ['sender', 'course', 'recipient']
     
-    date_hierarchy = 'created_at'
-    
     def priority_badge(self, obj):
         """عرض الأولوية بشكل ملون"""
         colors = {
@@ -324,16 +476,28 @@ class NotificationAdmin(admin.ModelAdmin):
     priority_badge.short_description = 'الأولوية'
 
 
+@admin.register(InboxEntry)
+class InboxEntryAdmin(PerformanceAdminMixin, admin.ModelAdmin):
+    """إدارة صندوق الإشعارات لكل مستلم"""
+    
+    list_display = ['notification', 'recipient', 'is_read', 'read_at', 'created_at']
+    list_filter = ['is_read']
+    list_select_related = ['notification', 'recipient']
+    raw_id_fields = ['notification', 'recipient']
+    readonly_fields = ['created_at', 'read_at']
+
+
 # =============================================================================
 # 8. إدارة ملخصات الذكاء الاصطناعي (AISummary Admin)
 # =============================================================================
 
 @admin.register(AISummary)
-class AISummaryAdmin(admin.ModelAdmin):
+class AISummaryAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     """إدارة ملخصات الذكاء الاصطناعي"""
     
-    list_display = ['lecture_file', 'generated_by', 'generated_at', 'is_cached']
-    list_filter = ['is_cached', 'generated_at']
+    list_display = ['lecture_file', 'generated_by', 'language', 'model_name', 'generated_at', 'last_used_at']
+    list_filter = ['is_cached', 'language', 'model_name', 'generated_at']
+    list_select_related = ['lecture_file__course', 'generated_by']
     search_fields = ['lecture_file__title', 'summary_text']
     readonly_fields = ['generated_at']
     date_hierarchy = 'generated_at'
@@ -344,11 +508,12 @@ class AISummaryAdmin(admin.ModelAdmin):
 # =============================================================================
 
 @admin.register(AIQuestion)
-class AIQuestionAdmin(admin.ModelAdmin):
+class AIQuestionAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     """إدارة أسئلة الذكاء الاصطناعي"""
     
     list_display = ['question_preview', 'lecture_file', 'generated_by', 'generated_at']
     list_filter = ['generated_at']
+    list_select_related = ['lecture_file__course', 'generated_by']
     search_fields = ['question_text', 'lecture_file__title']
     readonly_fields = ['generated_at']
     date_hierarchy = 'generated_at'
@@ -377,4 +542,40 @@ class RolePermissionAdmin(admin.ModelAdmin):
         'can_upload_files', 'can_delete_files',
         'can_manage_users', 'can_manage_courses',
         'can_send_notifications', 'can_use_ai'
-    ]
\ No newline at end of file
+    ]
+
+
+# =============================================================================
+# 11. إدارة المهام الخلفية (Job Admin)
+# =============================================================================
+
+@admin.register(Job)
+class JobAdmin(PerformanceAdminMixin, admin.ModelAdmin):
+    """متابعة طابور المهام الخلفية"""
+    
+    list_display = ['name', 'status', 'priority', 'attempts', 'run_at', 'locked_by', 'finished_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name']
+    readonly_fields = ['attempts', 'locked_by', 'locked_at', 'last_error', 'created_at', 'finished_at']
+    actions = ['retry_jobs']
+    
+    @admin.action(description='إعادة المهام المحددة إلى الطابور')
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status=Job.Status.RUNNING).update(
+            status=Job.Status.QUEUED, attempts=0, run_at=timezone.now(), last_error=''
+        )
+        self.message_user(request, f'تمت إعادة {updated} مهمة إلى الطابور')
+
+
+# =============================================================================
+# 12. إدارة استخراج النصوص (TextExtraction Admin)
+# =============================================================================
+
+@admin.register(TextExtraction)
+class TextExtractionAdmin(PerformanceAdminMixin, admin.ModelAdmin):
+    """متابعة حالة استخراج نصوص الملفات"""
+    
+    list_display = ['content_digest', 'status', 'chunk_count', 'extracted_at']
+    list_filter = ['status']
+    search_fields = ['content_digest']
+    readonly_fields = ['content_digest', 'chunk_count', 'error', 'created_at', 'extracted_at']
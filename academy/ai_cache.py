@@ -0,0 +1,206 @@
+"""
+التخزين المؤقت لتوليد الذكاء الاصطناعي
+=====================================
+الملخصات ومجموعات الأسئلة تخزن بمفتاح مشتق من:
+    (بصمة محتوى المحاضرة، إصدار التعليمات، النموذج، اللغة)
+
+فيعاد استخدامها لكل ملفات المحاضرات التي تشترك في نفس المحتوى، والطلبات
+المتزامنة لنفس المفتاح تنتظر توليداً واحداً فقط (Single-flight):
+- بين خيوط نفس العملية عبر قفل محلي لكل مفتاح
+- بين العمليات عبر قفل في الذاكرة المؤقتة المشتركة (cache.add)
+- وإن انتهت مهلة القفل أو لم تكن الذاكرة المؤقتة مشتركة، فقيود التفرد في
+  قاعدة البيانات (cache_key للملخص، و cache_key + position للأسئلة) تحفظ
+  نتيجة واحدة فقط ويعيد الطلب الآخر النتيجة المحفوظة
+
+المدخلات القديمة تحذف بسياسة TTL/LRU حسب last_used_at (evict_ai_cache).
+
+الاستخدام:
+    summary = get_or_generate_summary(lecture, user, generate=my_summarizer)
+    # my_summarizer(lecture, language) -> str
+"""
+
+import hashlib
+import threading
+import time
+import weakref
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .metrics import record_cache
+from .models import AISummary, AIQuestion, Job
+
+
+_locks_guard = threading.Lock()
+_local_locks = weakref.WeakValueDictionary()
+
+
+def cache_key(lecture, kind, language):
+    """مفتاح التوليد لمحتوى المحاضرة"""
+    digest = lecture.content_digest or f'lecture-{lecture.pk}'
+    raw = ':'.join([
+        kind, digest, settings.AI_PROMPT_VERSION, settings.AI_MODEL_NAME, language
+    ])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _local_lock(key):
+    with _locks_guard:
+        lock = _local_locks.get(key)
+        if lock is None:
+            lock = _local_locks[key] = threading.Lock()
+        return lock
+
+
+def single_flight(key, lookup, compute):
+    """
+    إرجاع lookup() إن وجدت النتيجة، وإلا تنفيذ compute() مرة واحدة فقط
+    لكل مفتاح مهما تعددت الطلبات المتزامنة
+    """
+    result = lookup()
+    record_cache('ai', hit=result is not None)
+    if result is not None:
+        return result
+    
+    with _local_lock(key):
+        result = lookup()
+        if result is not None:
+            return result
+        
+        lock_key = f'ai:inflight:{key}'
+        timeout = settings.AI_GENERATION_TIMEOUT
+        deadline = time.monotonic() + timeout
+        while not cache.add(lock_key, 1, timeout=timeout):
+            # عملية أخرى تولد نفس المفتاح: ننتظر نتيجتها
+            time.sleep(0.5)
+            result = lookup()
+            if result is not None:
+                return result
+            if time.monotonic() > deadline:
+                break
+        
+        try:
+            return compute()
+        finally:
+            cache.delete(lock_key)
+
+
+def _touch(queryset):
+    """تحديث last_used_at مرة كل AI_CACHE_TOUCH_INTERVAL على الأكثر"""
+    threshold = timezone.now() - timedelta(seconds=settings.AI_CACHE_TOUCH_INTERVAL)
+    queryset.filter(last_used_at__lt=threshold).update(last_used_at=timezone.now())
+
+
+def _key_fields(lecture, key, language):
+    return {
+        'cache_key': key,
+        'content_digest': lecture.content_digest,
+        'language': language,
+        'prompt_version': settings.AI_PROMPT_VERSION,
+        'model_name': settings.AI_MODEL_NAME,
+    }
+
+
+def get_or_generate_summary(lecture, user, generate, language='ar'):
+    """
+    ملخص المحاضرة من التخزين المؤقت أو توليده مرة واحدة
+    generate(lecture, language) -> نص الملخص
+    """
+    key = cache_key(lecture, 'summary', language)
+    
+    def lookup():
+        summary = AISummary.objects.filter(cache_key=key).first()
+        if summary is not None:
+            _touch(AISummary.objects.filter(pk=summary.pk))
+        return summary
+    
+    def compute():
+        text = generate(lecture, language)
+        try:
+            with transaction.atomic():
+                summary = AISummary.objects.create(
+                    lecture_file=lecture,
+                    summary_text=text,
+                    generated_by=user,
+                    **_key_fields(lecture, key, language),
+                )
+        except IntegrityError:
+            # سبقنا طلب آخر (مثلاً بعد انتهاء مهلة القفل)
+            return AISummary.objects.get(cache_key=key)
+        schedule_eviction()
+        return summary
+    
+    return single_flight(key, lookup, compute)
+
+
+def get_or_generate_questions(lecture, user, generate, language='ar'):
+    """
+    مجموعة أسئلة المحاضرة من التخزين المؤقت أو توليدها مرة واحدة
+    generate(lecture, language) -> قائمة قواميس فيها
+        question_text, options, correct_answer, explanation
+    القائمة الفارغة لا تخزن (لا يمكن تمييزها عن عدم وجود النتيجة) فترفع ValueError
+    """
+    key = cache_key(lecture, 'questions', language)
+    
+    def lookup():
+        questions = list(AIQuestion.objects.filter(cache_key=key).order_by('position'))
+        if not questions:
+            return None
+        _touch(AIQuestion.objects.filter(cache_key=key))
+        return questions
+    
+    def compute():
+        fields = _key_fields(lecture, key, language)
+        items = generate(lecture, language)
+        if not items:
+            raise ValueError('لم يولد النموذج أي سؤال')
+        try:
+            with transaction.atomic():
+                questions = AIQuestion.objects.bulk_create([
+                    AIQuestion(lecture_file=lecture, generated_by=user, position=position, **fields, **item)
+                    for position, item in enumerate(items)
+                ])
+        except IntegrityError:
+            # سبقنا طلب آخر بنفس المفتاح
+            return lookup()
+        schedule_eviction()
+        return questions
+    
+    return single_flight(key, lookup, compute)
+
+
+def evict_ai_cache():
+    """
+    حذف المدخلات التي لم تستخدم منذ AI_CACHE_TTL_DAYS يوماً، ثم الأقل استخداماً
+    حتى لا يتجاوز عدد الملخصات ومجموعات الأسئلة الحد المحدد
+    """
+    cutoff = timezone.now() - timedelta(days=settings.AI_CACHE_TTL_DAYS)
+    deleted = AISummary.objects.exclude(cache_key='').filter(last_used_at__lt=cutoff).delete()[0]
+    deleted += AIQuestion.objects.exclude(cache_key='').filter(last_used_at__lt=cutoff).delete()[0]
+    
+    limit = settings.AI_CACHE_MAX_ENTRIES
+    
+    stale_summaries = AISummary.objects.exclude(cache_key='') \
+        .order_by('-last_used_at').values_list('pk', flat=True)[limit:]
+    deleted += AISummary.objects.filter(pk__in=list(stale_summaries)).delete()[0]
+    
+    stale_sets = AIQuestion.objects.exclude(cache_key='') \
+        .values('cache_key').order_by().annotate(used=Max('last_used_at')) \
+        .order_by('-used').values_list('cache_key', flat=True)[limit:]
+    deleted += AIQuestion.objects.filter(cache_key__in=list(stale_sets)).delete()[0]
+    
+    return deleted
+
+
+def schedule_eviction():
+    """إضافة مهمة تنظيف واحدة إلى الطابور إن لم تكن موجودة"""
+    from .jobs import enqueue
+    from .tasks import evict_ai_cache as evict_task
+    
+    name = f'{evict_task.__module__}.{evict_task.__qualname__}'
+    if not Job.objects.filter(name=name, status=Job.Status.QUEUED).exists():
+        enqueue(evict_task, priority=-10)
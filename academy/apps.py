@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class AcademyConfig(AppConfig):
     name = 'academy'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .metrics import instrument_templates
+
+        instrument_templates()
@@ -0,0 +1,134 @@
+"""
+مصادقة المستخدمين من لقطة مخزنة مؤقتاً
+======================================
+AuthenticationMiddleware يحمل صف المستخدم كاملاً في كل طلب. CachedModelBackend
+يبني request.user من لقطة صغيرة في التخزين المؤقت (الدور، القسم، التخصص،
+المستوى، حالة التفعيل، الاسم وصلاحيات لوحة التحكم، وبصمة كلمة المرور)،
+فلا يصل أغلب الطلبات إلى جدول المستخدمين. بقية الحقول (البريد، الهاتف، الصورة...)
+مؤجلة وتحمل كلها باستعلام واحد عند أول وصول إليها.
+
+الإبطال: لكل مستخدم رقم إصدار في التخزين المؤقت يتغير بعد حفظ المستخدم أو
+حذفه (signals.py) أو تحديثه جماعياً (invalidate_users)، واللقطة صالحة فقط
+إن طابق إصدارها الإصدار الحالي، فلا تعود لقطة قديمة حتى مع تزامن القراءة
+والكتابة. تغيير كلمة المرور يغير البصمة فتنتهي جلسات المستخدم الأخرى فوراً،
+وإلغاء التفعيل يمنع المصادقة فوراً.
+
+اللقطات تتطلب تخزيناً مؤقتاً مشتركاً بين العمليات (AUTH_USER_CACHE_ALIAS على
+Redis أو Memcached)، وإلا فالإبطال لا يصل إلى العمليات الأخرى، لذلك يعمل
+CachedModelBackend مثل ModelBackend تماماً مع LocMemCache (academy.sharedcache).
+"""
+
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.db import router, transaction
+
+from .metrics import record_cache
+from .models import User
+from .sharedcache import shared_cache
+
+
+# حقول اللقطة (attname)
+SNAPSHOT_FIELDS = (
+    'id', 'username', 'first_name', 'last_name', 'role', 'department_id',
+    'specialization_id', 'level', 'is_active', 'is_staff', 'is_superuser',
+)
+
+# تغيير هذه الحقول فقط (مثل last_login عند الدخول) لا يبطل اللقطة
+INVALIDATING_FIELDS = {*SNAPSHOT_FIELDS, 'password', 'department', 'specialization'}
+
+KEY_PREFIX = 'academy.auth.'
+
+
+def user_cache():
+    """التخزين المؤقت للقطات، أو None إن لم يكن مشتركاً بين العمليات"""
+    return shared_cache(settings.AUTH_USER_CACHE_ALIAS)
+
+
+def snapshot_key(user_id):
+    return f'{KEY_PREFIX}user.{user_id}'
+
+
+def version_key(user_id):
+    return f'{KEY_PREFIX}version.{user_id}'
+
+
+def make_snapshot(user, version):
+    snapshot = {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+    snapshot['session_auth_hash'] = user.get_session_auth_hash()
+    snapshot['version'] = version
+    return snapshot
+
+
+def snapshot_user(snapshot):
+    """نسخة User من اللقطة (بقية الحقول مؤجلة)"""
+    # from_db يتوقع القيم بترتيب حقول النموذج
+    fields = [field.attname for field in User._meta.concrete_fields if field.attname in snapshot]
+    user = User.from_db(router.db_for_read(User), fields, [snapshot[field] for field in fields])
+    user._from_snapshot = True
+    user._session_auth_hash = snapshot['session_auth_hash']
+    return user
+
+
+def load_snapshot(user_id):
+    """لقطة المستخدم من التخزين المؤقت أو من قاعدة البيانات (None إن لم يوجد)"""
+    cache = user_cache()
+    cached = cache.get_many([version_key(user_id), snapshot_key(user_id)])
+    version = cached.get(version_key(user_id))
+    snapshot = cached.get(snapshot_key(user_id))
+    
+    hit = snapshot is not None and version is not None and snapshot['version'] == version
+    record_cache('auth-user', hit)
+    if hit:
+        return snapshot
+    
+    # الإصدار يقرأ قبل الصف: إن تغير المستخدم بعد القراءة فاللقطة تخزن بإصدار قديم ولا تستخدم
+    version = version or current_version(user_id)
+    try:
+        user = User._default_manager.get(pk=user_id)
+    except User.DoesNotExist:
+        return None
+    return cache_snapshot(user, version)
+
+
+def current_version(user_id):
+    """إصدار لقطة المستخدم الحالي (ينشأ إصدار جديد إن لم يوجد)"""
+    cache = user_cache()
+    cache.add(version_key(user_id), uuid.uuid4().hex, settings.AUTH_USER_CACHE_TIMEOUT)
+    return cache.get(version_key(user_id))
+
+
+def cache_snapshot(user, version=None):
+    """تخزين لقطة المستخدم (المحمل كاملاً) بالإصدار الحالي"""
+    cache = user_cache()
+    if cache is None:
+        return None
+    snapshot = make_snapshot(user, version or current_version(user.pk))
+    cache.set(snapshot_key(user.pk), snapshot, settings.AUTH_USER_CACHE_TIMEOUT)
+    return snapshot
+
+
+def invalidate_users(user_ids):
+    """
+    إبطال لقطات المستخدمين فوراً ثم مرة أخرى بعد اكتمال المعاملة الحالية
+    (قبل اكتمالها قد تقرأ لقطة جديدة الصف القديم وتخزنه بالإصدار الجديد)
+    """
+    cache = user_cache()
+    keys = [version_key(user_id) for user_id in user_ids]
+    if cache is not None and keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend مع get_user من اللقطة المخزنة"""
+    
+    def get_user(self, user_id):
+        if user_cache() is None:
+            return super().get_user(user_id)
+        snapshot = load_snapshot(user_id)
+        if snapshot is None:
+            return None
+        user = snapshot_user(snapshot)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,104 @@
+"""
+مصفوفة صلاحيات الأدوار في الذاكرة
+=================================
+صلاحيات RolePermission (can_upload_files، can_use_ai...) تحمل مرة واحدة لكل
+عملية في مصفوفة ثابتة (Immutable): الدور ← قناع بتات (Bitmask) للصلاحيات،
+فالتحقق من صلاحية في كل طلب بحث في قاموس دون أي استعلام.
+
+إعادة التحميل: عند حفظ أو حذف RolePermission (مثل حفظ list_editable في
+لوحة التحكم) يتغير رقم إصدار المصفوفة في التخزين المؤقت المشترك (signals.py).
+العملية التي حفظت تعيد التحميل فوراً، وبقية العمليات تقارن إصدارها بالإصدار
+المشترك مرة كل CAPABILITY_CHECK_INTERVAL ثانية على الأكثر، ودون تخزين مؤقت
+مشترك تعيد كل عملية التحميل مرة كل CAPABILITY_CHECK_INTERVAL (academy.snapshots).
+
+الدور الذي ليس له صف في RolePermission يأخذ DEFAULT_PERMISSIONS
+(نفس القيم التي ينشئها الأمر setup_initial_data)، والمستخدم الخارق يملك كل الصلاحيات.
+
+الاستخدام:
+    from academy.capabilities import has_capability
+    
+    has_capability(request.user, 'can_use_ai')
+"""
+
+from types import MappingProxyType
+
+from .models import User, RolePermission
+from .snapshots import VersionedSnapshot
+
+
+VERSION_KEY = 'academy.capabilities.version'
+
+# أسماء الصلاحيات بترتيب حقول النموذج، ولكل صلاحية بت
+CAPABILITIES = tuple(
+    field.name for field in RolePermission._meta.concrete_fields
+    if field.name.startswith('can_')
+)
+BITS = MappingProxyType({name: 1 << index for index, name in enumerate(CAPABILITIES)})
+
+# الصلاحيات الافتراضية للأدوار (setup_initial_data ولأي دور بلا صف)
+DEFAULT_PERMISSIONS = {
+    User.Role.STUDENT: {'can_use_ai'},
+    User.Role.TEACHER: {
+        'can_upload_files', 'can_delete_files', 'can_send_notifications',
+        'can_view_reports', 'can_use_ai',
+    },
+    User.Role.ADMIN: set(CAPABILITIES),
+}
+
+
+def mask(capabilities):
+    """قناع البتات لمجموعة صلاحيات (KeyError لاسم غير معروف)"""
+    value = 0
+    for name in capabilities:
+        value |= BITS[name]
+    return value
+
+
+class CapabilityMatrix:
+    """مصفوفة ثابتة: الدور ← قناع الصلاحيات"""
+    
+    __slots__ = ('masks',)
+    
+    def __init__(self, masks):
+        object.__setattr__(self, 'masks', MappingProxyType(dict(masks)))
+    
+    def __setattr__(self, name, value):
+        raise AttributeError('CapabilityMatrix غير قابلة للتعديل')
+    
+    def allows(self, role, required):
+        """هل يملك الدور كل بتات القناع required"""
+        return self.masks.get(role, 0) & required == required
+    
+    def capabilities(self, role):
+        granted = self.masks.get(role, 0)
+        return {name for name, bit in BITS.items() if granted & bit}
+    
+    @classmethod
+    def load(cls):
+        """تحميل المصفوفة من قاعدة البيانات باستعلام واحد"""
+        masks = {role: mask(names) for role, names in DEFAULT_PERMISSIONS.items()}
+        for role, *values in RolePermission.objects.values_list('role', *CAPABILITIES):
+            masks[role] = mask(name for name, value in zip(CAPABILITIES, values) if value)
+        return cls(masks)
+
+
+# مصفوفة العملية الحالية (academy.snapshots)
+matrix = VersionedSnapshot(VERSION_KEY, CapabilityMatrix.load, 'CAPABILITY_CHECK_INTERVAL')
+
+
+def get_matrix():
+    return matrix.get()
+
+
+def bump_version():
+    """إعادة تحميل المصفوفة في كل العمليات بعد تعديل RolePermission"""
+    matrix.bump()
+
+
+def has_capability(user, *capabilities):
+    """هل يملك المستخدم كل الصلاحيات المذكورة"""
+    if not user.is_authenticated or not user.is_active:
+        return False
+    if user.is_superuser:
+        return True
+    return get_matrix().allows(user.role, mask(capabilities))
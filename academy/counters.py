@@ -0,0 +1,303 @@
+"""
+العدادات المؤجلة (Write-behind counters)
+========================================
+تجميع الزيادات المتكررة على نفس الصف (مثل download_count لملف شائع وقت
+الاختبارات) في ذاكرة العملية أو في الذاكرة المؤقتة المشتركة، ثم كتابتها دفعة
+واحدة باستعلام UPDATE واحد لكل (نموذج، حقل) بدلاً من قفل الصف عند كل زيادة.
+
+الاستخدام:
+    from academy.counters import counters
+    
+    counters.increment(LectureFile, lecture.pk, 'download_count')
+    counters.value(lecture, 'download_count')   # القيمة المخزنة + المعلقة
+    counters.flush()
+
+الإعدادات:
+- COUNTER_BUFFER_BACKEND: 'local' (ذاكرة العملية) أو 'cache' (الذاكرة المؤقتة المشتركة)
+- COUNTER_BUFFER_FLUSH_INTERVAL: الفترة بالثواني بين عمليات الكتابة (0 = كتابة فورية)
+
+تتم الكتابة من خيط خلفي في كل عملية كل COUNTER_BUFFER_FLUSH_INTERVAL ثانية
+(فلا يتأخر طلب التنزيل ولا يفشل بسبب الكتابة)، وعند إغلاق العملية (atexit).
+مع 'cache' يمكن أيضاً تشغيلها من أي عملية بالأمر flush_counters، لأن قائمة
+المفاتيح المعلقة محفوظة في الذاكرة المؤقتة المشتركة نفسها.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection, transaction
+
+
+logger = logging.getLogger(__name__)
+
+
+def apply_increments(model, field_name, deltas):
+    """
+    إضافة الزيادات {pk: delta} إلى عمود الحقل باستعلام UPDATE واحد
+    PostgreSQL: UPDATE ... FROM (VALUES ...)، وغيره: UPDATE ... CASE
+    
+    الصفوف تقفل بترتيب المفتاح الأساسي (SELECT ... ORDER BY ... FOR UPDATE)،
+    فلا تتقاطع أقفال عمليتين تكتبان نفس الصفوف في نفس الوقت (Deadlock)
+    """
+    if not deltas:
+        return
+    
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    column = quote(model._meta.get_field(field_name).column)
+    pk_column = quote(model._meta.pk.column)
+    pairs = sorted(deltas.items())
+    params = [value for pair in pairs for value in pair]
+    
+    if connection.features.has_select_for_update:
+        list(model._base_manager.filter(pk__in=[pk for pk, _ in pairs])
+             .order_by('pk').select_for_update().values_list('pk', flat=True))
+    
+    if connection.vendor == 'postgresql':
+        values = ', '.join(['(%s, %s)'] * len(pairs))
+        sql = (
+            f"UPDATE {table} AS t SET {column} = t.{column} + v.delta "
+            f"FROM (VALUES {values}) AS v(id, delta) "
+            f"WHERE t.{pk_column} = v.id"
+        )
+    else:
+        cases = ' '.join(['WHEN %s THEN %s'] * len(pairs))
+        placeholders = ', '.join(['%s'] * len(pairs))
+        sql = (
+            f"UPDATE {table} SET {column} = {column} + CASE {pk_column} {cases} END "
+            f"WHERE {pk_column} IN ({placeholders})"
+        )
+        params += [pk for pk, _ in pairs]
+    
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+class CounterBuffer(ABC):
+    """الواجهة المشتركة لمخازن العدادات المؤجلة"""
+    
+    def __init__(self, flush_interval):
+        self.flush_interval = flush_interval
+        self._flush_lock = threading.Lock()
+        self._flusher_lock = threading.Lock()
+        # العملية التي يعمل فيها الخيط الخلفي (الخيوط لا تنتقل مع fork)
+        self._flusher_pid = None
+    
+    @staticmethod
+    def key(model, pk, field_name):
+        return (model._meta.label_lower, pk, field_name)
+    
+    def increment(self, model, pk, field_name, delta=1):
+        """تسجيل زيادة معلقة على الحقل field_name للصف pk"""
+        self._add(self.key(model, pk, field_name), delta)
+        if self.flush_interval <= 0:
+            self.flush_safely()
+        else:
+            self.start_flusher()
+    
+    def pending(self, model, pk, field_name):
+        """الزيادة المعلقة التي لم تكتب بعد في قاعدة البيانات"""
+        return self._get(self.key(model, pk, field_name))
+    
+    def value(self, instance, field_name):
+        """القيمة المخزنة في الصف + الزيادة المعلقة"""
+        return getattr(instance, field_name) + self.pending(type(instance), instance.pk, field_name)
+    
+    def flush(self):
+        """
+        كتابة جميع الزيادات المعلقة في معاملة واحدة، وإرجاع عدد الصفوف المكتوبة
+        (0 إن كانت كتابة أخرى جارية)
+        """
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            taken = self._take()
+            
+            grouped = defaultdict(dict)
+            for (label, pk, field_name), delta in taken.items():
+                if delta:
+                    grouped[(label, field_name)][pk] = delta
+            if not grouped:
+                return 0
+            
+            try:
+                with transaction.atomic():
+                    # ترتيب ثابت للجداول أيضاً (انظر apply_increments)
+                    for (label, field_name), deltas in sorted(grouped.items()):
+                        apply_increments(apps.get_model(label), field_name, deltas)
+            except Exception:
+                # إعادة الزيادات إلى المخزن حتى لا تضيع
+                for key, delta in taken.items():
+                    self._add(key, delta)
+                raise
+            return sum(len(deltas) for deltas in grouped.values())
+        finally:
+            self._flush_lock.release()
+    
+    def flush_safely(self):
+        """flush() مع تسجيل الخطأ بدلاً من رفعه (الزيادات تبقى معلقة للمحاولة التالية)"""
+        try:
+            return self.flush()
+        except Exception:
+            logger.exception('تعذر كتابة العدادات المعلقة')
+            return 0
+    
+    def start_flusher(self):
+        """تشغيل خيط الكتابة الدورية في العملية الحالية إن لم يكن يعمل"""
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        with self._flusher_lock:
+            if self._flusher_pid == pid:
+                return
+            threading.Thread(target=self._run_flusher, name='counter-flusher', daemon=True).start()
+            self._flusher_pid = pid
+    
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush_safely()
+            # اتصال الخيط طويل العمر: إغلاقه بعد CONN_MAX_AGE أو بعد خطأ
+            close_old_connections()
+    
+    @abstractmethod
+    def _add(self, key, delta):
+        """إضافة delta إلى الزيادة المعلقة للمفتاح"""
+    
+    @abstractmethod
+    def _get(self, key):
+        """الزيادة المعلقة للمفتاح"""
+    
+    @abstractmethod
+    def _take(self):
+        """سحب جميع الزيادات المعلقة وتصفيرها"""
+
+
+class LocalCounterBuffer(CounterBuffer):
+    """تجميع الزيادات في ذاكرة العملية الحالية"""
+    
+    def __init__(self, flush_interval):
+        super().__init__(flush_interval)
+        self._pending = defaultdict(int)
+        self._lock = threading.Lock()
+    
+    def _add(self, key, delta):
+        with self._lock:
+            self._pending[key] += delta
+    
+    def _get(self, key):
+        with self._lock:
+            return self._pending.get(key, 0)
+    
+    def _take(self):
+        with self._lock:
+            taken, self._pending = self._pending, defaultdict(int)
+        return taken
+
+
+class CacheCounterBuffer(CounterBuffer):
+    """
+    تجميع الزيادات في الذاكرة المؤقتة المشتركة (Redis/Memcached) عبر incr الذري،
+    فتظهر القيم المعلقة لجميع العمليات، وأي عملية تكتبها (بما فيها الأمر
+    flush_counters)، وقفل مشترك يمنع عمليتين من كتابة نفس الزيادة مرتين.
+    
+    قائمة المفاتيح المعلقة مشتركة أيضاً: أول زيادة على مفتاح بعد كتابته تضع
+    علامة dirty (cache.add) وتسجل المفتاح في خانة مرقمة (slot) برقم من incr،
+    والكتابة تقرأ الخانات الجديدة منذ آخر كتابة. العلامة تحذف قبل قراءة القيمة،
+    فالزيادة التي تصل بعد القراءة تسجل المفتاح من جديد ولا تضيع.
+    """
+    
+    prefix = 'counters'
+    lock_key = 'counters:flush-lock'
+    slots_key = 'counters:slots'
+    taken_key = 'counters:slots-taken'
+    missing_key = 'counters:slot-missing'
+    # علامة بقيت من عملية توقفت أثناء التسجيل لا تمنع تسجيل المفتاح للأبد
+    dirty_timeout = 3600
+    
+    def cache_key(self, key):
+        return '{}:{}:{}:{}'.format(self.prefix, *key)
+    
+    def dirty_key(self, key):
+        return '{}:dirty:{}:{}:{}'.format(self.prefix, *key)
+    
+    def slot_key(self, slot):
+        return f'{self.prefix}:slot:{slot}'
+    
+    def _add(self, key, delta):
+        cache_key = self.cache_key(key)
+        if not cache.add(cache_key, delta, timeout=None):
+            cache.incr(cache_key, delta)
+        if cache.add(self.dirty_key(key), 1, timeout=self.dirty_timeout):
+            cache.add(self.slots_key, 0, timeout=None)
+            cache.set(self.slot_key(cache.incr(self.slots_key)), key, timeout=None)
+    
+    def _get(self, key):
+        return cache.get(self.cache_key(key), 0)
+    
+    def _dirty_keys(self):
+        """المفاتيح المسجلة منذ آخر كتابة، وتقديم مؤشر الخانات المقروءة"""
+        first = cache.get(self.taken_key, 0) + 1
+        last = cache.get(self.slots_key, 0)
+        slots = [self.slot_key(slot) for slot in range(first, last + 1)]
+        registered = cache.get_many(slots)
+        
+        keys, taken = [], first - 1
+        for slot, slot_key in enumerate(slots, first):
+            if slot_key in registered:
+                keys.append(tuple(registered[slot_key]))
+            elif cache.get(self.missing_key) != slot:
+                # رقم الخانة محجوز ولم يكتب المفتاح بعد: يقرأ في الكتابة التالية
+                cache.set(self.missing_key, slot, timeout=None)
+                break
+            else:
+                # مفقودة في كتابتين متتاليتين (حذفت من الذاكرة المؤقتة)
+                logger.warning('تجاوز خانة عداد مفقودة %s', slot)
+            taken = slot
+        
+        cache.delete_many(slots[:taken - first + 1])
+        cache.set(self.taken_key, taken, timeout=None)
+        return keys
+    
+    def _take(self):
+        if not cache.add(self.lock_key, 1, timeout=60):
+            return {}
+        try:
+            dirty = set(self._dirty_keys())
+            cache.delete_many([self.dirty_key(key) for key in dirty])
+            
+            keys = {self.cache_key(key): key for key in dirty}
+            taken = {}
+            for cache_key, value in cache.get_many(list(keys)).items():
+                if value:
+                    # إنقاص القيمة المقروءة فقط، فلا تضيع الزيادات المتزامنة
+                    cache.decr(cache_key, value)
+                    taken[keys[cache_key]] = value
+            return taken
+        finally:
+            cache.delete(self.lock_key)
+
+
+BACKENDS = {
+    'local': LocalCounterBuffer,
+    'cache': CacheCounterBuffer,
+}
+
+counters = BACKENDS[settings.COUNTER_BUFFER_BACKEND](settings.COUNTER_BUFFER_FLUSH_INTERVAL)
+
+
+@atexit.register
+def flush_on_exit():
+    """كتابة الزيادات المعلقة عند إغلاق العامل"""
+    try:
+        counters.flush()
+    except Exception:
+        logger.exception('تعذر كتابة العدادات المعلقة عند الإغلاق')
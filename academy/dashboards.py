@@ -0,0 +1,153 @@
+"""
+استعلامات لوحات التحكم
+======================
+استعلامات كل لوحة تحكم مستقلة عن بعضها، فتعرف هنا كقاموس (الاسم ← دالة
+تنفذ الاستعلام وتعيد نتيجته مقيمة) يستخدمه الـ View المتزامن والـ View غير المتزامن:
+
+- evaluate: تنفيذ الاستعلامات بالتتابع في خيط الطلب (WSGI)
+- aevaluate: تنفيذها بالتوازي في مجموعة خيوط DASHBOARD_QUERY_WORKERS، لكل
+  خيط اتصال قاعدة بيانات خاص به، فزمن اللوحة يقترب من أبطأ استعلام بدلاً
+  من مجموع الاستعلامات (ASGI)
+
+الاستعلامات في الخيوط الأخرى تمر بنفس execute_wrappers المثبتة على اتصال
+الطلب (QueryBudgetMiddleware و MetricsMiddleware) فتبقى محسوبة في الطلب.
+داخل معاملة مفتوحة (ATOMIC_REQUESTS أو الاختبارات) تنفذ بالتتابع على
+اتصال الطلب لأن الاتصالات الأخرى لا ترى بيانات المعاملة.
+"""
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection, connections
+
+from .models import User, Course, Enrollment, LectureFile, InboxEntry
+from .stats import in_id_order
+
+
+# =============================================================================
+# استعلامات اللوحات
+# =============================================================================
+
+def student_queries(user):
+    """لوحة تحكم الطالب"""
+    unread = InboxEntry.objects.unread_for(user)
+    return {
+        # المقررات المسجل بها
+        'enrollments': lambda: list(Enrollment.objects.filter(
+            student=user, is_active=True
+        ).select_related('course', 'course__teacher')),
+        # الإشعارات غير المقروءة (من صندوق الطالب مباشرة)
+        'notifications': lambda: [
+            entry.notification
+            for entry in unread.select_related('notification', 'notification__course')[:5]
+        ],
+        'notifications_count': unread.count,
+        # آخر الملفات المرفوعة في مقرراته
+        'recent_files': lambda: list(LectureFile.objects.filter(
+            course__enrollments__student=user,
+            is_active=True
+        ).order_by('-uploaded_at')[:5]),
+    }
+
+
+def teacher_queries(user):
+    """لوحة تحكم المدرس"""
+    return {
+        # المقررات التي يدرسها (العدادات مخزنة في جدول المقررات)
+        # الترتيب الافتراضي يمر عبر التخصص والقسم ويتطلب فرزاً، بينما هذا يطابق
+        # الفهرس course_teacher_active_idx
+        'courses': lambda: list(Course.objects.filter(
+            teacher=user, is_active=True
+        ).order_by('level', 'name')),
+        'total_students': Enrollment.objects.filter(
+            course__teacher=user, is_active=True
+        ).values('student').distinct().count,
+        # كل الملفات التي رفعها المدرس (في أي مقرر، نشطة أو لا) عبر الفهرس
+        # lecture_uploader_idx؛ files_count في المقررات يعد الملفات النشطة لكل مقرر
+        'total_files': LectureFile.objects.filter(uploaded_by=user).count,
+        # آخر الملفات المرفوعة
+        'recent_files': lambda: list(LectureFile.objects.filter(
+            uploaded_by=user
+        ).order_by('-uploaded_at')[:5]),
+    }
+
+
+def admin_queries(stats):
+    """لوحة تحكم المسؤول (بعد جلب لقطة الإحصائيات التي تحدد الصفوف)"""
+    return {
+        'recent_users': partial(in_id_order, User.objects.all(), stats.recent_user_ids),
+        'recent_files': partial(in_id_order, LectureFile.objects.all(), stats.recent_file_ids),
+    }
+
+
+# =============================================================================
+# التنفيذ
+# =============================================================================
+
+def evaluate(queries):
+    """تنفيذ الاستعلامات بالتتابع"""
+    return {name: query() for name, query in queries.items()}
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    """مجموعة الخيوط المشتركة (تنشأ عند أول استخدام)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.DASHBOARD_QUERY_WORKERS,
+                thread_name_prefix='dashboard-query',
+            )
+        return _executor
+
+
+def request_wrappers():
+    """
+    execute_wrappers المثبتة على اتصالات خيط الطلب، أو None إن كان يجب
+    التنفيذ بالتتابع (مجموعة خيوط معطلة أو معاملة مفتوحة)
+    """
+    if settings.DASHBOARD_QUERY_WORKERS <= 1 or connection.in_atomic_block:
+        return None
+    return {conn.alias: list(conn.execute_wrappers) for conn in connections.all(initialized_only=True)}
+
+
+def run_query(query, wrappers):
+    """
+    تنفيذ استعلام في خيط من المجموعة باتصاله الخاص
+    خيوط المجموعة لا تمر بإشارات بداية ونهاية الطلب، فيطبق close_old_connections
+    قبل كل استعلام وبعده: إغلاق الاتصال بعد CONN_MAX_AGE أو بعد خطأ جعله غير
+    صالح (مثل إعادة تشغيل قاعدة البيانات)، والاتصال الصالح يعاد استخدامه
+    """
+    close_old_connections()
+    try:
+        with ExitStack() as stack:
+            for alias, alias_wrappers in wrappers.items():
+                for wrapper in alias_wrappers:
+                    stack.enter_context(connections[alias].execute_wrapper(wrapper))
+            return query()
+    finally:
+        close_old_connections()
+
+
+async def aevaluate(queries):
+    """تنفيذ الاستعلامات بالتوازي وإرجاع النتائج بنفس الأسماء"""
+    wrappers = await sync_to_async(request_wrappers)()
+    if wrappers is None:
+        return await sync_to_async(evaluate)(queries)
+    
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(executor(), contextvars.copy_context().run, run_query, query, wrappers)
+        for query in queries.values()
+    ))
+    return dict(zip(queries, results))
@@ -7,7 +7,9 @@ Decorators للتحقق من الصلاحيات
 from functools import wraps
 from django.shortcuts import redirect
 from django.contrib import messages
-from django.core.exceptions import PermissionDenied
+from django.core.exceptions import PermissionDenied, ImproperlyConfigured
+
+from .capabilities import BITS, has_capability
 
 
 def role_required(allowed_roles):
@@ -96,4 +98,60 @@ def teacher_or_admin_required(view_func):
             raise PermissionDenied
         
         return view_func(request, *args, **kwargs)
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+
+def capability_required(*capabilities):
+    """
+    Decorator للتحقق من صلاحيات دور المستخدم في RolePermission
+    (من المصفوفة المحملة في الذاكرة دون استعلام، انظر academy.capabilities)
+    
+    الاستخدام:
+    @capability_required('can_upload_files')
+    def my_view(request):
+        ...
+    """
+    unknown = set(capabilities) - set(BITS)
+    if not capabilities or unknown:
+        raise ImproperlyConfigured(f"صلاحيات غير معروفة: {', '.join(sorted(unknown)) or '(لا شيء)'}")
+    
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                messages.error(request, 'يجب تسجيل الدخول أولاً')
+                return redirect('login')
+            
+            if not has_capability(request.user, *capabilities):
+                messages.error(request, 'ليس لديك صلاحية للوصول إلى هذه الصفحة')
+                raise PermissionDenied
+            
+            return view_func(request, *args, **kwargs)
+        wrapper.capabilities = capabilities
+        return wrapper
+    return decorator
+
+
+upload_files_required = capability_required('can_upload_files')
+use_ai_required = capability_required('can_use_ai')
+
+
+def query_budget(max_queries):
+    """
+    الحد الأقصى لعدد استعلامات SQL في طلب واحد لهذا الـ View
+    (يشمل استعلامات الجلسة والمستخدم، وتطبقه QueryBudgetMiddleware)
+    
+    الاستخدام:
+    @query_budget(8)
+    def my_view(request):
+        ...
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            # يُسجل عند الاستدعاء ليعمل أيضاً مع Views التوجيه مثل dashboard
+            request.query_budget = max_queries
+            return view_func(request, *args, **kwargs)
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
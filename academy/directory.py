@@ -0,0 +1,77 @@
+"""
+البحث في دليل المستخدمين
+========================
+بحث سريع بالرقم الأكاديمي أو الاسم أو البريد للإكمال التلقائي ولوحة التحكم:
+- الرقم الأكاديمي: مطابقة بادئة (LIKE 'x%') يخدمها فهرس varchar_pattern_ops
+  الذي ينشئه Django تلقائياً على PostgreSQL للحقول الفريدة
+- الاسم: عمود directory_name المطبّع (انظر academy.search.normalize) مع فهرس
+  trigram من نوع GIN يخدم LIKE '%x%'
+- البريد: فهرس trigram على UPPER(email) المطابق لاستعلام icontains
+
+فهارس trigram تنشأ في الترحيل 0011 على PostgreSQL فقط (تتطلب امتداد pg_trgm).
+"""
+
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .search import normalize, normalize_tokens
+
+
+# الحقول التي يبنى منها directory_name
+DIRECTORY_FIELDS = ('first_name', 'last_name', 'username')
+
+# فهرس trigram لا يفيد مع أقل من 3 حروف، فتقتصر المطابقة على البادئة
+MIN_CONTAINS_LENGTH = 3
+
+
+def directory_name(user):
+    """الاسم المطبّع للمستخدم كما يخزن في directory_name"""
+    return normalize(' '.join(getattr(user, field) or '' for field in DIRECTORY_FIELDS))
+
+
+def directory_filter(queryset, term):
+    """تصفية queryset المستخدمين حسب عبارة البحث (داخل قاعدة البيانات)"""
+    term = term.strip()
+    tokens = normalize_tokens(term)
+    if not term:
+        return queryset
+    
+    condition = Q(academic_id__startswith=term)
+    if len(term) >= MIN_CONTAINS_LENGTH:
+        condition |= Q(email__icontains=term)
+    
+    if tokens:
+        name = Q()
+        for token in tokens:
+            if len(token) >= MIN_CONTAINS_LENGTH:
+                name &= Q(directory_name__contains=token)
+            else:
+                name &= (
+                    Q(directory_name__startswith=token) |
+                    Q(directory_name__contains=f' {token}')
+                )
+        condition |= name
+    
+    return queryset.filter(condition)
+
+
+def directory_search(queryset, term, role=None, limit=10):
+    """
+    أفضل limit نتيجة: مطابقة الرقم الأكاديمي أولاً ثم بداية الاسم ثم غيرها
+    (تصفية الدور جزء من نفس الاستعلام)
+    """
+    if role:
+        queryset = queryset.filter(role=role)
+    
+    term = term.strip()
+    prefix = normalize(term)
+    rank = Case(
+        When(academic_id__startswith=term, then=Value(0)),
+        When(directory_name__startswith=prefix, then=Value(1)),
+        default=Value(2),
+        output_field=IntegerField(),
+    )
+    return list(
+        directory_filter(queryset, term)
+        .annotate(directory_rank=rank)
+        .order_by('directory_rank', 'directory_name', 'pk')[:limit]
+    )
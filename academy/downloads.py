@@ -0,0 +1,171 @@
+"""
+تنزيل ملفات المحاضرات
+=====================
+إرسال LectureFile.file على دفعات ثابتة الحجم دون تحميل الملف كاملاً في الذاكرة،
+مع دعم:
+- طلبات Range و If-Range (للتقديم والتأخير في الفيديو واستكمال التنزيل)
+- ETag و Last-Modified مع استجابة 304
+- تفويض إرسال الملف لخادم الويب عبر X-Accel-Redirect (nginx) أو X-Sendfile (Apache)
+
+الإعدادات:
+- LECTURE_FILE_CHUNK_SIZE: حجم الدفعة بالبايت
+- LECTURE_FILE_SENDFILE: '' (Django يرسل الملف) أو 'nginx' أو 'apache'
+- LECTURE_FILE_ACCEL_PREFIX: مسار الموقع الداخلي في nginx (internal)
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# الأنواع التي يعرضها المتصفح مباشرة (تشغيل الفيديو، عرض PDF...)
+INLINE_CONTENT_TYPES = ('video/', 'audio/', 'image/', 'application/pdf')
+
+
+class RangeNotSatisfiable(Exception):
+    """نطاق البايتات المطلوب خارج حجم الملف"""
+
+
+def parse_range(header, size):
+    """
+    تحليل ترويسة Range وإرجاع (start, end) شاملة للطرفين
+    أو None لإرسال الملف كاملاً (ترويسة غير موجودة أو غير مدعومة، مثل النطاقات المتعددة)
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    
+    if not start:
+        # bytes=-N : آخر N بايت
+        # الملف الفارغ لا يحتوي أي بايت يمكن إرساله
+        length = int(end)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+    
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    """هل ما زال الملف مطابقاً لترويسة If-Range (وإلا يرسل كاملاً)"""
+    value = request.headers.get('If-Range')
+    if value is None:
+        return True
+    value = value.strip()
+    if value.startswith('"') or value.startswith('W/'):
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def iter_file(storage, name, start, length, chunk_size):
+    """قراءة جزء من الملف دفعة بعد دفعة"""
+    with storage.open(name, 'rb') as handle:
+        handle.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = handle.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def file_validators(lecture):
+    """حساب ETag (قوي) و Last-Modified (timestamp) للملف"""
+    storage = lecture.file.storage
+    try:
+        modified = storage.get_modified_time(lecture.file.name)
+    except (NotImplementedError, OSError):
+        modified = lecture.uploaded_at
+    last_modified = int(modified.timestamp())
+    if lecture.content_digest:
+        # بصمة المحتوى تحدد الملف تماماً (academy.storage)
+        etag = f'"{lecture.content_digest}"'
+    else:
+        etag = f'"{lecture.pk}-{lecture.file_size:x}-{last_modified:x}"'
+    return etag, last_modified
+
+
+def lecture_file_response(request, lecture):
+    """بناء استجابة التنزيل لملف المحاضرة"""
+    name = lecture.file.name
+    storage = lecture.file.storage
+    if not name or not storage.exists(name):
+        raise Http404('الملف غير موجود')
+    
+    etag, last_modified = file_validators(lecture)
+    
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if not_modified is not None:
+        return not_modified
+    
+    size = storage.size(name)
+    content_type = lecture.content_type or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    as_attachment = not content_type.startswith(INLINE_CONTENT_TYPES)
+    
+    byte_range = None
+    if if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    
+    sendfile = settings.LECTURE_FILE_SENDFILE
+    if sendfile:
+        # خادم الويب يتولى إرسال البايتات ونطاقات Range بعد تحقق Django من الصلاحية
+        response = HttpResponse(content_type=content_type)
+        if sendfile == 'nginx':
+            # nginx يفك ترميز المسار، والترويسة يجب أن تكون ASCII (أسماء الملفات القديمة عربية أو بمسافات)
+            response['X-Accel-Redirect'] = settings.LECTURE_FILE_ACCEL_PREFIX.rstrip('/') + '/' + quote(name)
+        else:
+            response['X-Sendfile'] = storage.path(name)
+    elif request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+    else:
+        start, end = byte_range or (0, size - 1)
+        response = StreamingHttpResponse(
+            iter_file(storage, name, start, end - start + 1, settings.LECTURE_FILE_CHUNK_SIZE),
+            content_type=content_type,
+        )
+    
+    if not sendfile:
+        start, end = byte_range or (0, size - 1)
+        response['Content-Length'] = str(end - start + 1)
+        response['Accept-Ranges'] = 'bytes'
+        if byte_range:
+            response.status_code = 206
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    response['Content-Disposition'] = content_disposition_header(
+        as_attachment, lecture.original_name or os.path.basename(name)
+    )
+    return response
+
+
+def is_first_request(request):
+    """هل الطلب بداية تنزيل جديد (وليس جزءاً لاحقاً من نفس التنزيل)"""
+    byte_range = RANGE_RE.match(request.headers.get('Range', '').strip())
+    return request.method == 'GET' and (byte_range is None or byte_range.group(1) == '0')
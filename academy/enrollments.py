@@ -0,0 +1,146 @@
+"""
+التسجيل الجماعي للدفعات في المقررات
+===================================
+تسجيل دفعة كاملة (قسم/تخصص/مستوى) في مجموعة مقررات باستعلام واحد
+INSERT ... SELECT ... ON CONFLICT DO NOTHING بدلاً من حفظ Enrollment لكل
+طالب في كل مقرر، دون تحميل الطلاب في الذاكرة:
+
+- التسجيل الموجود مسبقاً (unique_together student, course) لا يتكرر،
+  والتسجيل غير النشط يعاد تفعيله باستعلام UPDATE واحد
+- الإلغاء الجماعي باستعلام UPDATE واحد
+- عدادات المقررات تعاد من الجداول باستعلام واحد (recount_counters)
+  لأن العمليات الجماعية لا تمر بـ CourseCountersMixin
+
+الدفعة (cohort) قاموس بأي من department_id و specialization_id و level،
+وبدونها يسجل في كل مقرر طلاب تخصصه ومستواه.
+الدفعات الكبيرة (أكثر من COHORT_ENROLLMENT_SYNC_LIMIT تسجيل) تنفذ كمهمة خلفية.
+"""
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import User, Course, Enrollment
+
+
+COHORT_FIELDS = ('department_id', 'specialization_id', 'level')
+
+
+def cohort_sql(course_ids, cohort=None):
+    """
+    جزء FROM ... WHERE الذي يربط المقررات بطلاب الدفعة (c للمقرر و u للطالب)
+    وإرجاع (sql, params)
+    """
+    cohort = {field: value for field, value in (cohort or {}).items() if value is not None}
+    course_table = Course._meta.db_table
+    user_table = User._meta.db_table
+    
+    if cohort:
+        join = f"{course_table} c CROSS JOIN {user_table} u"
+    else:
+        join = (
+            f"{course_table} c INNER JOIN {user_table} u "
+            f"ON u.specialization_id = c.specialization_id AND u.level = c.level"
+        )
+    
+    placeholders = ', '.join(['%s'] * len(course_ids))
+    conditions = [f"c.id IN ({placeholders})", "u.role = %s", "u.is_active = %s"]
+    params = [*course_ids, User.Role.STUDENT, True]
+    for field in COHORT_FIELDS:
+        if field in cohort:
+            conditions.append(f"u.{field} = %s")
+            params.append(cohort[field])
+    
+    return f"FROM {join} WHERE {' AND '.join(conditions)}", params
+
+
+def cohort_enrollments(course_ids, cohort=None):
+    """تسجيلات طلاب الدفعة في المقررات (للتحديث الجماعي عبر ORM)"""
+    cohort = {field: value for field, value in (cohort or {}).items() if value is not None}
+    enrollments = Enrollment.objects.filter(
+        course_id__in=course_ids,
+        student__role=User.Role.STUDENT,
+        **{f'student__{field}': value for field, value in cohort.items()}
+    )
+    if not cohort:
+        enrollments = enrollments.filter(
+            student__specialization_id=F('course__specialization_id'),
+            student__level=F('course__level'),
+        )
+    return enrollments
+
+
+def cohort_size(course_ids, cohort=None):
+    """عدد أزواج (طالب، مقرر) في الدفعة باستعلام COUNT واحد"""
+    if not course_ids:
+        return 0
+    sql, params = cohort_sql(course_ids, cohort)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) {sql}", params)
+        return cursor.fetchone()[0]
+
+
+def enroll_cohort(course_ids, cohort=None):
+    """
+    تسجيل طلاب الدفعة النشطين في المقررات وإرجاع
+    {'enrolled': تسجيلات جديدة, 'reactivated': تسجيلات أعيد تفعيلها}
+    """
+    course_ids = list(course_ids)
+    if not course_ids:
+        return {'enrolled': 0, 'reactivated': 0}
+    
+    sql, params = cohort_sql(course_ids, cohort)
+    enrollment_table = Enrollment._meta.db_table
+    
+    with transaction.atomic():
+        reactivated = cohort_enrollments(course_ids, cohort).filter(
+            is_active=False, student__is_active=True
+        ).update(is_active=True)
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {enrollment_table} (student_id, course_id, enrolled_at, is_active) "
+                f"SELECT u.id, c.id, %s, %s {sql} "
+                f"ON CONFLICT (student_id, course_id) DO NOTHING",
+                [timezone.now(), True, *params]
+            )
+            enrolled = cursor.rowcount
+        
+        Course.objects.filter(pk__in=course_ids).recount_counters()
+    
+    return {'enrolled': enrolled, 'reactivated': reactivated}
+
+
+def deactivate_cohort(course_ids, cohort=None):
+    """إلغاء تفعيل تسجيلات طلاب الدفعة في المقررات وإرجاع {'deactivated': العدد}"""
+    course_ids = list(course_ids)
+    with transaction.atomic():
+        deactivated = cohort_enrollments(course_ids, cohort).filter(
+            is_active=True
+        ).update(is_active=False)
+        Course.objects.filter(pk__in=course_ids).recount_counters()
+    return {'deactivated': deactivated}
+
+
+def schedule_cohort(course_ids, cohort=None, deactivate=False, requested_by=None):
+    """
+    تنفيذ التسجيل (أو الإلغاء) فوراً وإرجاع الأعداد، أو إضافته للطابور
+    وإرجاع None إذا تجاوزت الدفعة COHORT_ENROLLMENT_SYNC_LIMIT
+    """
+    course_ids = list(course_ids)
+    if cohort_size(course_ids, cohort) <= settings.COHORT_ENROLLMENT_SYNC_LIMIT:
+        if deactivate:
+            return deactivate_cohort(course_ids, cohort)
+        return enroll_cohort(course_ids, cohort)
+    
+    from .jobs import enqueue
+    from .tasks import cohort_enrollment
+    enqueue(cohort_enrollment, course_ids, cohort, deactivate, requested_by)
+    return None
+
+
+def describe_counts(counts):
+    """وصف نصي لنتيجة التسجيل أو الإلغاء"""
+    labels = {'enrolled': 'تسجيل جديد', 'reactivated': 'إعادة تفعيل', 'deactivated': 'إلغاء تسجيل'}
+    return '، '.join(f'{labels[key]}: {value}' for key, value in counts.items())
@@ -0,0 +1,232 @@
+"""
+استخراج النصوص من ملفات المحاضرات
+=================================
+يستخرج نص ملفات PDF و Word و PowerPoint صفحة بصفحة (كمولدات Generators)
+ويحفظه في LectureText كمقاطع مرتبة حسب بصمة المحتوى، لتستخدمه الملخصات
+والأسئلة والبحث دون إعادة تحليل الملف في كل طلب.
+
+- يبدأ الاستخراج كمهمة خلفية بعد رفع ملف بمحتوى جديد (signals.py)
+- الملف المكرر (نفس البصمة) لا يستخرج مرة أخرى
+- الذاكرة ثابتة تقريباً: صفحة واحدة في الذاكرة وكتابة المقاطع على دفعات
+- التحليل خارج المعاملة، والمعاملة لحفظ المقاطع فقط
+
+لكل نوع ملف مستخرج مسجل عبر @extractor(LectureFile.FileType.X) يعيد
+(رقم الصفحة، النص) لكل صفحة:
+    PDF: مكتبة pypdf (requirements.txt)
+    Word (.docx) و PowerPoint (.pptx): قراءة XML داخل الملف (ZIP) بـ iterparse
+    من المكتبة القياسية، فقرة بعد فقرة دون بناء المستند كاملاً في الذاكرة
+
+الاستخراج الفاشل يعاد عند رفع نفس المحتوى مرة أخرى، والنص المستخرج يحذف
+مع حذف آخر نسخة للمحتوى (FileBlob) أو عند عدم وجود أي ملف بهذه البصمة.
+"""
+
+import json
+import logging
+import posixpath
+import tempfile
+import zipfile
+from itertools import islice
+from xml.etree.ElementTree import iterparse
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import LectureFile, LectureText, TextExtraction
+
+
+logger = logging.getLogger(__name__)
+
+EXTRACTORS = {}
+
+WRITE_BATCH_SIZE = 100
+
+
+class ExtractionUnsupported(Exception):
+    """لا يوجد مستخرج لهذا النوع أو المكتبة المطلوبة غير مثبتة"""
+
+
+def extractor(file_type):
+    """تسجيل مستخرج لنوع ملف"""
+    def register(func):
+        EXTRACTORS[file_type] = func
+        return func
+    return register
+
+
+@extractor(LectureFile.FileType.PDF)
+def extract_pdf(handle):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ExtractionUnsupported('مكتبة pypdf غير مثبتة')
+    
+    for number, page in enumerate(PdfReader(handle).pages, start=1):
+        yield number, page.extract_text() or ''
+
+
+# مساحات أسماء XML في ملفات Office Open XML
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+DRAWING_NS = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+PRESENTATION_NS = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+RELATIONSHIPS_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PACKAGE_RELATIONSHIPS_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+def open_package(handle, label):
+    """فتح ملف Office Open XML (ZIP)، والصيغ الثنائية القديمة (.doc/.ppt) غير مدعومة"""
+    try:
+        return zipfile.ZipFile(handle)
+    except zipfile.BadZipFile:
+        raise ExtractionUnsupported(f'صيغة {label} القديمة غير مدعومة')
+
+
+def iter_paragraphs(stream, paragraph_tag, text_tag):
+    """
+    نصوص الفقرات في XML بالترتيب أثناء القراءة (iterparse)
+    كل فقرة تحذف من الشجرة بعد قراءتها، فالذاكرة بحجم فقرة واحدة
+    """
+    for _, element in iterparse(stream):
+        if element.tag == paragraph_tag:
+            yield ''.join(node.text or '' for node in element.iter(text_tag))
+            element.clear()
+
+
+@extractor(LectureFile.FileType.WORD)
+def extract_word(handle):
+    with open_package(handle, 'Word') as package, package.open('word/document.xml') as document:
+        # ملفات Word لا تحتوي أرقام صفحات، فكل فقرة مقطع منفصل
+        for text in iter_paragraphs(document, f'{WORD_NS}p', f'{WORD_NS}t'):
+            yield None, text
+
+
+def slide_names(package):
+    """مسارات الشرائح بترتيب العرض (sldIdLst في presentation.xml)"""
+    with package.open('ppt/_rels/presentation.xml.rels') as rels:
+        targets = {
+            element.get('Id'): element.get('Target')
+            for _, element in iterparse(rels) if element.tag == f'{PACKAGE_RELATIONSHIPS_NS}Relationship'
+        }
+    with package.open('ppt/presentation.xml') as presentation:
+        ids = [
+            element.get(f'{RELATIONSHIPS_NS}id')
+            for _, element in iterparse(presentation) if element.tag == f'{PRESENTATION_NS}sldId'
+        ]
+    return [posixpath.normpath(posixpath.join('ppt', targets[rel_id])) for rel_id in ids]
+
+
+@extractor(LectureFile.FileType.POWERPOINT)
+def extract_powerpoint(handle):
+    with open_package(handle, 'PowerPoint') as package:
+        for number, name in enumerate(slide_names(package), start=1):
+            with package.open(name) as slide:
+                texts = iter_paragraphs(slide, f'{DRAWING_NS}p', f'{DRAWING_NS}t')
+                yield number, '\n'.join(text for text in texts if text)
+
+
+def split_chunks(pages, max_chars):
+    """
+    تحويل (الصفحة، النص) إلى مقاطع لا يتجاوز طولها max_chars
+    مع عدم خلط صفحتين في مقطع واحد
+    """
+    for page, text in pages:
+        text = text.strip()
+        while text:
+            if len(text) <= max_chars:
+                yield page, text
+                break
+            cut = text.rfind(' ', 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            yield page, text[:cut].rstrip()
+            text = text[cut:].lstrip()
+
+
+def extract_text(lecture):
+    """
+    استخراج نص الملف وحفظه في LectureText (يعيد عدد المقاطع)
+    التحليل يتم خارج المعاملة إلى ملف مؤقت (مقطع لكل سطر JSON)، ثم تفتح
+    المعاملة للحفظ فقط، فلا يبقى اتصال قاعدة البيانات في معاملة طوال التحليل
+    """
+    func = EXTRACTORS.get(lecture.file_type)
+    if func is None:
+        raise ExtractionUnsupported(f'لا يوجد مستخرج للنوع {lecture.file_type}')
+    
+    digest = lecture.content_digest
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as chunks:
+        with lecture.file.storage.open(lecture.file.name, 'rb') as handle:
+            for chunk in split_chunks(func(handle), settings.LECTURE_TEXT_CHUNK_CHARS):
+                chunks.write(json.dumps(chunk, ensure_ascii=False) + '\n')
+        chunks.seek(0)
+        
+        position = 0
+        with transaction.atomic():
+            LectureText.objects.filter(content_digest=digest).delete()
+            while batch := list(islice(chunks, WRITE_BATCH_SIZE)):
+                rows = []
+                for line in batch:
+                    page, text = json.loads(line)
+                    rows.append(LectureText(content_digest=digest, position=position, page=page, text=text))
+                    position += 1
+                LectureText.objects.bulk_create(rows)
+    
+    return position
+
+
+def discard_text(digest):
+    """حذف النص المستخرج وحالته لبصمة لم يعد لها أي ملف محاضرة"""
+    if not digest or LectureFile.objects.filter(content_digest=digest).exists():
+        return
+    LectureText.objects.filter(content_digest=digest).delete()
+    TextExtraction.objects.filter(content_digest=digest).delete()
+
+
+def run_extraction(digest):
+    """تنفيذ الاستخراج لبصمة محتوى وتسجيل حالته"""
+    lecture = LectureFile.objects.filter(content_digest=digest).first()
+    if lecture is None:
+        # حذفت كل الملفات قبل تنفيذ المهمة
+        discard_text(digest)
+        return
+    
+    try:
+        count = extract_text(lecture)
+    except ExtractionUnsupported as error:
+        status, count, message = TextExtraction.Status.UNSUPPORTED, 0, str(error)
+    except Exception as error:
+        logger.exception('فشل استخراج النص من %s', lecture.file.name)
+        status, count, message = TextExtraction.Status.FAILED, 0, str(error)
+    else:
+        status, message = TextExtraction.Status.DONE, ''
+    
+    TextExtraction.objects.filter(content_digest=digest).update(
+        status=status, chunk_count=count, error=message, extracted_at=timezone.now()
+    )
+
+
+def schedule_extraction(lecture):
+    """
+    إضافة مهمة استخراج لمحتوى الملف إذا لم يستخرج من قبل أو فشل استخراجه
+    (إنشاء TextExtraction أو إعادته من FAILED إلى PENDING يضمن مهمة واحدة
+    فقط لكل بصمة)
+    """
+    from .jobs import enqueue
+    from .tasks import extract_lecture_text
+    
+    digest = lecture.content_digest
+    if not digest or lecture.file_type not in EXTRACTORS:
+        return
+    
+    _, created = TextExtraction.objects.get_or_create(content_digest=digest)
+    retry = not created and TextExtraction.objects.filter(
+        content_digest=digest, status=TextExtraction.Status.FAILED
+    ).update(status=TextExtraction.Status.PENDING, error='')
+    if created or retry:
+        transaction.on_commit(lambda: enqueue(extract_lecture_text, digest))
+
+
+def iter_lecture_text(lecture):
+    """النص المستخرج لملف المحاضرة مقطعاً بعد مقطع"""
+    chunks = LectureText.objects.filter(content_digest=lecture.content_digest).order_by('position')
+    for chunk in chunks.iterator(chunk_size=WRITE_BATCH_SIZE):
+        yield chunk.text
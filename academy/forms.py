@@ -4,9 +4,12 @@
 """
 
 from django import forms
+from django.conf import settings
+from django.core.files.base import ContentFile
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.core.exceptions import ValidationError
-from .models import User, Department, Specialization
+from django.core.validators import FileExtensionValidator
+from .models import User, Department, Specialization, Course, LectureFile
 
 
 class LoginForm(AuthenticationForm):
@@ -205,4 +208,88 @@ class ChangePasswordForm(forms.Form):
         if password1 and password2 and password1 != password2:
             raise ValidationError('كلمتا المرور غير متطابقتين')
         
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+
+class ChunkedUploadInitForm(forms.Form):
+    """نموذج بدء جلسة رفع مجزأ لملف محاضرة"""
+    
+    course = forms.ModelChoiceField(queryset=Course.objects.none(), label='المقرر')
+    title = forms.CharField(max_length=255, label='عنوان الملف')
+    description = forms.CharField(required=False, label='الوصف')
+    chapter = forms.CharField(max_length=100, required=False, label='الفصل/الوحدة')
+    file_type = forms.ChoiceField(
+        choices=LectureFile.FileType.choices,
+        initial=LectureFile.FileType.PDF,
+        label='نوع الملف'
+    )
+    filename = forms.CharField(max_length=255, label='اسم الملف')
+    size = forms.IntegerField(min_value=1, label='حجم الملف (بايت)')
+    
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        
+        # المدرس يرفع لمقرراته فقط، والمسؤول لأي مقرر
+        courses = Course.objects.all()
+        if user is not None and not user.is_admin_user:
+            courses = courses.filter(teacher=user)
+        self.fields['course'].queryset = courses
+    
+    def clean_filename(self):
+        filename = self.cleaned_data['filename']
+        
+        # نفس تحقق LectureFile.file من الامتداد قبل استلام أي بايت
+        LectureFile._meta.get_field('file').run_validators(
+            ContentFile(b'', name=filename)
+        )
+        return filename
+    
+    def clean_size(self):
+        size = self.cleaned_data['size']
+        if size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise ValidationError('حجم الملف أكبر من الحد المسموح')
+        return size
+
+
+class StudentImportForm(forms.Form):
+    """نموذج رفع ملف استيراد الطلاب (لوحة التحكم)"""
+    
+    file = forms.FileField(
+        label='ملف الطلاب (CSV أو XLSX)',
+        validators=[FileExtensionValidator(['csv', 'xlsx'])]
+    )
+
+
+class CohortEnrollmentForm(forms.Form):
+    """اختيار الدفعة لتسجيلها في المقررات المحددة (إجراء لوحة التحكم)"""
+    
+    department_id = forms.TypedChoiceField(coerce=int, empty_value=None, required=False, label='القسم')
+    specialization_id = forms.TypedChoiceField(coerce=int, empty_value=None, required=False, label='التخصص')
+    level = forms.TypedChoiceField(
+        choices=[('', 'كل المستويات'), *User._meta.get_field('level').choices],
+        coerce=int, empty_value=None, required=False, label='المستوى'
+    )
+    deactivate = forms.BooleanField(required=False, label='إلغاء التسجيل بدلاً من التسجيل')
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        
+        # الخيارات كقوائم ثابتة (استعلام واحد لكل حقل مهما تكرر عرضها)
+        self.fields['department_id'].choices = [
+            ('', 'كل الأقسام'), *Department.objects.values_list('pk', 'name')
+        ]
+        self.fields['specialization_id'].choices = [('', 'كل التخصصات')] + [
+            (pk, f'{name} - {department}')
+            for pk, name, department in Specialization.objects.values_list(
+                'pk', 'name', 'department__name'
+            )
+        ]
+    
+    def cohort(self):
+        """الدفعة المختارة (None = طلاب تخصص ومستوى كل مقرر)"""
+        cohort = {
+            field: self.cleaned_data[field]
+            for field in ('department_id', 'specialization_id', 'level')
+            if self.cleaned_data[field] is not None
+        }
+        return cohort or None
@@ -0,0 +1,354 @@
+"""
+الاستيراد الجماعي للطلاب
+========================
+استيراد آلاف الطلاب من ملف CSV أو XLSX دون المرور بـ StudentRegistrationForm
+لكل صف (وهو بطيء بسبب تجزئة PBKDF2 واستعلام لكل صف):
+
+- قراءة الملف صفاً صفاً (Streaming) ومعالجته على دفعات، فالذاكرة ثابتة تقريباً
+- التحقق من القسم والتخصص والمستوى من جدول بحث في الذاكرة (استعلامان فقط)
+- تجزئة كلمات المرور للطلاب الجدد في مجموعة عمليات (ProcessPool) بالتوازي
+- الإدخال عبر bulk_create مع التحديث عند تعارض academic_id (Upsert)، وإن
+  فشلت الدفعة بتعارض أضيف بعد التحقق تعاد صفاً صفاً وترفض الصفوف المتعارضة فقط
+- تقرير خطأ لكل صف مرفوض دون إيقاف بقية الاستيراد
+
+الأعمدة (السطر الأول): academic_id (مطلوب)، first_name، last_name، email،
+username (افتراضياً academic_id)، phone، department (الاسم أو الرقم)،
+specialization (الاسم أو الرقم)، level (1-4)، password (اختياري).
+
+الطالب الموجود مسبقاً تحدث بياناته فقط ولا تتغير كلمة مروره أو اسم مستخدمه.
+ملفات XLSX تتطلب مكتبة openpyxl (اختيارية).
+"""
+
+import csv
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DataError, IntegrityError, transaction
+
+from .backends import invalidate_users
+from .directory import directory_name
+from .models import User, Department, Specialization, PlatformStats
+
+
+COLUMNS = (
+    'academic_id', 'username', 'first_name', 'last_name', 'email', 'phone',
+    'department', 'specialization', 'level', 'password',
+)
+
+# الحقول التي تحدث للطالب الموجود مسبقاً (دون password و username)
+UPDATE_FIELDS = [
+    'first_name', 'last_name', 'email', 'phone', 'department', 'specialization',
+    'level', 'directory_name', 'updated_at',
+]
+
+# الحقول النصية التي تؤخذ من الملف مباشرة ولها حد أقصى للطول
+LENGTH_CHECKED_FIELDS = ('academic_id', 'username', 'first_name', 'last_name', 'email', 'phone')
+
+# عدد كلمات المرور التي ترسل لكل عملية في المرة الواحدة
+HASH_CHUNK_SIZE = 16
+
+LEVELS = {value for value, label in User._meta.get_field('level').choices}
+
+
+class ImportFileError(Exception):
+    """ملف الاستيراد غير صالح (نوع غير مدعوم أو أعمدة ناقصة)"""
+
+
+class ImportReport:
+    """نتيجة الاستيراد: عدد المنشئين والمحدثين والأخطاء لكل صف"""
+    
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+    
+    def error(self, line, academic_id, message):
+        self.errors.append((line, academic_id, message))
+    
+    def summary(self):
+        return f'تم إنشاء {self.created} وتحديث {self.updated} طالب، ورفض {len(self.errors)} صف'
+    
+    def write_errors(self, handle):
+        """كتابة الصفوف المرفوضة كملف CSV"""
+        writer = csv.writer(handle)
+        writer.writerow(['line', 'academic_id', 'error'])
+        writer.writerows(self.errors)
+
+
+# =============================================================================
+# قراءة الملف
+# =============================================================================
+
+def read_rows(handle, name):
+    """
+    صفوف الملف كقواميس (رقم السطر، القاموس) دون تحميل الملف كاملاً
+    handle ملف ثنائي مفتوح للقراءة
+    """
+    if name.lower().endswith('.csv'):
+        rows = csv.reader(io.TextIOWrapper(handle, encoding='utf-8-sig', newline=''))
+    elif name.lower().endswith('.xlsx'):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ImportFileError('مكتبة openpyxl غير مثبتة (مطلوبة لملفات XLSX)')
+        workbook = load_workbook(handle, read_only=True, data_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+    else:
+        raise ImportFileError('نوع الملف غير مدعوم (CSV أو XLSX فقط)')
+    
+    header = [str(cell or '').strip().lower() for cell in next(rows, [])]
+    if 'academic_id' not in header:
+        raise ImportFileError('عمود academic_id مطلوب في السطر الأول')
+    unknown = set(header) - set(COLUMNS) - {''}
+    if unknown:
+        raise ImportFileError(f"أعمدة غير معروفة: {', '.join(sorted(unknown))}")
+    
+    for line, row in enumerate(rows, start=2):
+        values = {
+            column: '' if value is None else str(value).strip()
+            for column, value in zip(header, row) if column
+        }
+        if any(values.values()):
+            yield line, values
+
+
+# =============================================================================
+# التحقق من الصفوف
+# =============================================================================
+
+class TaxonomyLookup:
+    """الأقسام والتخصصات في الذاكرة للتحقق دون استعلام لكل صف"""
+    
+    def __init__(self):
+        self.departments = {}
+        for pk, name in Department.objects.values_list('pk', 'name'):
+            self.departments[str(pk)] = self.departments[name.strip()] = pk
+        
+        self.specializations = {}
+        self.specialization_names = {}
+        for pk, name, department_id in Specialization.objects.values_list('pk', 'name', 'department_id'):
+            self.specializations[str(pk)] = (pk, department_id)
+            self.specializations[(department_id, name.strip())] = (pk, department_id)
+            self.specialization_names.setdefault(name.strip(), []).append((pk, department_id))
+    
+    def resolve(self, department, specialization):
+        """(department_id, specialization_id) أو ValueError برسالة الخطأ"""
+        department_id = None
+        if department:
+            department_id = self.departments.get(department)
+            if department_id is None:
+                raise ValueError(f'القسم غير موجود: {department}')
+        
+        if not specialization:
+            return department_id, None
+        
+        match = self.specializations.get(specialization) or self.specializations.get((department_id, specialization))
+        if match is None and department_id is None:
+            candidates = self.specialization_names.get(specialization, [])
+            if len(candidates) > 1:
+                raise ValueError(f'اسم التخصص مكرر في عدة أقسام، حدد القسم: {specialization}')
+            match = candidates[0] if candidates else None
+        if match is None:
+            raise ValueError(f'التخصص غير موجود: {specialization}')
+        
+        specialization_id, specialization_department = match
+        if department_id is not None and specialization_department != department_id:
+            raise ValueError(f'التخصص {specialization} لا يتبع القسم {department}')
+        return specialization_department, specialization_id
+
+
+def build_user(values, lookup):
+    """إنشاء كائن User (دون حفظ) من صف أو ValueError"""
+    academic_id = values.get('academic_id', '')
+    if not academic_id:
+        raise ValueError('الرقم الأكاديمي مطلوب')
+    
+    level = values.get('level') or None
+    if level is not None:
+        try:
+            level = int(float(level))
+        except ValueError:
+            level = None
+        if level not in LEVELS:
+            raise ValueError(f"المستوى غير صالح: {values['level']}")
+    
+    email = values.get('email', '')
+    if email:
+        try:
+            validate_email(email)
+        except ValidationError:
+            raise ValueError(f'البريد الإلكتروني غير صالح: {email}')
+    
+    department_id, specialization_id = lookup.resolve(
+        values.get('department', ''), values.get('specialization', '')
+    )
+    user = User(
+        academic_id=academic_id,
+        username=values.get('username') or academic_id,
+        first_name=values.get('first_name', ''),
+        last_name=values.get('last_name', ''),
+        email=email,
+        phone=values.get('phone') or None,
+        department_id=department_id,
+        specialization_id=specialization_id,
+        level=level,
+        role=User.Role.STUDENT,
+    )
+    # القيمة الأطول من العمود ترفض هنا كخطأ صف (PostgreSQL يرفض الدفعة كاملة بـ DataError)
+    for name in LENGTH_CHECKED_FIELDS:
+        field = User._meta.get_field(name)
+        if len(getattr(user, name) or '') > field.max_length:
+            raise ValueError(f'{field.verbose_name} أطول من المسموح ({field.max_length} حرفاً)')
+    user.directory_name = directory_name(user)
+    return user
+
+
+# =============================================================================
+# الاستيراد
+# =============================================================================
+
+def hash_pool(workers):
+    """
+    مجموعة عمليات لتجزئة كلمات المرور (تنشأ مرة واحدة لكل استيراد)
+    العمليات تبدأ بـ spawn لأن fork من عملية متعددة الخيوط (مثل العامل) غير آمن
+    """
+    if workers <= 1:
+        return nullcontext()
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup,
+    )
+
+
+def hash_passwords(passwords, pool=None):
+    """تجزئة كلمات المرور بالتوازي إن توفرت pool (None = كلمة مرور غير قابلة للاستخدام)"""
+    if pool is None or len(passwords) < 2:
+        return [make_password(password) for password in passwords]
+    return list(pool.map(make_password, passwords, chunksize=HASH_CHUNK_SIZE))
+
+
+def import_students(handle, name, default_password=None, batch_size=None, workers=None):
+    """
+    استيراد الطلاب من ملف CSV/XLSX وإرجاع ImportReport
+    كل دفعة في معاملة مستقلة، فالدفعات السابقة تبقى عند فشل لاحق
+    """
+    batch_size = batch_size or settings.STUDENT_IMPORT_BATCH_SIZE
+    workers = settings.STUDENT_IMPORT_HASH_WORKERS if workers is None else workers
+    lookup = TaxonomyLookup()
+    report = ImportReport()
+    seen = set()
+    
+    rows = read_rows(handle, name)
+    with hash_pool(workers) as pool:
+        while batch := list(islice(rows, batch_size)):
+            users = []
+            for line, values in batch:
+                try:
+                    user = build_user(values, lookup)
+                except ValueError as error:
+                    report.error(line, values.get('academic_id', ''), str(error))
+                    continue
+                if user.academic_id in seen:
+                    report.error(line, user.academic_id, 'الرقم الأكاديمي مكرر في الملف')
+                    continue
+                seen.add(user.academic_id)
+                user.import_line = line
+                user.import_password = values.get('password') or default_password
+                users.append(user)
+            
+            if users:
+                import_batch(users, report, pool)
+    
+    PlatformStats.mark_stale()
+    return report
+
+
+def import_batch(users, report, pool=None):
+    """إدخال/تحديث دفعة: استعلامان للتحقق ثم bulk_create واحد"""
+    academic_ids = [user.academic_id for user in users]
+    existing = {
+        academic_id: (pk, username, role)
+        for academic_id, pk, username, role in User.objects.filter(
+            academic_id__in=academic_ids
+        ).values_list('academic_id', 'pk', 'username', 'role')
+    }
+    taken = set(
+        User.objects.filter(username__in=[user.username for user in users])
+        .values_list('username', flat=True)
+    )
+    
+    accepted, new_users, updated_ids = [], [], []
+    for user in users:
+        if user.academic_id in existing:
+            pk, username, role = existing[user.academic_id]
+            if role != User.Role.STUDENT:
+                report.error(user.import_line, user.academic_id, 'الرقم الأكاديمي مستخدم لحساب غير طالب')
+                continue
+            user.username = username
+            updated_ids.append(pk)
+        elif user.username in taken:
+            report.error(user.import_line, user.academic_id, f'اسم المستخدم مستخدم مسبقاً: {user.username}')
+            continue
+        else:
+            taken.add(user.username)
+            new_users.append(user)
+        accepted.append(user)
+    
+    # التجزئة للطلاب الجدد فقط (الموجودون يحتفظون بكلمات مرورهم)
+    hashes = hash_passwords([user.import_password for user in new_users], pool)
+    for user, password in zip(new_users, hashes):
+        user.password = password
+    
+    try:
+        with transaction.atomic():
+            upsert(accepted)
+            # التحديث الجماعي لا يمر بإشارات الحفظ
+            invalidate_users(updated_ids)
+    except (IntegrityError, DataError):
+        # حساب أضيف بعد التحقق (تسجيل أو استيراد متزامن) أو قيمة رفضتها قاعدة
+        # البيانات: إعادة الدفعة صفاً صفاً ورفض الصفوف المتعارضة فقط
+        import_rows(accepted, report, existing)
+        return
+    report.created += len(new_users)
+    report.updated += len(updated_ids)
+
+
+def upsert(users):
+    User.objects.bulk_create(
+        users,
+        update_conflicts=True,
+        unique_fields=['academic_id'],
+        update_fields=UPDATE_FIELDS,
+    )
+
+
+def import_rows(users, report, existing):
+    """إدخال/تحديث كل صف في معاملة مستقلة بعد فشل إدخال الدفعة"""
+    for user in users:
+        try:
+            with transaction.atomic():
+                upsert([user])
+                if user.academic_id in existing:
+                    invalidate_users([existing[user.academic_id][0]])
+        except IntegrityError:
+            report.error(
+                user.import_line, user.academic_id,
+                f'تعارض مع حساب أضيف أثناء الاستيراد (اسم المستخدم {user.username})'
+            )
+            continue
+        except DataError as error:
+            report.error(user.import_line, user.academic_id, f'قيمة غير صالحة: {error}')
+            continue
+        if user.academic_id in existing:
+            report.updated += 1
+        else:
+            report.created += 1
@@ -0,0 +1,182 @@
+"""
+طابور المهام الخلفية
+====================
+طابور بسيط في قاعدة البيانات للأعمال البطيئة (توليد الذكاء الاصطناعي،
+استخراج النصوص، التسجيل الجماعي، التنظيف...) بحيث يضيف الـ View مهمة
+باستعلام INSERT واحد ويعود فوراً، وينفذها الأمر run_worker.
+
+الاستخدام:
+    from academy.jobs import job, enqueue
+    
+    @job
+    def refresh_something(course_id):
+        ...
+    
+    enqueue(refresh_something, course.pk, priority=5)
+
+- PostgreSQL: سحب المهام بـ SELECT ... FOR UPDATE SKIP LOCKED، وإيقاظ العمال
+  فوراً عبر LISTEN/NOTIFY.
+- SQLite وغيره: سحب متفائل لكل صف واستطلاع دوري (polling).
+"""
+
+import importlib
+import logging
+import select
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction, close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'academy_jobs'
+
+registry = {}
+
+
+def job(func):
+    """تسجيل دالة كمهمة خلفية باسمها الكامل"""
+    registry[f'{func.__module__}.{func.__qualname__}'] = func
+    return func
+
+
+def resolve(name):
+    """إيجاد دالة المهمة من اسمها (مع استيراد وحدتها عند الحاجة)"""
+    if name not in registry:
+        module_name = name.rsplit('.', 1)[0]
+        importlib.import_module(module_name)
+    return registry[name]
+
+
+def enqueue(func, *args, priority=0, run_at=None, max_attempts=None, **kwargs):
+    """إضافة مهمة إلى الطابور (INSERT واحد)"""
+    name = func if isinstance(func, str) else f'{func.__module__}.{func.__qualname__}'
+    queued = Job.objects.create(
+        name=name,
+        args=list(args),
+        kwargs=kwargs,
+        priority=priority,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+    
+    if connection.vendor == 'postgresql':
+        transaction.on_commit(notify_workers)
+    return queued
+
+
+def notify_workers():
+    with connection.cursor() as cursor:
+        cursor.execute(f'NOTIFY {NOTIFY_CHANNEL}')
+
+
+def claim(worker_id, limit):
+    """حجز حتى limit مهمة جاهزة لهذا العامل وإرجاع معرفاتها"""
+    now = timezone.now()
+    ready = Job.objects.filter(
+        status=Job.Status.QUEUED, run_at__lte=now
+    ).order_by('-priority', 'run_at', 'pk')
+    
+    claimed_fields = {
+        'status': Job.Status.RUNNING,
+        'locked_by': worker_id,
+        'locked_at': now,
+        'attempts': F('attempts') + 1,
+    }
+    
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                ready.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit]
+            )
+            Job.objects.filter(pk__in=ids).update(**claimed_fields)
+        return ids
+    
+    # بدون SKIP LOCKED: حجز متفائل لكل صف (ينجح عامل واحد فقط)
+    ids = []
+    for pk in ready.values_list('pk', flat=True)[:limit]:
+        if Job.objects.filter(pk=pk, status=Job.Status.QUEUED).update(**claimed_fields):
+            ids.append(pk)
+    return ids
+
+
+def retry_delay(attempts):
+    """الانتظار قبل إعادة المحاولة (تزايد أسي حتى JOB_RETRY_MAX_DELAY)"""
+    delay = settings.JOB_RETRY_BASE_DELAY * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(delay, settings.JOB_RETRY_MAX_DELAY))
+
+
+def execute(job_id):
+    """تنفيذ مهمة محجوزة وتسجيل نتيجتها"""
+    close_old_connections()
+    try:
+        queued = Job.objects.get(pk=job_id)
+        try:
+            resolve(queued.name)(*queued.args, **queued.kwargs)
+        except Exception:
+            error = traceback.format_exc()
+            logger.exception('فشلت المهمة %s (%s)', queued.pk, queued.name)
+            if queued.attempts < queued.max_attempts:
+                Job.objects.filter(pk=job_id).update(
+                    status=Job.Status.QUEUED,
+                    run_at=timezone.now() + retry_delay(queued.attempts),
+                    last_error=error,
+                    locked_by='',
+                )
+            else:
+                Job.objects.filter(pk=job_id).update(
+                    status=Job.Status.FAILED,
+                    last_error=error,
+                    finished_at=timezone.now(),
+                )
+            return False
+        
+        Job.objects.filter(pk=job_id).update(
+            status=Job.Status.DONE, finished_at=timezone.now()
+        )
+        return True
+    finally:
+        close_old_connections()
+
+
+def requeue_stale(timeout):
+    """
+    إعادة المهام التي توقف عاملها (مثلاً بعد انهياره) إلى الطابور، أو تعليمها
+    كفاشلة إن استنفدت محاولاتها (مهمة تسقط العامل في كل مرة لا تعاد للأبد)
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.Status.RUNNING, locked_at__lt=now - timedelta(seconds=timeout)
+    )
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.Status.FAILED,
+        last_error='توقف العامل أثناء التنفيذ في المحاولة الأخيرة',
+        locked_by='',
+        finished_at=now,
+    )
+    return stale.update(status=Job.Status.QUEUED, locked_by='')
+
+
+def wait_for_jobs(timeout):
+    """
+    انتظار مهام جديدة: LISTEN/NOTIFY على PostgreSQL (psycopg2)،
+    وإلا انتظار بسيط حتى الاستطلاع التالي
+    """
+    if connection.vendor == 'postgresql':
+        connection.ensure_connection()
+        raw = connection.connection
+        if hasattr(raw, 'notifies') and hasattr(raw, 'poll'):
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+            if select.select([raw], [], [], timeout) != ([], [], []):
+                raw.poll()
+                raw.notifies.clear()
+            return
+    time.sleep(timeout)
@@ -0,0 +1,100 @@
+"""
+أمر لقياس زمن استعلامات لوحات التحكم بالتتابع مقابل التوازي
+"""
+
+import asyncio
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from academy.dashboards import aevaluate, evaluate, student_queries, teacher_queries, admin_queries
+from academy.models import User
+from academy.stats import get_platform_stats
+from academy.management.commands.loadtest import percentile
+
+
+def role_queries(user):
+    if user.is_student:
+        return student_queries(user)
+    if user.is_teacher:
+        return teacher_queries(user)
+    return admin_queries(get_platform_stats())
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def with_latency(queries, latency):
+    """إضافة زمن ثابت لكل استعلام (محاكاة قاعدة بيانات عبر الشبكة)"""
+    def delayed(query):
+        def run():
+            time.sleep(latency)
+            return query()
+        return run
+    return {name: delayed(query) for name, query in queries.items()}
+
+
+async def measure_concurrent(queries, iterations):
+    """زمن aevaluate داخل حلقة أحداث واحدة (كما تحت ASGI)"""
+    await aevaluate(queries)
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await aevaluate(queries)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+class Command(BaseCommand):
+    help = 'قياس زمن استعلامات لوحة التحكم لكل دور: بالتتابع (WSGI) وبالتوازي (ASGI) وأبطأ استعلام منفرد'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='عدد مرات القياس لكل دور')
+        parser.add_argument('--user', action='append', default=[], help='اسم مستخدم محدد (يتكرر)؛ افتراضياً أول مستخدم من كل دور')
+        parser.add_argument('--latency', type=float, default=0,
+                            help='زمن إضافي بالمللي ثانية لكل استعلام (محاكاة قاعدة بيانات بعيدة)')
+    
+    def handle(self, *args, **options):
+        if settings.DASHBOARD_QUERY_WORKERS <= 1:
+            raise CommandError('DASHBOARD_QUERY_WORKERS يجب أن يكون أكبر من 1 للقياس بالتوازي')
+        
+        if options['user']:
+            users = list(User.objects.filter(username__in=options['user']))
+        else:
+            users = [
+                user for role in User.Role.values
+                if (user := User.objects.filter(role=role, is_active=True).order_by('pk').first())
+            ]
+        if not users:
+            raise CommandError('لا يوجد مستخدمون للقياس')
+        
+        iterations = options['iterations']
+        header = f"{'المستخدم':<20} {'الدور':<8} {'تتابع p50':>10} {'توازي p50':>10} {'أبطأ استعلام':>12} {'المجموع':>9}"
+        self.stdout.write(header)
+        
+        for user in users:
+            queries = role_queries(user)
+            if options['latency']:
+                queries = with_latency(queries, options['latency'] / 1000)
+            
+            # تسخين الاتصالات
+            evaluate(queries)
+            sequential = [timed(lambda: evaluate(queries)) for _ in range(iterations)]
+            concurrent = asyncio.run(measure_concurrent(queries, iterations))
+            slowest, total = [], []
+            for _ in range(iterations):
+                single = [timed(query) for query in queries.values()]
+                slowest.append(max(single))
+                total.append(sum(single))
+            connection.close()
+            
+            p50 = [percentile(sorted(values), 50) * 1000 for values in (sequential, concurrent, slowest, total)]
+            self.stdout.write(
+                f'{user.username:<20} {user.role:<8} '
+                f'{p50[0]:>8.2f}ms {p50[1]:>8.2f}ms {p50[2]:>10.2f}ms {p50[3]:>7.2f}ms'
+            )
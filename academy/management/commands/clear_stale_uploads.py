@@ -0,0 +1,39 @@
+"""
+أمر لحذف جلسات الرفع المجزأ المتروكة
+"""
+
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from academy.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = 'حذف جلسات الرفع المجزأ التي لم تُحدَّث منذ مدة وملفاتها المؤقتة والأجزاء المرحلية المتروكة'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=24,
+            help='حذف الجلسات التي لم يُرفع لها جزء منذ هذا العدد من الساعات'
+        )
+    
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = UploadSession.objects.filter(updated_at__lt=cutoff)
+        
+        count = 0
+        for session in stale.iterator():
+            session.discard()
+            count += 1
+        
+        # أجزاء مرحلية بقيت من طلبات توقفت عمليتها قبل حذفها
+        for staged in Path(settings.CHUNKED_UPLOAD_DIR).glob('*.chunk'):
+            if staged.stat().st_mtime < cutoff.timestamp():
+                staged.unlink(missing_ok=True)
+        
+        self.stdout.write(self.style.SUCCESS(f'✅ تم حذف {count} جلسة رفع'))
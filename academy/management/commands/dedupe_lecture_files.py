@@ -0,0 +1,32 @@
+"""
+أمر لنقل ملفات المحاضرات القديمة إلى التخزين حسب المحتوى
+"""
+
+from django.core.management.base import BaseCommand
+from academy.models import LectureFile
+
+
+class Command(BaseCommand):
+    help = 'نقل ملفات المحاضرات المرفوعة قبل التخزين حسب المحتوى إلى نسخ مشتركة دون تكرار'
+    
+    def handle(self, *args, **options):
+        legacy = LectureFile.objects.filter(content_digest='').exclude(file='')
+        
+        moved = 0
+        for lecture in legacy.iterator(chunk_size=200):
+            storage = lecture.file.storage
+            old_name = lecture.file.name
+            if not storage.exists(old_name):
+                self.stdout.write(self.style.WARNING(f'  ! الملف غير موجود: {old_name}'))
+                continue
+            
+            with storage.open(old_name, 'rb') as handle:
+                lecture.file = storage.save(old_name, handle)
+            lecture.original_name = lecture.original_name or old_name.rsplit('/', 1)[-1]
+            lecture.save()
+            
+            # الملفات القديمة ليس لها FileBlob، فتحذف هنا بعد نقلها
+            storage.delete(old_name)
+            moved += 1
+        
+        self.stdout.write(self.style.SUCCESS(f'✅ تم نقل {moved} ملف'))
@@ -0,0 +1,23 @@
+"""
+أمر لكتابة العدادات المؤجلة إلى قاعدة البيانات
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from academy.counters import counters
+
+
+class Command(BaseCommand):
+    help = 'كتابة الزيادات المعلقة في العدادات المؤجلة (مثل عدد التحميلات) إلى قاعدة البيانات'
+    
+    def handle(self, *args, **options):
+        if settings.COUNTER_BUFFER_BACKEND == 'local':
+            # الزيادات في ذاكرة كل عامل ويكتبها خيطه الخلفي، ولا يراها هذا الأمر
+            self.stdout.write(self.style.WARNING(
+                "⚠️ COUNTER_BUFFER_BACKEND='local': الزيادات المعلقة في ذاكرة كل عامل "
+                "وتكتب منه دورياً، ولا يمكن كتابتها من عملية أخرى"
+            ))
+            return
+        
+        written = counters.flush()
+        self.stdout.write(self.style.SUCCESS(f'✅ تمت كتابة العدادات المعلقة لـ {written} صف'))
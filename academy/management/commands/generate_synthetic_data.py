@@ -0,0 +1,273 @@
+"""
+أمر لتوليد بيانات جامعة اصطناعية لاختبارات الحجم والأداء
+"""
+
+import io
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from academy.directory import directory_name
+from academy.models import (
+    User, Department, Specialization, Course, Enrollment,
+    LectureFile, Notification, InboxEntry, FileBlob, PlatformStats
+)
+from academy.search import get_backend
+from academy.storage import lecture_storage
+
+
+FIRST_NAMES = [
+    'محمد', 'أحمد', 'علي', 'عمر', 'خالد', 'يوسف', 'إبراهيم', 'عبدالله',
+    'فاطمة', 'مريم', 'عائشة', 'سارة', 'نورة', 'هدى', 'ليلى', 'زينب',
+]
+LAST_NAMES = [
+    'العلي', 'الحسن', 'السالم', 'القحطاني', 'الشهري', 'الزهراني',
+    'العتيبي', 'الحربي', 'المطيري', 'الدوسري', 'الغامدي', 'اليمني',
+]
+SUBJECTS = [
+    'البرمجة', 'قواعد البيانات', 'الشبكات', 'الخوارزميات', 'نظم التشغيل',
+    'الذكاء الاصطناعي', 'أمن المعلومات', 'هندسة البرمجيات', 'الرياضيات المتقطعة',
+]
+
+# محتوى صغير ثابت لكل نوع ملف (نسخة واحدة مخزنة لكل نوع بفضل التخزين حسب المحتوى)
+PLACEHOLDERS = {
+    LectureFile.FileType.PDF: ('placeholder.pdf', b'%PDF-1.4\n% S-ACM placeholder\n%%EOF\n'),
+    LectureFile.FileType.POWERPOINT: ('placeholder.pptx', b'PK\x03\x04 S-ACM placeholder'),
+    LectureFile.FileType.WORD: ('placeholder.docx', b'PK\x03\x04 S-ACM placeholder document'),
+    LectureFile.FileType.VIDEO: ('placeholder.mp4', b'\x00\x00\x00\x18ftypmp42 S-ACM placeholder'),
+}
+
+# تاريخ أساس ثابت حتى تتطابق البيانات بين التشغيلات بنفس البذرة
+EPOCH = datetime(2025, 9, 1, 8, 0, tzinfo=dt_timezone.utc)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'توليد بيانات اصطناعية (أقسام، مستخدمون، مقررات، تسجيلات، ملفات، إشعارات) لاختبار الأداء'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42, help='بذرة التوليد (نفس البذرة = نفس البيانات)')
+        parser.add_argument('--prefix', default='syn', help='بادئة أسماء المستخدمين والرموز (يجب أن تختلف بين التشغيلات على نفس القاعدة)')
+        parser.add_argument('--departments', type=int, default=5)
+        parser.add_argument('--specializations', type=int, default=4, help='عدد التخصصات لكل قسم')
+        parser.add_argument('--teachers', type=int, default=2000)
+        parser.add_argument('--students', type=int, default=50000)
+        parser.add_argument('--courses-per-term', type=int, default=3,
+                            help='عدد المقررات لكل تخصص ومستوى وفصل')
+        parser.add_argument('--enrollments-per-student', type=int, default=20)
+        parser.add_argument('--files-per-course', type=int, default=10)
+        parser.add_argument('--notifications', type=int, default=500,
+                            help='عدد إشعارات المقررات (توزع على جميع طلاب المقرر)')
+        parser.add_argument('--password', default='password123', help='كلمة المرور لجميع المستخدمين المولدين')
+        parser.add_argument('--batch-size', type=int, default=5000)
+    
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.prefix = options['prefix']
+        self.batch_size = options['batch_size']
+        started = timezone.now()
+        
+        # تجزئة كلمة المرور مرة واحدة بدلاً من مرة لكل مستخدم
+        self.password = make_password(options['password'])
+        
+        with transaction.atomic():
+            specializations = self.create_taxonomy(options['departments'], options['specializations'])
+            teachers = self.create_users(User.Role.TEACHER, options['teachers'], specializations)
+            courses = self.create_courses(specializations, teachers, options['courses_per_term'])
+            students = self.create_users(User.Role.STUDENT, options['students'], specializations)
+            self.create_enrollments(students, courses, options['enrollments_per_student'])
+            files = self.create_files(courses, options['files_per_course'])
+            self.create_notifications(courses, options['notifications'])
+            
+            self.stdout.write('جاري تحديث العدادات وفهرس البحث...')
+            Course.objects.filter(pk__in=[course.pk for course in courses]).recount_counters()
+            backend = get_backend()
+            for instance in [*courses, *files]:
+                backend.index(instance)
+            PlatformStats.mark_stale()
+        
+        elapsed = (timezone.now() - started).total_seconds()
+        self.stdout.write(self.style.SUCCESS(f'✅ تم توليد البيانات في {elapsed:.0f} ثانية'))
+    
+    def insert(self, model, objects):
+        """إدخال دفعات عبر bulk_create وإرجاع الكائنات مع مفاتيحها"""
+        created = []
+        for batch in batched(objects, self.batch_size):
+            created += model.objects.bulk_create(batch)
+        return created
+    
+    def create_taxonomy(self, departments, per_department):
+        rng = self.rng
+        created = self.insert(Department, (
+            Department(name=f'قسم {self.prefix} {i + 1}', description='قسم مولد للاختبار')
+            for i in range(departments)
+        ))
+        specializations = self.insert(Specialization, (
+            Specialization(name=f'{rng.choice(SUBJECTS)} {j + 1}', department=department)
+            for department in created for j in range(per_department)
+        ))
+        self.stdout.write(f'  ✓ {len(created)} قسم و {len(specializations)} تخصص')
+        return specializations
+    
+    def create_users(self, role, count, specializations):
+        rng = self.rng
+        letter = 'T' if role == User.Role.TEACHER else 'S'
+        
+        def users():
+            for i in range(count):
+                specialization = rng.choice(specializations)
+                user = User(
+                    username=f'{self.prefix}_{letter.lower()}{i}',
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    email=f'{self.prefix}.{letter.lower()}{i}@example.edu',
+                    password=self.password,
+                    role=role,
+                    academic_id=f'{self.prefix.upper()}{letter}{i:07d}',
+                    department_id=specialization.department_id,
+                    specialization=specialization,
+                    level=rng.randint(1, 4) if role == User.Role.STUDENT else None,
+                    date_joined=EPOCH - timedelta(days=rng.randint(0, 1500)),
+                )
+                user.directory_name = directory_name(user)
+                yield user
+        
+        created = self.insert(User, users())
+        self.stdout.write(f'  ✓ {len(created)} {User.Role(role).label}')
+        return created
+    
+    def create_courses(self, specializations, teachers, per_term):
+        rng = self.rng
+        semesters = [Course.Semester.FIRST, Course.Semester.SECOND]
+        courses = self.insert(Course, (
+            Course(
+                name=f'{rng.choice(SUBJECTS)} {level}{index + 1}',
+                code=f'{self.prefix.upper()}{specialization.pk}-{level}{semester_index}{index}',
+                specialization=specialization,
+                level=level,
+                semester=semester,
+                teacher=rng.choice(teachers),
+            )
+            for specialization in specializations
+            for level in range(1, 5)
+            for semester_index, semester in enumerate(semesters)
+            for index in range(per_term)
+        ))
+        self.stdout.write(f'  ✓ {len(courses)} مقرر')
+        return courses
+    
+    def create_enrollments(self, students, courses, per_student):
+        """تسجيل كل طالب في مقررات من تخصصه (COPY على PostgreSQL)"""
+        rng = self.rng
+        by_specialization = {}
+        for course in courses:
+            by_specialization.setdefault(course.specialization_id, []).append(course.pk)
+        
+        def rows():
+            for student in students:
+                candidates = by_specialization[student.specialization_id]
+                for course_id in rng.sample(candidates, min(per_student, len(candidates))):
+                    yield student.pk, course_id, rng.random() > 0.05
+        
+        columns = ['student_id', 'course_id', 'is_active']
+        if connection.vendor == 'postgresql':
+            # COPY لا يمر بـ auto_now_add فنمرر وقت التسجيل صراحة
+            now = timezone.now()
+            total = self.copy(
+                Enrollment, [*columns, 'enrolled_at'], (row + (now,) for row in rows())
+            )
+        else:
+            total = len(self.insert(Enrollment, (
+                Enrollment(**dict(zip(columns, row))) for row in rows()
+            )))
+        self.stdout.write(f'  ✓ {total} تسجيل')
+    
+    def copy(self, model, columns, rows):
+        """إدخال دفعات عبر COPY ... FROM STDIN (psycopg2)"""
+        table = model._meta.db_table
+        sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+        total = 0
+        with connection.cursor() as cursor:
+            for batch in batched(rows, self.batch_size * 10):
+                buffer = io.StringIO()
+                for row in batch:
+                    buffer.write('\t'.join(str(value) for value in row) + '\n')
+                buffer.seek(0)
+                cursor.cursor.copy_expert(sql, buffer)
+                total += len(batch)
+        return total
+    
+    def create_files(self, courses, per_course):
+        """ملفات محاضرات تشير إلى نسخة صغيرة واحدة لكل نوع"""
+        rng = self.rng
+        storage = lecture_storage()
+        placeholders = {}
+        for file_type, (name, content) in PLACEHOLDERS.items():
+            stored = storage.save(name, ContentFile(content))
+            placeholders[file_type] = (stored, len(content))
+        
+        def files():
+            for course in courses:
+                for index in range(per_course):
+                    file_type = rng.choice(list(placeholders))
+                    stored, size = placeholders[file_type]
+                    yield LectureFile(
+                        title=f'المحاضرة {index + 1}: {rng.choice(SUBJECTS)}',
+                        file=stored,
+                        file_type=file_type,
+                        file_size=size,
+                        content_digest=storage.digest_for(stored),
+                        original_name=PLACEHOLDERS[file_type][0],
+                        course=course,
+                        chapter=f'الفصل {index // 3 + 1}',
+                        uploaded_by_id=course.teacher_id,
+                        download_count=rng.randint(0, 300),
+                        is_active=rng.random() > 0.05,
+                    )
+        
+        created = self.insert(LectureFile, files())
+        
+        # uploaded_at من نوع auto_now_add فيتجاهل bulk_create قيمته، لذا يوزع بعد الإدخال
+        for lecture in created:
+            lecture.uploaded_at = EPOCH + timedelta(days=rng.randint(0, 120), minutes=rng.randint(0, 600))
+        LectureFile.objects.bulk_update(created, ['uploaded_at'], batch_size=self.batch_size)
+        
+        # عدد مراجع كل نسخة = عدد الملفات التي تشير إليها
+        for file_type, (stored, size) in placeholders.items():
+            references = sum(1 for lecture in created if lecture.file.name == stored)
+            blob, _ = FileBlob.objects.get_or_create(
+                name=stored,
+                defaults={'digest': storage.digest_for(stored), 'size': size, 'ref_count': 0}
+            )
+            FileBlob.objects.filter(pk=blob.pk).update(ref_count=blob.ref_count + references)
+        
+        self.stdout.write(f'  ✓ {len(created)} ملف محاضرة')
+        return created
+    
+    def create_notifications(self, courses, count):
+        rng = self.rng
+        notifications = self.insert(Notification, (
+            Notification(
+                title=f'إشعار {i + 1}',
+                content='إشعار مولد للاختبار',
+                notification_type=Notification.NotificationType.COURSE,
+                sender_id=course.teacher_id,
+                course=course,
+            )
+            for i, course in enumerate(rng.choice(courses) for _ in range(count))
+        ))
+        # التوزيع على صناديق الطلاب باستعلام INSERT ... SELECT لكل إشعار
+        for notification in notifications:
+            InboxEntry.objects.deliver(notification)
+        self.stdout.write(f'  ✓ {len(notifications)} إشعار')
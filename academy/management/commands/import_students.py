@@ -0,0 +1,40 @@
+"""
+أمر لاستيراد الطلاب جماعياً من ملف CSV أو XLSX
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from academy.imports import ImportFileError, import_students
+
+
+class Command(BaseCommand):
+    help = 'استيراد الطلاب من ملف CSV/XLSX (إنشاء أو تحديث حسب الرقم الأكاديمي) مع تقرير أخطاء لكل صف'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='مسار ملف CSV أو XLSX')
+        parser.add_argument('--default-password',
+                            help='كلمة المرور للصفوف دون عمود password (بدونها تكون كلمة المرور غير قابلة للاستخدام)')
+        parser.add_argument('--batch-size', type=int, help='عدد الصفوف في كل دفعة')
+        parser.add_argument('--workers', type=int, help='عدد العمليات لتجزئة كلمات المرور')
+        parser.add_argument('--errors', help='حفظ الصفوف المرفوضة في ملف CSV')
+    
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as handle:
+                report = import_students(
+                    handle, options['path'],
+                    default_password=options['default_password'],
+                    batch_size=options['batch_size'],
+                    workers=options['workers'],
+                )
+        except (OSError, ImportFileError) as error:
+            raise CommandError(str(error))
+        
+        for line, academic_id, message in report.errors:
+            self.stdout.write(self.style.WARNING(f'  ✗ السطر {line} ({academic_id}): {message}'))
+        
+        if options['errors'] and report.errors:
+            with open(options['errors'], 'w', encoding='utf-8', newline='') as errors:
+                report.write_errors(errors)
+            self.stdout.write(f"تم حفظ الأخطاء في {options['errors']}")
+        
+        self.stdout.write(self.style.SUCCESS(f'✅ {report.summary()}'))
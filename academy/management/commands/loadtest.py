@@ -0,0 +1,277 @@
+"""
+أمر لاختبار الحمل على صفحات النظام وقياس زمن الاستجابة
+"""
+
+import http.cookiejar
+import json
+import random
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from academy.models import User, Department
+
+
+# الصفحات لكل دور مع وزن كل صفحة في الحمل
+TARGETS = {
+    User.Role.STUDENT: [('dashboard', 5), ('get_specializations', 3), ('login', 1)],
+    User.Role.TEACHER: [('dashboard', 5), ('get_specializations', 3), ('login', 1)],
+    User.Role.ADMIN: [
+        ('dashboard', 3), ('login', 1),
+        ('admin:academy_user_changelist', 2), ('admin:academy_course_changelist', 2),
+        ('admin:academy_enrollment_changelist', 2), ('admin:academy_lecturefile_changelist', 2),
+    ],
+}
+
+
+def percentile(sorted_values, q):
+    """النسبة المئوية q (0-100) من قائمة مرتبة"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+# =============================================================================
+# جلسات المستخدمين (عميل الاختبار أو خادم حقيقي)
+# =============================================================================
+
+class TestClientSession:
+    """جلسة عبر django.test.Client داخل نفس العملية"""
+    
+    def __init__(self, user=None):
+        self.client = Client(raise_request_exception=False)
+        if user is not None:
+            self.client.force_login(user)
+    
+    def get(self, path):
+        return self.client.get(path).status_code
+    
+    def login(self, username, password):
+        return self.client.post(reverse('login'), {'username': username, 'password': password}).status_code
+
+
+class LiveSession:
+    """جلسة HTTP حقيقية مع ملفات تعريف الارتباط (CSRF والجلسة)"""
+    
+    def __init__(self, base_url, user=None, password=None):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), NoRedirect
+        )
+        if user is not None:
+            self.login(user.username, password)
+    
+    def request(self, path, data=None, headers=None):
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers or {})
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+    
+    def get(self, path):
+        return self.request(path)
+    
+    def login(self, username, password):
+        path = reverse('login')
+        self.get(path)
+        token = next((c.value for c in self.cookies if c.name == settings.CSRF_COOKIE_NAME), '')
+        data = urllib.parse.urlencode({
+            'username': username, 'password': password, 'csrfmiddlewaretoken': token,
+        }).encode()
+        return self.request(path, data, {'Referer': self.base_url + path, 'X-CSRFToken': token})
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """قياس الطلب نفسه دون تتبع التوجيه (مثل 302 بعد تسجيل الدخول)"""
+    
+    def redirect_request(self, *args, **kwargs):
+        return None
+    
+    def http_error_302(self, request, response, code, message, headers):
+        return response
+    
+    http_error_301 = http_error_303 = http_error_307 = http_error_308 = http_error_302
+
+
+# =============================================================================
+# الأمر
+# =============================================================================
+
+class Command(BaseCommand):
+    help = 'اختبار حمل على لوحات التحكم وتسجيل الدخول وقوائم لوحة الإدارة مع تقرير p50/p95/p99'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='عنوان خادم حقيقي (مثل http://localhost:8000)؛ بدونه يستخدم عميل الاختبار')
+        parser.add_argument('--concurrency', type=int, default=8, help='عدد الخيوط (مستخدمون متزامنون)')
+        parser.add_argument('--duration', type=float, default=30, help='مدة الاختبار بالثواني')
+        parser.add_argument('--users', type=int, default=10, help='عدد المستخدمين المختارين من كل دور')
+        parser.add_argument('--password', default='password123', help='كلمة مرور المستخدمين المختارين')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='حفظ النتائج بصيغة JSON')
+        parser.add_argument('--compare', help='ملف نتائج سابق للمقارنة والتنبيه على التراجع')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='نسبة التراجع المسموحة في p95 وعدد الطلبات/ثانية (0.2 = 20%%)')
+    
+    def handle(self, *args, **options):
+        self.options = options
+        rng = random.Random(options['seed'])
+        
+        users = self.sample_users(rng)
+        if not users:
+            raise CommandError('لا يوجد مستخدمون نشطون للاختبار (استخدم generate_synthetic_data)')
+        self.department_ids = list(Department.objects.values_list('pk', flat=True)) or [0]
+        
+        mode = 'live' if options['url'] else 'test-client'
+        self.stdout.write(
+            f"جاري الاختبار ({mode}) بـ {options['concurrency']} خيط لمدة {options['duration']} ثانية..."
+        )
+        
+        if options['url']:
+            results = self.run(users, rng)
+        else:
+            # عميل الاختبار يستخدم المضيف testserver
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                results = self.run(users, rng)
+        
+        report = {
+            'started_at': timezone.now().isoformat(),
+            'mode': mode,
+            'url': options['url'],
+            'concurrency': options['concurrency'],
+            'duration': options['duration'],
+            'results': results,
+        }
+        self.print_report(results)
+        
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+            self.stdout.write(f"تم حفظ النتائج في {options['output']}")
+        
+        if options['compare']:
+            self.compare(results, options['compare'], options['threshold'])
+    
+    def sample_users(self, rng):
+        """اختيار عينة ثابتة (حسب البذرة) من كل دور"""
+        users = []
+        for role in TARGETS:
+            queryset = User.objects.filter(role=role, is_active=True)
+            if role == User.Role.ADMIN:
+                queryset = queryset.filter(is_staff=True)
+            ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+            chosen = rng.sample(ids, min(self.options['users'], len(ids)))
+            users += list(User.objects.filter(pk__in=chosen))
+        return users
+    
+    def new_session(self, user=None):
+        if self.options['url']:
+            return LiveSession(self.options['url'], user, self.options['password'])
+        return TestClientSession(user)
+    
+    def run(self, users, rng):
+        concurrency = self.options['concurrency']
+        deadline = time.monotonic() + self.options['duration']
+        assignments = [(users[i % len(users)], rng.randrange(2 ** 32)) for i in range(concurrency)]
+        
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(lambda args: self.worker(*args, deadline), assignments))
+        elapsed = time.monotonic() - start
+        
+        merged = {}
+        for worker_samples in samples:
+            for key, (latencies, errors) in worker_samples.items():
+                entry = merged.setdefault(key, ([], 0))
+                merged[key] = (entry[0] + latencies, entry[1] + errors)
+        
+        results = {}
+        for (name, role), (latencies, errors) in sorted(merged.items()):
+            latencies.sort()
+            results[f'{name}|{role}'] = {
+                'url_name': name,
+                'role': role,
+                'requests': len(latencies),
+                'errors': errors,
+                'rps': round(len(latencies) / elapsed, 2),
+                'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            }
+        return results
+    
+    def worker(self, user, seed, deadline):
+        """حلقة مستخدم واحد حتى انتهاء المدة"""
+        rng = random.Random(seed)
+        names, weights = zip(*TARGETS[user.role])
+        samples = {}
+        try:
+            session = self.new_session(user)
+            while time.monotonic() < deadline:
+                name = rng.choices(names, weights)[0]
+                start = time.perf_counter()
+                if name == 'login':
+                    # جلسة جديدة حتى لا تتأثر جلسة المستخدم الحالية
+                    anonymous = self.new_session()
+                    start = time.perf_counter()
+                    status = anonymous.login(user.username, self.options['password'])
+                    ok = status == 302
+                else:
+                    path = reverse(name)
+                    if name == 'get_specializations':
+                        path += f'?department_id={rng.choice(self.department_ids)}'
+                    status = session.get(path)
+                    ok = status < 400
+                elapsed = time.perf_counter() - start
+                
+                latencies, errors = samples.get((name, user.role), ([], 0))
+                latencies.append(elapsed)
+                samples[(name, user.role)] = (latencies, errors + (not ok))
+        finally:
+            connection.close()
+        return samples
+    
+    def print_report(self, results):
+        header = f"{'url_name':<40} {'role':<8} {'req':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for result in results.values():
+            self.stdout.write(
+                f"{result['url_name']:<40} {result['role']:<8} {result['requests']:>7} "
+                f"{result['errors']:>5} {result['rps']:>8} {result['p50_ms']:>8} "
+                f"{result['p95_ms']:>8} {result['p99_ms']:>8}"
+            )
+    
+    def compare(self, results, baseline_path, threshold):
+        """مقارنة بنتائج سابقة: تراجع p95 أو عدد الطلبات/ثانية بأكثر من threshold"""
+        with open(baseline_path, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        
+        regressions = []
+        for key, result in results.items():
+            before = baseline.get(key)
+            if not before:
+                continue
+            if result['p95_ms'] > before['p95_ms'] * (1 + threshold):
+                regressions.append(f"{key}: p95 {before['p95_ms']} → {result['p95_ms']} ms")
+            if result['rps'] < before['rps'] * (1 - threshold):
+                regressions.append(f"{key}: rps {before['rps']} → {result['rps']}")
+        
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(f'  ✗ {line}'))
+            raise CommandError(f'تراجع في الأداء في {len(regressions)} قياس مقارنة بـ {baseline_path}')
+        self.stdout.write(self.style.SUCCESS(f'✅ لا يوجد تراجع مقارنة بـ {baseline_path}'))
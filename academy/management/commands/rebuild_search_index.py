@@ -0,0 +1,17 @@
+"""
+أمر لإعادة بناء فهرس البحث النصي
+"""
+
+from django.core.management.base import BaseCommand
+from academy.models import Course, LectureFile
+from academy.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'إعادة فهرسة المقررات وملفات المحاضرات للبحث (بعد التعديلات الجماعية عبر update)'
+    
+    def handle(self, *args, **options):
+        for model in (Course, LectureFile):
+            self.stdout.write(f'جاري فهرسة {model._meta.verbose_name_plural}...')
+            count = rebuild_index(model)
+            self.stdout.write(self.style.SUCCESS(f'✅ تمت فهرسة {count} صف'))
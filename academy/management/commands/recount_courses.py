@@ -0,0 +1,27 @@
+"""
+أمر لإعادة حساب عدادات المقررات المخزنة
+"""
+
+from django.core.management.base import BaseCommand
+from academy.models import Course
+
+
+class Command(BaseCommand):
+    help = 'إعادة حساب عدادات المقررات (الطلاب، الملفات، التحميلات) وإصلاح أي انحراف'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'codes',
+            nargs='*',
+            help='رموز المقررات المطلوب إصلاحها (الافتراضي: جميع المقررات)'
+        )
+    
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options['codes']:
+            courses = courses.filter(code__in=options['codes'])
+        
+        self.stdout.write('جاري إعادة حساب عدادات المقررات...')
+        fixed = courses.recount_counters()
+        
+        self.stdout.write(self.style.SUCCESS(f'✅ تم تصحيح عدادات {fixed} مقرر'))
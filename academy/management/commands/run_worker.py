@@ -0,0 +1,101 @@
+"""
+أمر تشغيل عامل المهام الخلفية
+"""
+
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from concurrent import futures
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from academy import jobs
+
+
+class Command(BaseCommand):
+    help = 'تشغيل عامل ينفذ المهام الخلفية من طابور قاعدة البيانات'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=settings.JOB_WORKER_CONCURRENCY,
+            help='عدد المهام التي تنفذ في نفس الوقت'
+        )
+        parser.add_argument(
+            '--pool',
+            choices=['thread', 'process'],
+            default=settings.JOB_WORKER_POOL,
+            help='نوع مجمع التنفيذ: خيوط (thread) أو عمليات (process)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.JOB_POLL_INTERVAL,
+            help='مدة الانتظار بالثواني عندما يكون الطابور فارغاً'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='تنفيذ المهام الجاهزة حالياً ثم الخروج'
+        )
+    
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        poll_interval = options['poll_interval']
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        
+        if options['pool'] == 'process':
+            # spawn حتى لا تتشارك العمليات اتصال قاعدة البيانات المفتوح
+            executor = futures.ProcessPoolExecutor(
+                concurrency,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        else:
+            executor = futures.ThreadPoolExecutor(concurrency, thread_name_prefix='job')
+        
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        
+        self.stdout.write(
+            f'العامل {worker_id} يعمل ({options["pool"]} × {concurrency})...'
+        )
+        
+        running = set()
+        last_requeue = 0
+        with executor:
+            while not self.stopping:
+                if time.monotonic() - last_requeue > poll_interval * 30:
+                    jobs.requeue_stale(settings.JOB_STALE_TIMEOUT)
+                    last_requeue = time.monotonic()
+                
+                running = {future for future in running if not future.done()}
+                free = concurrency - len(running)
+                
+                claimed = jobs.claim(worker_id, free) if free else []
+                for job_id in claimed:
+                    running.add(executor.submit(jobs.execute, job_id))
+                
+                if claimed:
+                    continue
+                if options['once'] and not running:
+                    break
+                if free and not running:
+                    jobs.wait_for_jobs(poll_interval)
+                else:
+                    futures.wait(running, timeout=poll_interval, return_when=futures.FIRST_COMPLETED)
+            
+            # إكمال المهام الجارية قبل الخروج
+            futures.wait(running)
+        
+        self.stdout.write(self.style.SUCCESS('✅ توقف العامل'))
+    
+    def stop(self, signum, frame):
+        self.stdout.write('جاري الإيقاف بعد إكمال المهام الجارية...')
+        self.stopping = True
@@ -3,6 +3,7 @@
 """
 
 from django.core.management.base import BaseCommand
+from academy.capabilities import CAPABILITIES, DEFAULT_PERMISSIONS
 from academy.models import Department, Specialization, RolePermission, User
 
 
@@ -46,35 +47,10 @@ class Command(BaseCommand):
         # إنشاء صلاحيات الأدوار
         permissions_data = [
             {
-                'role': 'student',
-                'can_upload_files': False,
-                'can_delete_files': False,
-                'can_manage_users': False,
-                'can_manage_courses': False,
-                'can_send_notifications': False,
-                'can_view_reports': False,
-                'can_use_ai': True,
-            },
-            {
-                'role': 'teacher',
-                'can_upload_files': True,
-                'can_delete_files': True,
-                'can_manage_users': False,
-                'can_manage_courses': False,
-                'can_send_notifications': True,
-                'can_view_reports': True,
-                'can_use_ai': True,
-            },
-            {
-                'role': 'admin',
-                'can_upload_files': True,
-                'can_delete_files': True,
-                'can_manage_users': True,
-                'can_manage_courses': True,
-                'can_send_notifications': True,
-                'can_view_reports': True,
-                'can_use_ai': True,
-            },
+                'role': role,
+                **{name: name in granted for name in CAPABILITIES},
+            }
+            for role, granted in DEFAULT_PERMISSIONS.items()
         ]
         
         for perm_data in permissions_data:
@@ -0,0 +1,328 @@
+"""
+قياس أداء الطلبات
+=================
+MetricsMiddleware (academy.middleware) يقيس لكل طلب: الزمن الكلي، وزمن قاعدة البيانات وعدد
+الاستعلامات، وزمن عرض القوالب، وإصابات/إخفاقات التخزين المؤقت، ثم:
+- يرسلها في ترويسة Server-Timing (تظهر في أدوات المطور بالمتصفح)
+- يضيفها إلى مدرجات تكرارية (Histograms) في ذاكرة العملية حسب اسم المسار والدور
+- يعرضها /metrics بصيغة Prometheus النصية (مع تقدير النسب المئوية p50/p90/p99)
+
+تجمع كل عملية (Worker) قياساتها في ذاكرتها، ثم تنشرها في التخزين المؤقت
+المشترك (academy.sharedcache) مرة كل METRICS_PUBLISH_INTERVAL ثانية في خانة
+مرقمة خاصة بها. /metrics يجمع خانات كل العمليات، فأي عملية تجيب على طلب
+Prometheus (خلف موزع الأحمال) تعرض قياسات كل العمليات. خانة العملية المتوقفة
+تحذف بعد METRICS_PROCESS_TTL ثانية دون نشر. دون تخزين مؤقت مشترك يعرض
+/metrics قياسات العملية التي أجابت فقط.
+
+الكلفة: perf_counter وقفل قصير لكل طلب واستعلام، وكتابة واحدة في التخزين
+المؤقت كل METRICS_PUBLISH_INTERVAL، فيمكن تركها مفعلة في الإنتاج.
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+
+from .sharedcache import shared_cache
+
+
+logger = logging.getLogger(__name__)
+
+
+# حدود فئات زمن الطلب بالثواني
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+current_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """قياسات طلب واحد"""
+    
+    def __init__(self):
+        self.db_time = 0.0
+        self.queries = 0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache = {}
+        # الاستعلامات قد تنفذ من عدة خيوط لنفس الطلب (academy.dashboards)
+        self.lock = threading.Lock()
+    
+    def __call__(self, execute, sql, params, many, context):
+        """execute_wrapper لقياس زمن الاستعلامات"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self.lock:
+                self.db_time += time.perf_counter() - start
+                self.queries += 1
+    
+    def server_timing(self, total):
+        parts = [
+            f'total;dur={total * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+        ]
+        if self.template_time:
+            parts.append(f'tpl;dur={self.template_time * 1000:.1f}')
+        for name, (hits, misses) in self.cache.items():
+            parts.append(f'cache-{name};desc="hit={hits} miss={misses}"')
+        return ', '.join(parts)
+
+
+def record_cache(name, hit):
+    """تسجيل إصابة أو إخفاق لتخزين مؤقت باسم name في الطلب الحالي"""
+    metrics = current_metrics.get()
+    if metrics is not None:
+        hits, misses = metrics.cache.get(name, (0, 0))
+        metrics.cache[name] = (hits + 1, misses) if hit else (hits, misses + 1)
+    registry.count_cache(name, hit)
+
+
+# =============================================================================
+# المدرجات التكرارية والسجل
+# =============================================================================
+
+class Histogram:
+    """مدرج تكراري تراكمي بحدود ثابتة (على نمط Prometheus)"""
+    
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+    
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+    
+    def merge(self, other):
+        """إضافة مدرج عملية أخرى"""
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.total += other.total
+    
+    def copy(self):
+        histogram = Histogram()
+        histogram.merge(self)
+        return histogram
+    
+    @property
+    def count(self):
+        return sum(self.counts)
+    
+    def quantile(self, q):
+        """تقدير النسبة المئوية بالاستيفاء الخطي داخل الفئة (مثل histogram_quantile)"""
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = BUCKETS[index - 1] if index else 0.0
+                if index == len(BUCKETS):
+                    return lower
+                return lower + (BUCKETS[index] - lower) * (rank - seen) / count
+            seen += count
+        return 0.0
+
+
+class MetricsRegistry:
+    """قياسات العملية الحالية، ونشرها وجمعها عبر التخزين المؤقت المشترك"""
+    
+    slots_key = 'metrics:processes'
+    first_key = 'metrics:processes-first'
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.reset()
+    
+    def reset(self):
+        # رقم خانة العملية في التخزين المؤقت المشترك (يحجز عند أول نشر)
+        self.slot = None
+        self.latency = {}
+        self.db_latency = {}
+        self.queries = {}
+        self.cache = {}
+        self.published_at = 0.0
+    
+    def slot_key(self, slot):
+        return f'metrics:process:{slot}'
+    
+    def observe_request(self, view, role, total, metrics):
+        labels = (view, role)
+        with self.lock:
+            self._check_fork()
+            self.latency.setdefault(labels, Histogram()).observe(total)
+            self.db_latency.setdefault(labels, Histogram()).observe(metrics.db_time)
+            self.queries[labels] = self.queries.get(labels, 0) + metrics.queries
+        
+        if time.monotonic() - self.published_at >= settings.METRICS_PUBLISH_INTERVAL:
+            self.publish_safely()
+    
+    def count_cache(self, name, hit):
+        key = (name, 'hit' if hit else 'miss')
+        with self.lock:
+            self._check_fork()
+            self.cache[key] = self.cache.get(key, 0) + 1
+    
+    def _check_fork(self):
+        """العملية الابنة (fork) تبدأ بقياسات وخانة خاصة بها"""
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.reset()
+    
+    def snapshot(self):
+        """نسخة من قياسات العملية الحالية"""
+        with self.lock:
+            self._check_fork()
+            return {
+                'latency': {labels: histogram.copy() for labels, histogram in self.latency.items()},
+                'db_latency': {labels: histogram.copy() for labels, histogram in self.db_latency.items()},
+                'queries': dict(self.queries),
+                'cache': dict(self.cache),
+            }
+    
+    def publish(self):
+        """كتابة قياسات العملية في خانتها بالتخزين المؤقت المشترك"""
+        cache = shared_cache(DEFAULT_CACHE_ALIAS)
+        if cache is None:
+            return
+        self.published_at = time.monotonic()
+        snapshot = self.snapshot()
+        with self.lock:
+            if self.slot is None:
+                cache.add(self.slots_key, 0, timeout=None)
+                self.slot = cache.incr(self.slots_key)
+            slot = self.slot
+        cache.set(self.slot_key(slot), snapshot, timeout=settings.METRICS_PROCESS_TTL)
+    
+    def publish_safely(self):
+        """النشر من مسار الطلب: الخطأ يسجل ولا يفشل الطلب"""
+        try:
+            self.publish()
+        except Exception:
+            logger.exception('فشل نشر القياسات في التخزين المؤقت المشترك')
+    
+    def collect(self):
+        """قياسات كل العمليات (أو العملية الحالية فقط دون تخزين مؤقت مشترك)"""
+        cache = shared_cache(DEFAULT_CACHE_ALIAS)
+        if cache is None:
+            return self.snapshot()
+        
+        self.publish()
+        first = cache.get(self.first_key, 1)
+        slots = {self.slot_key(slot): slot for slot in range(first, cache.get(self.slots_key, 0) + 1)}
+        published = cache.get_many(list(slots))
+        if published:
+            # خانات العمليات المتوقفة في البداية انتهت صلاحيتها: لا تقرأ مرة أخرى
+            oldest = min(slots[key] for key in published)
+            if oldest > first:
+                cache.set(self.first_key, oldest, timeout=None)
+        
+        merged = {'latency': {}, 'db_latency': {}, 'queries': {}, 'cache': {}}
+        for snapshot in published.values():
+            for name in ('latency', 'db_latency'):
+                for labels, histogram in snapshot[name].items():
+                    merged[name].setdefault(labels, Histogram()).merge(histogram)
+            for name in ('queries', 'cache'):
+                for labels, value in snapshot[name].items():
+                    merged[name][labels] = merged[name].get(labels, 0) + value
+        return merged
+    
+    def render(self):
+        """القياسات بصيغة Prometheus النصية"""
+        metrics = self.collect()
+        lines = []
+        self._histograms(lines, 'sacm_request_duration_seconds', 'زمن الطلب الكلي', metrics['latency'])
+        self._histograms(lines, 'sacm_request_db_duration_seconds', 'زمن قاعدة البيانات لكل طلب', metrics['db_latency'])
+        
+        lines += [
+            '# HELP sacm_request_duration_quantile_seconds النسب المئوية المقدرة لزمن الطلب',
+            '# TYPE sacm_request_duration_quantile_seconds gauge',
+        ]
+        for (view, role), histogram in sorted(metrics['latency'].items()):
+            for q in QUANTILES:
+                lines.append(
+                    f'sacm_request_duration_quantile_seconds{{view="{view}",role="{role}",'
+                    f'quantile="{q}"}} {histogram.quantile(q):.6f}'
+                )
+        
+        lines += [
+            '# HELP sacm_db_queries_total عدد استعلامات SQL',
+            '# TYPE sacm_db_queries_total counter',
+        ]
+        for (view, role), value in sorted(metrics['queries'].items()):
+            lines.append(f'sacm_db_queries_total{{view="{view}",role="{role}"}} {value}')
+        
+        lines += [
+            '# HELP sacm_cache_requests_total إصابات وإخفاقات التخزين المؤقت',
+            '# TYPE sacm_cache_requests_total counter',
+        ]
+        for (name, result), value in sorted(metrics['cache'].items()):
+            lines.append(f'sacm_cache_requests_total{{cache="{name}",result="{result}"}} {value}')
+        
+        return '\n'.join(lines) + '\n'
+    
+    def _histograms(self, lines, name, help_text, histograms):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for (view, role), histogram in sorted(histograms.items()):
+            labels = f'view="{view}",role="{role}"'
+            cumulative = 0
+            for bound, count in zip((*BUCKETS, '+Inf'), histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.total:.6f}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+
+registry = MetricsRegistry()
+
+
+# =============================================================================
+# قياس الطلبات والقوالب
+# =============================================================================
+
+def request_labels(request):
+    """اسم المسار والدور دون استعلامات إضافية (الدور فقط إن حُمّل المستخدم)"""
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name if match else 'unresolved'
+    
+    user = getattr(request, '_cached_user', None)
+    if user is None:
+        role = 'unknown'
+    elif not user.is_authenticated:
+        role = 'anonymous'
+    else:
+        role = user.role
+    return view, role
+
+
+def instrument_templates():
+    """
+    قياس زمن عرض قوالب Django (القالب الخارجي فقط، فلا يحسب include مرتين)
+    بنفس أسلوب django.test.utils في تغليف Template
+    """
+    from django.template.base import Template
+    
+    if getattr(Template.render, 'instrumented', False):
+        return
+    original = Template.render
+    
+    def render(self, context):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return original(self, context)
+        metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - start
+    
+    render.instrumented = True
+    Template.render = render
@@ -0,0 +1,74 @@
+"""
+Middleware لنظام S-ACM
+=====================
+"""
+
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import RequestMetrics, current_metrics, registry, request_labels
+from .querycount import count_queries
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+    """
+    عدّ استعلامات كل طلب ومقارنتها بحد الـ View المعلن عبر @query_budget
+    
+    QUERY_BUDGET_MODE:
+    - off: معطل
+    - warn: تسجيل تحذير عند تجاوز الحد أو تكرار نفس الاستعلام (N+1)
+      وإضافة الترويسة X-Query-Count (الافتراضي مع DEBUG)
+    - raise: رفع QueryBudgetExceeded عند تجاوز الحد (للاختبارات)
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        mode = settings.QUERY_BUDGET_MODE
+        if mode == 'off':
+            return self.get_response(request)
+        
+        with count_queries() as counter:
+            response = self.get_response(request)
+        
+        budget = getattr(request, 'query_budget', None)
+        if mode == 'raise':
+            counter.check(budget, request.path)
+        
+        if (budget is not None and counter.count > budget) or counter.repeated():
+            logger.warning('%s %s\n%s', request.method, request.path, counter.report(budget))
+        
+        response['X-Query-Count'] = str(counter.count)
+        return response
+
+
+class MetricsMiddleware:
+    """قياس كل طلب وإضافة ترويسة Server-Timing"""
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        
+        total = time.perf_counter() - start
+        registry.observe_request(*request_labels(request), total, metrics)
+        response['Server-Timing'] = metrics.server_timing(total)
+        return response
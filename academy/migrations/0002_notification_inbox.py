@@ -0,0 +1,62 @@
+# Generated by Django 6.0.1 on 2026-10-16 22:31
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_inbox(apps, schema_editor):
+    """توزيع الإشعارات الموجودة مسبقاً على صناديق المستلمين"""
+    Notification = apps.get_model('academy', 'Notification')
+    InboxEntry = apps.get_model('academy', 'InboxEntry')
+    Enrollment = apps.get_model('academy', 'Enrollment')
+
+    inbox_table = InboxEntry._meta.db_table
+    notification_table = Notification._meta.db_table
+    enrollment_table = Enrollment._meta.db_table
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {inbox_table} (recipient_id, notification_id, is_read, created_at) "
+            f"SELECT n.recipient_id, n.id, n.is_read, n.created_at FROM {notification_table} n "
+            f"WHERE n.recipient_id IS NOT NULL "
+            f"ON CONFLICT DO NOTHING"
+        )
+        cursor.execute(
+            f"INSERT INTO {inbox_table} (recipient_id, notification_id, is_read, created_at) "
+            f"SELECT e.student_id, n.id, n.is_read, n.created_at FROM {notification_table} n "
+            f"INNER JOIN {enrollment_table} e ON e.course_id = n.course_id "
+            f"WHERE e.is_active = %s "
+            f"ON CONFLICT DO NOTHING",
+            [True]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academy', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InboxEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_read', models.BooleanField(default=False, verbose_name='تمت القراءة')),
+                ('read_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ القراءة')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='تاريخ الإنشاء')),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to='academy.notification', verbose_name='الإشعار')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to=settings.AUTH_USER_MODEL, verbose_name='المستلم')),
+            ],
+            options={
+                'verbose_name': 'إشعار مستلم',
+                'verbose_name_plural': 'صندوق الإشعارات',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['recipient', 'is_read', '-created_at'], name='inbox_recipient_unread_idx')],
+                'unique_together': {('recipient', 'notification')},
+            },
+        ),
+        migrations.RunPython(backfill_inbox, migrations.RunPython.noop),
+    ]
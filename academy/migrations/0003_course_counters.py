@@ -0,0 +1,56 @@
+# Generated by Django 6.0.1 on 2026-10-16 22:33
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    """حساب العدادات الأولية لجميع المقررات باستعلام UPDATE واحد"""
+    Course = apps.get_model('academy', 'Course')
+    Enrollment = apps.get_model('academy', 'Enrollment')
+    LectureFile = apps.get_model('academy', 'LectureFile')
+
+    def counter(queryset, aggregate):
+        return Coalesce(
+            Subquery(
+                queryset.filter(course=OuterRef('pk'))
+                .order_by()
+                .values('course')
+                .annotate(value=aggregate)
+                .values('value')
+            ),
+            0
+        )
+
+    Course.objects.update(
+        students_count=counter(Enrollment.objects.filter(is_active=True), Count('pk')),
+        files_count=counter(LectureFile.objects.filter(is_active=True), Count('pk')),
+        downloads_count=counter(LectureFile.objects.all(), Sum('download_count')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academy', '0002_notification_inbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='downloads_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='عدد التحميلات'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='files_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='عدد الملفات'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='students_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='عدد الطلاب'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
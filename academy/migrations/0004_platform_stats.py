@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-16 22:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academy', '0003_course_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_users', models.PositiveIntegerField(default=0, verbose_name='عدد المستخدمين')),
+                ('total_students', models.PositiveIntegerField(default=0, verbose_name='عدد الطلاب')),
+                ('total_teachers', models.PositiveIntegerField(default=0, verbose_name='عدد المدرسين')),
+                ('total_courses', models.PositiveIntegerField(default=0, verbose_name='عدد المقررات النشطة')),
+                ('total_departments', models.PositiveIntegerField(default=0, verbose_name='عدد الأقسام')),
+                ('total_files', models.PositiveIntegerField(default=0, verbose_name='عدد الملفات')),
+                ('recent_user_ids', models.JSONField(default=list, verbose_name='آخر المستخدمين')),
+                ('recent_file_ids', models.JSONField(default=list, verbose_name='آخر الملفات')),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ التحديث')),
+            ],
+            options={
+                'verbose_name': 'إحصائيات المنصة',
+                'verbose_name_plural': 'إحصائيات المنصة',
+            },
+        ),
+    ]
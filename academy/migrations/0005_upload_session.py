@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-16 22:38
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academy', '0004_platform_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255, verbose_name='عنوان الملف')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='الوصف')),
+                ('chapter', models.CharField(blank=True, max_length=100, null=True, verbose_name='الفصل/الوحدة')),
+                ('file_type', models.CharField(choices=[('pdf', 'PDF'), ('word', 'Word'), ('ppt', 'PowerPoint'), ('video', 'فيديو'), ('audio', 'صوت'), ('image', 'صورة'), ('other', 'أخرى')], default='pdf', max_length=10, verbose_name='نوع الملف')),
+                ('filename', models.CharField(max_length=255, verbose_name='اسم الملف')),
+                ('total_size', models.PositiveBigIntegerField(verbose_name='الحجم الكلي (بايت)')),
+                ('received_bytes', models.PositiveBigIntegerField(default=0, verbose_name='البايتات المستلمة')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='academy.course', verbose_name='المقرر')),
+                ('uploaded_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL, verbose_name='رفع بواسطة')),
+            ],
+            options={
+                'verbose_name': 'جلسة رفع',
+                'verbose_name_plural': 'جلسات الرفع',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
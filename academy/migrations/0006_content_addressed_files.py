@@ -0,0 +1,51 @@
+# Generated by Django 6.0.1 on 2026-10-16 22:40
+
+import academy.storage
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academy', '0005_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='المسار المخزن')),
+                ('digest', models.CharField(blank=True, db_index=True, max_length=64, verbose_name='بصمة المحتوى')),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='الحجم (بايت)')),
+                ('content_type', models.CharField(blank=True, max_length=100, verbose_name='نوع المحتوى (MIME)')),
+                ('ref_count', models.IntegerField(default=0, verbose_name='عدد المراجع')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+            ],
+            options={
+                'verbose_name': 'نسخة ملف',
+                'verbose_name_plural': 'نسخ الملفات',
+            },
+        ),
+        migrations.AddField(
+            model_name='lecturefile',
+            name='content_digest',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, verbose_name='بصمة المحتوى'),
+        ),
+        migrations.AddField(
+            model_name='lecturefile',
+            name='content_type',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='نوع المحتوى (MIME)'),
+        ),
+        migrations.AddField(
+            model_name='lecturefile',
+            name='original_name',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='اسم الملف الأصلي'),
+        ),
+        migrations.AlterField(
+            model_name='lecturefile',
+            name='file',
+            field=models.FileField(storage=academy.storage.lecture_storage, upload_to='lectures/%Y/%m/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx', 'ppt', 'pptx', 'mp4', 'mp3', 'jpg', 'png', 'zip'])], verbose_name='الملف'),
+        ),
+    ]
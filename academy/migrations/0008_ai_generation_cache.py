@@ -0,0 +1,78 @@
+# Generated by Django 6.0.1 on 2026-10-16 22:42
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academy', '0007_job_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiquestion',
+            name='cache_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='مفتاح التخزين المؤقت'),
+        ),
+        migrations.AddField(
+            model_name='aiquestion',
+            name='content_digest',
+            field=models.CharField(blank=True, max_length=64, verbose_name='بصمة المحتوى'),
+        ),
+        migrations.AddField(
+            model_name='aiquestion',
+            name='language',
+            field=models.CharField(default='ar', max_length=10, verbose_name='اللغة'),
+        ),
+        migrations.AddField(
+            model_name='aiquestion',
+            name='last_used_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='آخر استخدام'),
+        ),
+        migrations.AddField(
+            model_name='aiquestion',
+            name='model_name',
+            field=models.CharField(blank=True, max_length=100, verbose_name='النموذج'),
+        ),
+        migrations.AddField(
+            model_name='aiquestion',
+            name='prompt_version',
+            field=models.CharField(blank=True, max_length=20, verbose_name='إصدار التعليمات'),
+        ),
+        migrations.AddField(
+            model_name='aisummary',
+            name='cache_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='مفتاح التخزين المؤقت'),
+        ),
+        migrations.AddField(
+            model_name='aisummary',
+            name='content_digest',
+            field=models.CharField(blank=True, max_length=64, verbose_name='بصمة المحتوى'),
+        ),
+        migrations.AddField(
+            model_name='aisummary',
+            name='language',
+            field=models.CharField(default='ar', max_length=10, verbose_name='اللغة'),
+        ),
+        migrations.AddField(
+            model_name='aisummary',
+            name='last_used_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='آخر استخدام'),
+        ),
+        migrations.AddField(
+            model_name='aisummary',
+            name='model_name',
+            field=models.CharField(blank=True, max_length=100, verbose_name='النموذج'),
+        ),
+        migrations.AddField(
+            model_name='aisummary',
+            name='prompt_version',
+            field=models.CharField(blank=True, max_length=20, verbose_name='إصدار التعليمات'),
+        ),
+        migrations.AddConstraint(
+            model_name='aisummary',
+            constraint=models.UniqueConstraint(condition=models.Q(('cache_key', ''), _negated=True), fields=('cache_key',), name='aisummary_unique_cache_key'),
+        ),
+    ]
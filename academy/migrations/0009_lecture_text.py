@@ -0,0 +1,45 @@
+# Generated by Django 6.0.1 on 2026-10-16 22:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academy', '0008_ai_generation_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextExtraction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_digest', models.CharField(max_length=64, unique=True, verbose_name='بصمة المحتوى')),
+                ('status', models.CharField(choices=[('pending', 'في الانتظار'), ('done', 'مكتمل'), ('unsupported', 'نوع غير مدعوم'), ('failed', 'فشل')], default='pending', max_length=15, verbose_name='الحالة')),
+                ('chunk_count', models.PositiveIntegerField(default=0, verbose_name='عدد المقاطع')),
+                ('error', models.TextField(blank=True, verbose_name='الخطأ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('extracted_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الاستخراج')),
+            ],
+            options={
+                'verbose_name': 'استخراج نص',
+                'verbose_name_plural': 'عمليات استخراج النصوص',
+            },
+        ),
+        migrations.CreateModel(
+            name='LectureText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_digest', models.CharField(max_length=64, verbose_name='بصمة المحتوى')),
+                ('position', models.PositiveIntegerField(verbose_name='الترتيب')),
+                ('page', models.PositiveIntegerField(blank=True, null=True, verbose_name='الصفحة')),
+                ('text', models.TextField(verbose_name='النص')),
+            ],
+            options={
+                'verbose_name': 'مقطع نص',
+                'verbose_name_plural': 'نصوص المحاضرات',
+                'ordering': ['content_digest', 'position'],
+                'unique_together': {('content_digest', 'position')},
+            },
+        ),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 6.0.1 on 2026-10-16 22:47
+
+import re
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# نسخة ثابتة من academy.search وقت كتابة الترحيل (الترحيل لا يستورد كود التطبيق)
+SEARCH_FIELDS = {
+    'course': (('name', 'A'), ('code', 'A'), ('description', 'B')),
+    'lecturefile': (('title', 'A'), ('chapter', 'B'), ('description', 'B')),
+}
+
+MODEL_NAMES = {'course': 'Course', 'lecturefile': 'LectureFile'}
+
+SQLITE_TABLE = 'academy_search_index'
+
+DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+
+LETTER_VARIANTS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه',
+})
+
+ARTICLE = re.compile(r'^(?:وال|فال|بال|كال|لل|ال)(?=\w{2})')
+
+
+def normalize(text):
+    text = DIACRITICS.sub('', text or '').translate(LETTER_VARIANTS).lower()
+    return ' '.join(ARTICLE.sub('', token) for token in re.findall(r'\w+', text))
+
+
+def weighted_documents(model_name, values):
+    """النص المطبّع لكل وزن من قيم الحقول بترتيب SEARCH_FIELDS"""
+    documents = {'A': [], 'B': []}
+    for (_, weight), value in zip(SEARCH_FIELDS[model_name], values):
+        documents[weight].append(normalize(value))
+    return {weight: ' '.join(filter(None, parts)) for weight, parts in documents.items()}
+
+
+def build_search_index(apps, schema_editor):
+    """إنشاء فهرس البحث الخاص بقاعدة البيانات وفهرسة الصفوف الحالية"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for model_name in SEARCH_FIELDS:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS academy_{model_name}_search_idx '
+                f'ON academy_{model_name} USING gin (search_vector)'
+            )
+        sql = (
+            "UPDATE academy_{} SET search_vector = "
+            "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B') "
+            "WHERE id = %s"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} '
+            f'USING fts5(kind UNINDEXED, object_id UNINDEXED, weight_a, weight_b)'
+        )
+        sql = (
+            f"INSERT INTO {SQLITE_TABLE} (weight_a, weight_b, object_id, kind) "
+            f"VALUES (%s, %s, %s, '{{}}')"
+        )
+    else:
+        return
+    
+    for model_name, fields in SEARCH_FIELDS.items():
+        Model = apps.get_model('academy', MODEL_NAMES[model_name])
+        rows = Model.objects.values_list('pk', *(field for field, _ in fields))
+        with schema_editor.connection.cursor() as cursor:
+            for pk, *values in rows.iterator(chunk_size=500):
+                documents = weighted_documents(model_name, values)
+                cursor.execute(sql.format(model_name), [documents['A'], documents['B'], pk])
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for model_name in SEARCH_FIELDS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS academy_{model_name}_search_idx')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SQLITE_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academy', '0009_lecture_text'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='lecturefile',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
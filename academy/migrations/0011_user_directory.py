@@ -0,0 +1,77 @@
+# Generated by Django 6.0.1 on 2026-10-16 22:48
+
+import re
+
+from django.db import migrations, models
+
+
+# نسخة ثابتة من academy.directory و academy.search وقت كتابة الترحيل
+# (الترحيل لا يستورد كود التطبيق)
+DIRECTORY_FIELDS = ('first_name', 'last_name', 'username')
+
+DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+
+LETTER_VARIANTS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه',
+})
+
+ARTICLE = re.compile(r'^(?:وال|فال|بال|كال|لل|ال)(?=\w{2})')
+
+
+def normalize(text):
+    text = DIACRITICS.sub('', text or '').translate(LETTER_VARIANTS).lower()
+    return ' '.join(ARTICLE.sub('', token) for token in re.findall(r'\w+', text))
+
+
+def directory_name(user):
+    return normalize(' '.join(getattr(user, field) or '' for field in DIRECTORY_FIELDS))
+
+
+TRIGRAM_INDEXES = {
+    'academy_user_directory_name_trgm': 'directory_name gin_trgm_ops',
+    'academy_user_email_trgm': 'UPPER(email::text) gin_trgm_ops',
+}
+
+
+def backfill_directory_name(apps, schema_editor):
+    User = apps.get_model('academy', 'User')
+    users = list(User.objects.only('pk', *DIRECTORY_FIELDS))
+    for user in users:
+        user.directory_name = directory_name(user)
+    User.objects.bulk_update(users, ['directory_name'], batch_size=1000)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """فهارس trigram على PostgreSQL فقط"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, expression in TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON academy_user USING gin ({expression})'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academy', '0010_full_text_search'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='directory_name',
+            field=models.TextField(blank=True, editable=False, verbose_name='اسم البحث'),
+        ),
+        migrations.RunPython(backfill_directory_name, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 6.0.1 on 2026-10-16 22:50
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class ConcurrentlyIfSupported:
+    """
+    بناء/حذف الفهرس بـ CONCURRENTLY على PostgreSQL حتى لا تقفل الجداول،
+    والعملية العادية على قواعد البيانات الأخرى (مثل SQLite في الاختبارات)
+    """
+    fallback = None
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        return self.fallback.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        return self.fallback.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class AddIndexConcurrentlyIfSupported(ConcurrentlyIfSupported, AddIndexConcurrently):
+    fallback = migrations.AddIndex
+
+
+class RemoveIndexConcurrentlyIfSupported(ConcurrentlyIfSupported, RemoveIndexConcurrently):
+    fallback = migrations.RemoveIndex
+
+
+class Migration(migrations.Migration):
+
+    # البناء المتزامن لا يعمل داخل معاملة
+    atomic = False
+
+    dependencies = [
+        ('academy', '0011_user_directory'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfSupported(
+            model_name='course',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['teacher', 'level', 'name'], name='course_teacher_active_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='enrollment',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['student', '-enrolled_at'], name='enrollment_student_active_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='enrollment',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['course', 'student'], name='enrollment_course_active_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='lecturefile',
+            index=models.Index(fields=['-uploaded_at'], name='lecture_uploaded_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='lecturefile',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['course', '-uploaded_at'], name='lecture_course_active_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='lecturefile',
+            index=models.Index(fields=['uploaded_by', '-uploaded_at'], name='lecture_uploader_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'is_read', '-created_at'], name='notification_recipient_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='user',
+            index=models.Index(fields=['-date_joined'], name='user_joined_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='user',
+            index=models.Index(fields=['role', '-date_joined'], name='user_role_idx'),
+        ),
+        # الفهرس الجزئي لغير المقروء يحل محل الفهرس الكامل (يبنى الجديد أولاً)
+        AddIndexConcurrentlyIfSupported(
+            model_name='inboxentry',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['recipient', '-created_at'], name='inbox_unread_idx'),
+        ),
+        RemoveIndexConcurrentlyIfSupported(
+            model_name='inboxentry',
+            name='inbox_recipient_unread_idx',
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-16 23:05
+
+from django.db import migrations, models
+
+
+def number_questions(apps, schema_editor):
+    """ترقيم الأسئلة الموجودة داخل كل مفتاح حسب ترتيب إنشائها"""
+    AIQuestion = apps.get_model('academy', 'AIQuestion')
+    position, current = 0, None
+    changed = []
+    for question in AIQuestion.objects.exclude(cache_key='').order_by('cache_key', 'pk').only('pk', 'cache_key'):
+        position = position + 1 if question.cache_key == current else 0
+        current = question.cache_key
+        question.position = position
+        changed.append(question)
+    AIQuestion.objects.bulk_update(changed, ['position'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academy', '0012_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiquestion',
+            name='position',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='الترتيب'),
+        ),
+        migrations.RunPython(number_questions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='aiquestion',
+            constraint=models.UniqueConstraint(condition=models.Q(('cache_key', ''), _negated=True), fields=('cache_key', 'position'), name='aiquestion_unique_cache_key_position'),
+        ),
+    ]
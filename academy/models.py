@@ -13,13 +13,77 @@
 - Notification: الإشعارات
 - AISummary: ملخصات الذكاء الاصطناعي
 - AIQuestion: أسئلة الذكاء الاصطناعي
+- InboxEntry: صندوق الإشعارات لكل مستلم
+- PlatformStats: لقطة إحصائيات المنصة للوحة المسؤول
+- UploadSession: جلسات رفع الملفات المجزأ القابل للاستكمال
+- FileBlob: نسخ الملفات المخزنة حسب المحتوى وعدد مراجعها
+- Job: طابور المهام الخلفية
+- TextExtraction / LectureText: النصوص المستخرجة من ملفات المحاضرات
 """
 
-from django.db import models
+import mimetypes
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import models, connections, transaction
+from django.db.models import F, Count, Sum, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import FileExtensionValidator
 from django.utils import timezone
 
+from .storage import lecture_storage
+
+
+def related_aggregate(queryset, fk_name, aggregate=None):
+    """
+    تجميع الصفوف المرتبطة (COUNT افتراضياً) كاستعلام فرعي مرتبط بالصف الخارجي
+    بدلاً من JOIN، حتى لا تتضاعف الصفوف عند تجميع أكثر من علاقة في نفس الاستعلام
+    
+    مثال: Department.objects.annotate(
+        users_total=related_aggregate(User.objects.all(), 'department')
+    )
+    """
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{fk_name: OuterRef('pk')})
+            .order_by()
+            .values(fk_name)
+            .annotate(value=aggregate or Count('pk'))
+            .values('value')
+        ),
+        0
+    )
+
+
+class StoredCountersMixin:
+    """
+    حقول العدادات المخزنة (stored_counter_fields) لا تكتب في الحفظ الكامل لصف موجود
+    
+    العدادات تحدث في قاعدة البيانات مباشرة (تعابير F والعدادات المؤجلة في
+    academy.counters)، فقيمتها في النسخة المحملة قد تكون قديمة، وكتابتها عند
+    تعديل حقل آخر (مثل العنوان في لوحة التحكم) كانت ستمسح الزيادات المكتوبة بعد التحميل.
+    """
+    
+    stored_counter_fields = ()
+    
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is None and not kwargs.get('force_insert') \
+                and not self._state.adding and self.pk is not None:
+            # كالحفظ الكامل في Django: الحقول المحملة فقط (المؤجلة لا تقرأ)
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred
+                and field.name not in self.stored_counter_fields
+            ]
+        super().save(*args, **kwargs)
+
 
 # =============================================================================
 # 1. نموذج المستخدم المخصص (Custom User Model)
@@ -110,14 +174,46 @@ class User(AbstractUser):
         verbose_name='تاريخ التحديث'
     )
     
+    # الاسم المطبّع للبحث في دليل المستخدمين (انظر academy.directory)
+    directory_name = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='اسم البحث'
+    )
+    
     class Meta:
         verbose_name = 'مستخدم'
         verbose_name_plural = 'المستخدمون'
         ordering = ['-date_joined']
+        indexes = [
+            models.Index(fields=['-date_joined'], name='user_joined_idx'),
+            models.Index(fields=['role', '-date_joined'], name='user_role_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_full_name() or self.username} ({self.get_role_display()})"
     
+    def save(self, *args, **kwargs):
+        from .directory import DIRECTORY_FIELDS, directory_name
+        
+        self.directory_name = directory_name(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(DIRECTORY_FIELDS) & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'directory_name'}
+        super().save(*args, **kwargs)
+    
+    def get_session_auth_hash(self):
+        # المستخدم المبني من لقطة academy.backends: البصمة محفوظة دون تحميل كلمة المرور
+        if 'password' in self.get_deferred_fields() and hasattr(self, '_session_auth_hash'):
+            return self._session_auth_hash
+        return super().get_session_auth_hash()
+    
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        # المستخدم المبني من لقطة: تحميل كل الحقول المؤجلة باستعلام واحد بدلاً من استعلام لكل حقل
+        if fields is not None and getattr(self, '_from_snapshot', False):
+            fields = {*fields, *self.get_deferred_fields()}
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+    
     # خصائص مساعدة للتحقق من الدور
     @property
     def is_student(self):
@@ -184,6 +280,13 @@ class Department(models.Model):
 # 3. نموذج التخصص (Specialization)
 # =============================================================================
 
+class SpecializationManager(models.Manager):
+    """تحميل القسم مع التخصص دائماً لأن __str__ يعتمد على اسم القسم"""
+    
+    def get_queryset(self):
+        return super().get_queryset().select_related('department')
+
+
 class Specialization(models.Model):
     """
     التخصصات داخل كل قسم
@@ -213,6 +316,8 @@ class Specialization(models.Model):
         verbose_name='تاريخ الإنشاء'
     )
     
+    objects = SpecializationManager()
+    
     class Meta:
         verbose_name = 'تخصص'
         verbose_name_plural = 'التخصصات'
@@ -227,7 +332,38 @@ class Specialization(models.Model):
 # 4. نموذج المقرر (Course)
 # =============================================================================
 
-class Course(models.Model):
+class CourseQuerySet(models.QuerySet):
+    """استعلامات المقررات"""
+    
+    def recount_counters(self):
+        """
+        إعادة حساب عدادات المقررات من الجداول الفعلية وإصلاح أي انحراف
+        باستعلام UPDATE واحد، وإرجاع عدد المقررات التي تم تصحيحها
+        """
+        expected = {
+            'students_count': related_aggregate(
+                Enrollment.objects.filter(is_active=True), 'course'
+            ),
+            'files_count': related_aggregate(
+                LectureFile.objects.filter(is_active=True), 'course'
+            ),
+            'downloads_count': related_aggregate(
+                LectureFile.objects.all(), 'course', Sum('download_count')
+            ),
+        }
+        
+        drifted = self.annotate(
+            **{f'expected_{name}': value for name, value in expected.items()}
+        ).exclude(
+            students_count=F('expected_students_count'),
+            files_count=F('expected_files_count'),
+            downloads_count=F('expected_downloads_count'),
+        ).values('pk')
+        
+        return Course.objects.filter(pk__in=drifted).update(**expected)
+
+
+class Course(StoredCountersMixin, models.Model):
     """
     المقررات الدراسية
     """
@@ -306,6 +442,28 @@ class Course(models.Model):
         verbose_name='نشط'
     )
     
+    # عدادات مخزنة يتم تحديثها عند حفظ/حذف التسجيلات والملفات
+    # (انظر CourseCountersMixin والأمر recount_courses)، ولا يكتبها حفظ المقرر
+    stored_counter_fields = ('students_count', 'files_count', 'downloads_count')
+    
+    students_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='عدد الطلاب'
+    )
+    
+    files_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='عدد الملفات'
+    )
+    
+    downloads_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='عدد التحميلات'
+    )
+    
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name='تاريخ الإنشاء'
@@ -316,10 +474,26 @@ class Course(models.Model):
         verbose_name='تاريخ التحديث'
     )
     
+    # فهرس البحث النصي على PostgreSQL (يحدث عند الحفظ، انظر academy.search)
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False
+    )
+    
+    objects = CourseQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'مقرر'
         verbose_name_plural = 'المقررات'
         ordering = ['specialization', 'level', 'name']
+        indexes = [
+            # مقررات المدرس النشطة حسب المستوى والاسم (لوحة المدرس)
+            models.Index(
+                fields=['teacher', 'level', 'name'],
+                condition=models.Q(is_active=True),
+                name='course_teacher_active_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.code} - {self.name}"
@@ -327,14 +501,98 @@ class Course(models.Model):
     @property
     def enrolled_students_count(self):
         """عدد الطلاب المسجلين في المقرر"""
-        return self.enrollments.count()
+        return self.students_count
+    
+    @classmethod
+    def adjust_counters(cls, course_id, **deltas):
+        """
+        تعديل عدادات المقرر ذرياً باستخدام تعابير F (F + delta)
+        الحد الأدنى صفر يحمي من انحراف العمليات المجمعة (bulk) التي لا تمر
+        بالمزيج، ويصلحه الأمر recount_courses
+        مثال: Course.adjust_counters(course_id, students_count=1)
+        """
+        updates = {
+            field: Greatest(F(field) + delta, 0)
+            for field, delta in deltas.items() if delta
+        }
+        if course_id and updates:
+            cls.objects.filter(pk=course_id).update(**updates)
+
+
+class CourseCountersMixin:
+    """
+    يحافظ على عدادات المقرر المخزنة (students_count, files_count, ...)
+    
+    كل نموذج يستخدمه يعرّف course_counter_values() التي تعيد مساهمة الصف
+    في عدادات مقرره. عند الحفظ والحذف تقرأ المساهمة الحالية من قاعدة البيانات
+    مع قفل الصف (select_for_update)، ثم يطبق الفرق فقط بتعابير F داخل نفس
+    المعاملة، فلا يحسب تعديل واحد مرتين من نسختين محملتين في طلبين متزامنين،
+    ولا تستخدم قيمة قديمة في الذاكرة (مثل download_count قبل كتابة العدادات
+    المؤجلة). الحذف يعالج في signals.py (pre_delete/post_delete) ليشمل الحذف
+    المتتالي والحذف عبر QuerySet.
+    """
+    
+    # الحقول (attname) التي تعتمد عليها course_counter_values
+    course_counter_fields = ('course_id',)
+    
+    def course_counter_values(self):
+        """مساهمة الصف في عدادات مقرره: {اسم العداد: القيمة} (لا شيء افتراضياً)"""
+        return {}
+    
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            counted = self.lock_course_counters()
+            super().save(*args, **kwargs)
+            self._sync_course_counters(counted)
+    
+    def lock_course_counters(self):
+        """
+        قفل الصف المحفوظ وإرجاع مساهمته الحالية في عدادات مقرره (course_id, values)
+        أو (None, {}) إن لم يكن محفوظاً أو حذف في طلب آخر
+        """
+        if self._state.adding or self.pk is None:
+            return (None, {})
+        original = (
+            type(self)._base_manager.select_for_update()
+            .only(*self.course_counter_fields).filter(pk=self.pk).first()
+        )
+        if original is None:
+            return (None, {})
+        # العدادات التي لا يكتبها الحفظ (StoredCountersMixin) تبقى بقيمتها المخزنة
+        for name in getattr(self, 'stored_counter_fields', ()):
+            if name in self.course_counter_fields:
+                setattr(self, name, getattr(original, name))
+        return (original.course_id, original.course_counter_values())
+    
+    def _sync_course_counters(self, counted):
+        """تطبيق الفرق بين المساهمة المحفوظة سابقاً والمساهمة الحالية"""
+        old_course_id, old_values = counted
+        new_values = self.course_counter_values()
+        
+        if old_course_id == self.course_id:
+            Course.adjust_counters(self.course_id, **{
+                field: value - old_values.get(field, 0)
+                for field, value in new_values.items()
+            })
+        else:
+            Course.adjust_counters(old_course_id, **{
+                field: -value for field, value in old_values.items()
+            })
+            Course.adjust_counters(self.course_id, **new_values)
+    
+    def release_course_counters(self, counted):
+        """إزالة مساهمة الصف المحذوف (كما قرأها lock_course_counters) من عدادات مقرره"""
+        course_id, values = counted
+        Course.adjust_counters(course_id, **{
+            field: -value for field, value in values.items()
+        })
 
 
 # =============================================================================
 # 5. نموذج تسجيل المقررات (Enrollment)
 # =============================================================================
 
-class Enrollment(models.Model):
+class Enrollment(CourseCountersMixin, models.Model):
     """
     تسجيل الطلاب في المقررات
     """
@@ -369,16 +627,35 @@ class Enrollment(models.Model):
         verbose_name_plural = 'التسجيلات'
         unique_together = ['student', 'course']
         ordering = ['-enrolled_at']
+        indexes = [
+            # تسجيلات الطالب النشطة (لوحة الطالب)
+            models.Index(
+                fields=['student', '-enrolled_at'],
+                condition=models.Q(is_active=True),
+                name='enrollment_student_active_idx'
+            ),
+            # طلاب المقرر النشطون (لوحة المدرس والعدادات)
+            models.Index(
+                fields=['course', 'student'],
+                condition=models.Q(is_active=True),
+                name='enrollment_course_active_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.student.get_full_name()} - {self.course.name}"
+    
+    course_counter_fields = ('course_id', 'is_active')
+    
+    def course_counter_values(self):
+        return {'students_count': 1 if self.is_active else 0}
 
 
 # =============================================================================
 # 6. نموذج ملفات المحاضرات (LectureFile)
 # =============================================================================
 
-class LectureFile(models.Model):
+class LectureFile(CourseCountersMixin, StoredCountersMixin, models.Model):
     """
     ملفات المحاضرات والمواد التعليمية
     """
@@ -406,6 +683,7 @@ class LectureFile(models.Model):
     
     file = models.FileField(
         upload_to='lectures/%Y/%m/',
+        storage=lecture_storage,
         validators=[
             FileExtensionValidator(
                 allowed_extensions=['pdf', 'doc', 'docx', 'ppt', 'pptx', 'mp4', 'mp3', 'jpg', 'png', 'zip']
@@ -426,6 +704,30 @@ class LectureFile(models.Model):
         verbose_name='حجم الملف (بايت)'
     )
     
+    # بصمة المحتوى (SHA-256) وتستخدم أيضاً كـ ETag ومفتاح للمعالجة اللاحقة
+    content_digest = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        editable=False,
+        verbose_name='بصمة المحتوى'
+    )
+    
+    content_type = models.CharField(
+        max_length=100,
+        blank=True,
+        editable=False,
+        verbose_name='نوع المحتوى (MIME)'
+    )
+    
+    # اسم الملف كما رفعه المستخدم (الاسم المخزن مشتق من البصمة)
+    original_name = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        verbose_name='اسم الملف الأصلي'
+    )
+    
     course = models.ForeignKey(
         Course,
         on_delete=models.CASCADE,
@@ -452,29 +754,118 @@ class LectureFile(models.Model):
         verbose_name='تاريخ الرفع'
     )
     
+    # يزاد عبر العدادات المؤجلة (register_download)، ولا يكتبه حفظ الملف
     download_count = models.PositiveIntegerField(
         default=0,
         verbose_name='عدد التحميلات'
     )
     
+    stored_counter_fields = ('download_count',)
+    
     is_active = models.BooleanField(
         default=True,
         verbose_name='نشط'
     )
     
+    # فهرس البحث النصي على PostgreSQL (يحدث عند الحفظ، انظر academy.search)
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False
+    )
+    
     class Meta:
         verbose_name = 'ملف محاضرة'
         verbose_name_plural = 'ملفات المحاضرات'
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['-uploaded_at'], name='lecture_uploaded_idx'),
+            # ملفات المقرر النشطة الأحدث أولاً
+            models.Index(
+                fields=['course', '-uploaded_at'],
+                condition=models.Q(is_active=True),
+                name='lecture_course_active_idx'
+            ),
+            # ملفات المدرس الأحدث أولاً (لوحة المدرس)
+            models.Index(fields=['uploaded_by', '-uploaded_at'], name='lecture_uploader_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.course.name}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'file' in instance.__dict__:
+            instance._stored_name = instance.__dict__['file']
+        return instance
+    
     def save(self, *args, **kwargs):
-        """حفظ حجم الملف تلقائياً"""
+        """حفظ حجم الملف وبصمته ونوعه تلقائياً"""
+        content = None
+        if self.file and not self.file._committed:
+            # حفظ الملف أولاً لمعرفة بصمته قبل كتابة الصف
+            content = self.file.file
+            self.original_name = os.path.basename(self.file.name)
+            self.file.save(self.file.name, content, save=False)
+        
         if self.file:
             self.file_size = self.file.size
-        super().save(*args, **kwargs)
+            self.content_digest = getattr(self.file.storage, 'digest_for', lambda name: '')(self.file.name)
+            self.content_type = mimetypes.guess_type(self.file.name)[0] or 'application/octet-stream'
+        
+        stored_name = self._load_stored_name()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if self.file.name != stored_name:
+                FileBlob.objects.acquire(self, content)
+                FileBlob.objects.release(stored_name)
+        self._stored_name = self.file.name
+    
+    def _load_stored_name(self):
+        """اسم النسخة المخزنة التي يشير إليها الصف في قاعدة البيانات"""
+        if hasattr(self, '_stored_name'):
+            return self._stored_name
+        if self._state.adding or self.pk is None:
+            return None
+        # الصف محمل دون الحقل file (defer/only): نقرأ الاسم الأصلي مرة واحدة
+        return type(self)._base_manager.filter(pk=self.pk).values_list('file', flat=True).first()
+    
+    course_counter_fields = ('course_id', 'is_active', 'download_count')
+    
+    def course_counter_values(self):
+        return {
+            'files_count': 1 if self.is_active else 0,
+            'downloads_count': self.download_count,
+        }
+    
+    def is_accessible_by(self, user):
+        """هل يمكن للمستخدم تنزيل الملف؟"""
+        if not user.is_authenticated:
+            return False
+        if user.is_admin_user:
+            return True
+        if user.is_teacher:
+            return user.pk in (self.uploaded_by_id, self.course.teacher_id)
+        return self.is_active and Enrollment.objects.filter(
+            student=user, course_id=self.course_id, is_active=True
+        ).exists()
+    
+    def register_download(self):
+        """
+        تسجيل تنزيل للملف ولمقرره عبر العدادات المؤجلة (academy.counters)
+        لتجنب قفل صف الملف الشائع عند كل تنزيل
+        """
+        from .counters import counters
+        
+        counters.increment(LectureFile, self.pk, 'download_count')
+        counters.increment(Course, self.course_id, 'downloads_count')
+    
+    @property
+    def total_downloads(self):
+        """عدد التحميلات المخزن + التحميلات المعلقة التي لم تكتب بعد"""
+        from .counters import counters
+        
+        return counters.value(self, 'download_count')
 
 
 # =============================================================================
@@ -571,10 +962,27 @@ class Notification(models.Model):
         verbose_name = 'إشعار'
         verbose_name_plural = 'الإشعارات'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['recipient', 'is_read', '-created_at'],
+                name='notification_recipient_idx'
+            ),
+        ]
     
     def __str__(self):
         return self.title
     
+    def save(self, *args, **kwargs):
+        """
+        توزيع الإشعار الجديد على صناديق المستلمين مرة واحدة عند إنشائه
+        (في نفس المعاملة، فلا يبقى إشعار لم يصل إلى أحد إن فشل التوزيع)
+        """
+        is_new = self._state.adding
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if is_new:
+                InboxEntry.objects.deliver(self)
+    
     @property
     def is_expired(self):
         """هل انتهت صلاحية الإشعار؟"""
@@ -622,10 +1030,57 @@ class AISummary(models.Model):
         verbose_name='مخزن مؤقتاً'
     )
     
+    # مفتاح التخزين المؤقت: بصمة المحتوى + إصدار التعليمات والنموذج + اللغة
+    # (انظر academy.ai_cache)
+    cache_key = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        verbose_name='مفتاح التخزين المؤقت'
+    )
+    
+    content_digest = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name='بصمة المحتوى'
+    )
+    
+    language = models.CharField(
+        max_length=10,
+        default='ar',
+        verbose_name='اللغة'
+    )
+    
+    prompt_version = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name='إصدار التعليمات'
+    )
+    
+    model_name = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='النموذج'
+    )
+    
+    last_used_at = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name='آخر استخدام'
+    )
+    
     class Meta:
         verbose_name = 'ملخص ذكاء اصطناعي'
         verbose_name_plural = 'ملخصات الذكاء الاصطناعي'
         ordering = ['-generated_at']
+        constraints = [
+            # ملخص واحد فقط لكل مفتاح حتى مع الطلبات المتزامنة
+            models.UniqueConstraint(
+                fields=['cache_key'],
+                condition=~models.Q(cache_key=''),
+                name='aisummary_unique_cache_key',
+            ),
+        ]
     
     def __str__(self):
         return f"ملخص: {self.lecture_file.title}"
@@ -681,10 +1136,63 @@ class AIQuestion(models.Model):
         verbose_name='تاريخ التوليد'
     )
     
+    # مفتاح التخزين المؤقت: بصمة المحتوى + إصدار التعليمات والنموذج + اللغة
+    # (انظر academy.ai_cache)
+    cache_key = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        verbose_name='مفتاح التخزين المؤقت'
+    )
+    
+    # ترتيب السؤال داخل مجموعة أسئلة المفتاح
+    position = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='الترتيب'
+    )
+    
+    content_digest = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name='بصمة المحتوى'
+    )
+    
+    language = models.CharField(
+        max_length=10,
+        default='ar',
+        verbose_name='اللغة'
+    )
+    
+    prompt_version = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name='إصدار التعليمات'
+    )
+    
+    model_name = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='النموذج'
+    )
+    
+    last_used_at = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name='آخر استخدام'
+    )
+    
     class Meta:
         verbose_name = 'سؤال ذكاء اصطناعي'
         verbose_name_plural = 'أسئلة الذكاء الاصطناعي'
         ordering = ['-generated_at']
+        constraints = [
+            # مجموعة أسئلة واحدة فقط لكل مفتاح حتى مع الطلبات المتزامنة
+            models.UniqueConstraint(
+                fields=['cache_key', 'position'],
+                condition=~models.Q(cache_key=''),
+                name='aiquestion_unique_cache_key_position',
+            ),
+        ]
     
     def __str__(self):
         return f"سؤال: {self.question_text[:50]}..."
@@ -747,4 +1255,685 @@ class RolePermission(models.Model):
         verbose_name_plural = 'صلاحيات الأدوار'
     
     def __str__(self):
-        return f"صلاحيات: {self.get_role_display()}"
\ No newline at end of file
+        return f"صلاحيات: {self.get_role_display()}"
+
+
+# =============================================================================
+# 11. نموذج صندوق الإشعارات (InboxEntry)
+# =============================================================================
+
+class InboxEntryManager(models.Manager):
+    """
+    عمليات صندوق الإشعارات
+    يتم توزيع الإشعار عند كتابته (Fan-out on write) بحيث تصبح قراءة
+    الإشعارات استعلاماً واحداً على الفهرس (recipient, is_read, created_at)
+    """
+    
+    def deliver(self, notification):
+        """
+        توزيع الإشعار على المستلم المحدد وعلى جميع الطلاب النشطين في المقرر
+        باستعلام INSERT ... SELECT واحد دون تحميل الطلاب في الذاكرة
+        """
+        inbox_table = self.model._meta.db_table
+        columns = "(recipient_id, notification_id, is_read, created_at)"
+        
+        with connections[self.db].cursor() as cursor:
+            if notification.recipient_id:
+                cursor.execute(
+                    f"INSERT INTO {inbox_table} {columns} "
+                    f"VALUES (%s, %s, %s, %s) ON CONFLICT DO NOTHING",
+                    [notification.recipient_id, notification.pk, False, notification.created_at]
+                )
+            
+            if notification.course_id:
+                enrollment_table = Enrollment._meta.db_table
+                cursor.execute(
+                    f"INSERT INTO {inbox_table} {columns} "
+                    f"SELECT student_id, %s, %s, %s FROM {enrollment_table} "
+                    f"WHERE course_id = %s AND is_active = %s "
+                    f"ON CONFLICT DO NOTHING",
+                    [notification.pk, False, notification.created_at,
+                     notification.course_id, True]
+                )
+    
+    def unread_for(self, user):
+        """الإشعارات غير المقروءة للمستخدم (الأحدث أولاً)"""
+        return self.filter(recipient=user, is_read=False).order_by('-created_at')
+    
+    def mark_read(self, user, notification_ids=None):
+        """تعليم إشعارات المستخدم كمقروءة وإرجاع عدد الصفوف المحدثة"""
+        entries = self.filter(recipient=user, is_read=False)
+        if notification_ids is not None:
+            entries = entries.filter(notification_id__in=notification_ids)
+        return entries.update(is_read=True, read_at=timezone.now())
+
+
+class InboxEntry(models.Model):
+    """
+    نسخة الإشعار الخاصة بكل مستلم مع حالة القراءة الخاصة به
+    """
+    
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='inbox_entries',
+        verbose_name='المستلم'
+    )
+    
+    notification = models.ForeignKey(
+        Notification,
+        on_delete=models.CASCADE,
+        related_name='inbox_entries',
+        verbose_name='الإشعار'
+    )
+    
+    is_read = models.BooleanField(
+        default=False,
+        verbose_name='تمت القراءة'
+    )
+    
+    read_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='تاريخ القراءة'
+    )
+    
+    # نسخة من تاريخ إنشاء الإشعار للترتيب دون الحاجة إلى JOIN
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='تاريخ الإنشاء'
+    )
+    
+    objects = InboxEntryManager()
+    
+    class Meta:
+        verbose_name = 'إشعار مستلم'
+        verbose_name_plural = 'صندوق الإشعارات'
+        ordering = ['-created_at']
+        unique_together = ['recipient', 'notification']
+        indexes = [
+            # فهرس جزئي للإشعارات غير المقروءة فقط بترتيب العرض
+            models.Index(
+                fields=['recipient', '-created_at'],
+                condition=models.Q(is_read=False),
+                name='inbox_unread_idx'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.recipient_id} - {self.notification_id}"
+
+
+# =============================================================================
+# 12. نموذج إحصائيات المنصة (PlatformStats)
+# =============================================================================
+
+class PlatformStats(models.Model):
+    """
+    لقطة (Snapshot) مخزنة لإحصائيات المنصة يعرضها المسؤول في لوحة التحكم
+    صف واحد فقط (pk=1) يتم تحديثه عبر academy.stats
+    """
+    
+    SINGLETON_PK = 1
+    
+    total_users = models.PositiveIntegerField(default=0, verbose_name='عدد المستخدمين')
+    total_students = models.PositiveIntegerField(default=0, verbose_name='عدد الطلاب')
+    total_teachers = models.PositiveIntegerField(default=0, verbose_name='عدد المدرسين')
+    total_courses = models.PositiveIntegerField(default=0, verbose_name='عدد المقررات النشطة')
+    total_departments = models.PositiveIntegerField(default=0, verbose_name='عدد الأقسام')
+    total_files = models.PositiveIntegerField(default=0, verbose_name='عدد الملفات')
+    
+    # معرفات آخر المستخدمين والملفات (الأحدث أولاً)
+    recent_user_ids = models.JSONField(default=list, verbose_name='آخر المستخدمين')
+    recent_file_ids = models.JSONField(default=list, verbose_name='آخر الملفات')
+    
+    # None يعني أن اللقطة قديمة ويجب إعادة حسابها
+    refreshed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='تاريخ التحديث'
+    )
+    
+    class Meta:
+        verbose_name = 'إحصائيات المنصة'
+        verbose_name_plural = 'إحصائيات المنصة'
+    
+    def __str__(self):
+        return f"إحصائيات المنصة ({self.refreshed_at})"
+    
+    @classmethod
+    def mark_stale(cls):
+        """
+        تعليم اللقطة كقديمة وجدولة إعادة حسابها في الخلفية (academy.tasks)
+        اللقطة المعلمة مسبقاً لا يعاد كتابة صفها، فلا يتنافس كل حفظ على قفله
+        ولا تضاف مهمة جديدة حتى تنتهي إعادة الحساب
+        """
+        if cls.objects.filter(pk=cls.SINGLETON_PK, refreshed_at__isnull=False).update(refreshed_at=None):
+            transaction.on_commit(cls.schedule_refresh)
+    
+    @classmethod
+    def schedule_refresh(cls):
+        """
+        إضافة مهمة إعادة الحساب إن لم تكن في الطابور أو قيد التنفيذ
+        (تستدعى أيضاً عند عرض لقطة قديمة، فالمهمة التي فشلت أو لم تضف تعاد)
+        """
+        from .jobs import enqueue
+        
+        name = 'academy.tasks.refresh_platform_stats'
+        pending = Job.objects.filter(name=name, status__in=[Job.Status.QUEUED, Job.Status.RUNNING])
+        if not pending.exists():
+            enqueue(name)
+
+
+# =============================================================================
+# 13. نموذج جلسة الرفع المجزأ (UploadSession)
+# =============================================================================
+
+class UploadSession(models.Model):
+    """
+    رفع ملف محاضرة كبير على أجزاء قابلة للاستكمال بعد انقطاع الاتصال
+    
+    1. إنشاء الجلسة (اسم الملف، الحجم، المقرر...)
+    2. إرسال الأجزاء بالترتيب: كل جزء يبدأ عند received_bytes ويقرأ من الشبكة
+       إلى ملف مرحلي دون قفل، ثم يضاف إلى الملف المؤقت والجلسة مقفلة
+    3. الإنهاء: التحقق من الامتداد والحجم ثم إنشاء LectureFile بنقل الملف المؤقت
+    """
+    
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    
+    uploaded_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+        verbose_name='رفع بواسطة'
+    )
+    
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+        verbose_name='المقرر'
+    )
+    
+    title = models.CharField(
+        max_length=255,
+        verbose_name='عنوان الملف'
+    )
+    
+    description = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='الوصف'
+    )
+    
+    chapter = models.CharField(
+        max_length=100,
+        blank=True,
+        null=True,
+        verbose_name='الفصل/الوحدة'
+    )
+    
+    file_type = models.CharField(
+        max_length=10,
+        choices=LectureFile.FileType.choices,
+        default=LectureFile.FileType.PDF,
+        verbose_name='نوع الملف'
+    )
+    
+    filename = models.CharField(
+        max_length=255,
+        verbose_name='اسم الملف'
+    )
+    
+    total_size = models.PositiveBigIntegerField(
+        verbose_name='الحجم الكلي (بايت)'
+    )
+    
+    received_bytes = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='البايتات المستلمة'
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='تاريخ الإنشاء'
+    )
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='تاريخ التحديث'
+    )
+    
+    class Meta:
+        verbose_name = 'جلسة رفع'
+        verbose_name_plural = 'جلسات الرفع'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.filename} ({self.received_bytes}/{self.total_size})"
+    
+    class Incomplete(Exception):
+        """إنهاء جلسة لم تستلم كل البايتات"""
+    
+    @property
+    def temp_path(self):
+        """مسار الملف المؤقت الذي تضاف إليه الأجزاء"""
+        return Path(settings.CHUNKED_UPLOAD_DIR) / f"{self.pk}.part"
+    
+    @property
+    def is_complete(self):
+        return self.received_bytes == self.total_size
+    
+    def receive_chunk(self, stream, length):
+        """
+        قراءة جزء من stream إلى ملف مرحلي خاص بهذا الطلب وإرجاع مساره
+        القراءة من الشبكة تتم دون قفل الجلسة وعلى دفعات صغيرة، فلا يحمل الجزء
+        كاملاً في الذاكرة (انظر append_chunk)
+        """
+        staged = self.temp_path.with_name(f"{self.pk}.{uuid.uuid4().hex}.chunk")
+        staged.parent.mkdir(parents=True, exist_ok=True)
+        
+        try:
+            with open(staged, 'wb') as handle:
+                remaining = length
+                while remaining > 0:
+                    data = stream.read(min(remaining, 64 * 1024))
+                    if not data:
+                        break
+                    handle.write(data)
+                    remaining -= len(data)
+            
+            if remaining:
+                raise ValueError('انقطع الجزء قبل اكتماله')
+        except BaseException:
+            staged.unlink(missing_ok=True)
+            raise
+        return staged
+    
+    def append_chunk(self, staged, length):
+        """
+        إضافة جزء مرحلي مكتمل عند received_bytes
+        يستدعى والجلسة مقفلة (select_for_update) بعد التحقق من received_bytes
+        """
+        path = self.temp_path
+        path.touch(exist_ok=True)
+        
+        with open(path, 'r+b') as handle, open(staged, 'rb') as chunk:
+            # حذف أي بايتات من محاولة سابقة انقطعت قبل اكتمالها
+            handle.truncate(self.received_bytes)
+            handle.seek(self.received_bytes)
+            shutil.copyfileobj(chunk, handle, 64 * 1024)
+        
+        self.received_bytes += length
+        self.save(update_fields=['received_bytes', 'updated_at'])
+    
+    def finalize(self):
+        """
+        إنشاء ملف المحاضرة من الملف المؤقت بعد اكتمال الرفع
+        الجلسة تقفل وتعاد قراءتها داخل المعاملة، فطلب الإنهاء المتزامن الثاني
+        ينتظر ثم لا يجدها (DoesNotExist) بدلاً من إنشاء ملف ثان، والرفع غير
+        المكتمل يرفع Incomplete
+        """
+        lecture = LectureFile(
+            title=self.title,
+            description=self.description,
+            chapter=self.chapter,
+            file_type=self.file_type,
+            course=self.course,
+            uploaded_by=self.uploaded_by,
+        )
+        
+        temp_path = self.temp_path
+        with transaction.atomic():
+            session = type(self).objects.select_for_update().get(pk=self.pk)
+            if not session.is_complete:
+                raise self.Incomplete('الرفع غير مكتمل')
+            
+            with open(temp_path, 'rb') as handle:
+                lecture.file = CompletedUpload(handle, name=self.filename, size=session.received_bytes)
+                lecture._meta.get_field('file').run_validators(lecture.file)
+                lecture.save()
+                session.delete()
+        
+        temp_path.unlink(missing_ok=True)
+        return lecture
+    
+    def discard(self):
+        """إلغاء الجلسة وحذف ملفها المؤقت"""
+        temp_path = self.temp_path
+        self.delete()
+        temp_path.unlink(missing_ok=True)
+
+
+class CompletedUpload(File):
+    """
+    ملف مؤقت مكتمل على القرص: وجود temporary_file_path يجعل FileSystemStorage
+    ينقل الملف إلى مكانه النهائي بدلاً من نسخه
+    """
+    
+    def __init__(self, file, name, size):
+        super().__init__(file, name=name)
+        self.size = size
+    
+    def temporary_file_path(self):
+        return self.file.name
+
+
+# =============================================================================
+# 14. نموذج نسخ الملفات المخزنة (FileBlob)
+# =============================================================================
+
+class FileBlobManager(models.Manager):
+    """
+    عدّ المراجع لنسخ الملفات المشتركة بين أكثر من ملف محاضرة
+    
+    الإضافة والإزالة والحذف تقفل صف النسخة (select_for_update)، فلا تحذف
+    نسخة أضيف لها مرجع جديد بعد وصول عدادها إلى الصفر. الصف يبقى بعدد صفر
+    حتى يحذفه _delete_unreferenced مع الملف بعد التحقق من العدد تحت القفل.
+    """
+    
+    def acquire(self, lecture, content=None):
+        """
+        إضافة مرجع لنسخة ملف المحاضرة (داخل معاملة الحفظ)
+        content: المحتوى المرفوع، لإعادة كتابة النسخة إن حذفت قبل القفل
+        """
+        if not lecture.file:
+            return
+        blob, created = self.select_for_update().get_or_create(
+            name=lecture.file.name,
+            defaults={
+                'digest': lecture.content_digest,
+                'size': lecture.file_size,
+                'content_type': lecture.content_type,
+                'ref_count': 1,
+            }
+        )
+        if not created:
+            self.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+        
+        storage = lecture.file.storage
+        if not storage.exists(blob.name):
+            if content is None:
+                raise FileNotFoundError(blob.name)
+            # حذفت النسخة بعد أن وجدها التخزين وقبل القفل: تكتب مجدداً والصف مقفل
+            storage.save(lecture.original_name or blob.name, content)
+    
+    def release(self, name):
+        """إزالة مرجع، وحذف النسخة من التخزين إذا لم يبق لها مراجع"""
+        if not name:
+            return
+        with transaction.atomic():
+            blob = self.select_for_update().filter(name=name).first()
+            if blob is None:
+                return
+            self.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+        
+        if blob.ref_count <= 1:
+            transaction.on_commit(lambda: self._delete_unreferenced(name))
+    
+    def _delete_unreferenced(self, name):
+        with transaction.atomic():
+            # قد يكون نفس المحتوى رفع مرة أخرى قبل تنفيذ الحذف
+            blob = self.select_for_update().filter(name=name).first()
+            if blob is None or blob.ref_count > 0:
+                return
+            blob.delete()
+            lecture_storage().delete(name)
+            
+            from .extraction import discard_text
+            
+            discard_text(blob.digest)
+
+
+class FileBlob(models.Model):
+    """
+    نسخة ملف مخزنة مرة واحدة حسب المحتوى وعدد ملفات المحاضرات التي تشير إليها
+    """
+    
+    name = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name='المسار المخزن'
+    )
+    
+    digest = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        verbose_name='بصمة المحتوى'
+    )
+    
+    size = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='الحجم (بايت)'
+    )
+    
+    content_type = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='نوع المحتوى (MIME)'
+    )
+    
+    ref_count = models.IntegerField(
+        default=0,
+        verbose_name='عدد المراجع'
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='تاريخ الإنشاء'
+    )
+    
+    objects = FileBlobManager()
+    
+    class Meta:
+        verbose_name = 'نسخة ملف'
+        verbose_name_plural = 'نسخ الملفات'
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+
+# =============================================================================
+# 15. نموذج المهام الخلفية (Job)
+# =============================================================================
+
+class Job(models.Model):
+    """
+    مهمة خلفية في طابور قاعدة البيانات (انظر academy.jobs والأمر run_worker)
+    """
+    
+    class Status(models.TextChoices):
+        """حالة المهمة"""
+        QUEUED = 'queued', 'في الانتظار'
+        RUNNING = 'running', 'قيد التنفيذ'
+        DONE = 'done', 'مكتملة'
+        FAILED = 'failed', 'فشلت'
+    
+    # المسار الكامل للدالة المسجلة مثل academy.tasks.clear_stale_uploads
+    name = models.CharField(
+        max_length=200,
+        verbose_name='المهمة'
+    )
+    
+    args = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name='المعاملات'
+    )
+    
+    kwargs = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='المعاملات المسماة'
+    )
+    
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.QUEUED,
+        verbose_name='الحالة'
+    )
+    
+    # الأعلى أولاً
+    priority = models.SmallIntegerField(
+        default=0,
+        verbose_name='الأولوية'
+    )
+    
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='موعد التنفيذ'
+    )
+    
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='عدد المحاولات'
+    )
+    
+    max_attempts = models.PositiveSmallIntegerField(
+        default=3,
+        verbose_name='الحد الأقصى للمحاولات'
+    )
+    
+    locked_by = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='العامل'
+    )
+    
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='وقت بدء التنفيذ'
+    )
+    
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='آخر خطأ'
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='تاريخ الإنشاء'
+    )
+    
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='تاريخ الانتهاء'
+    )
+    
+    class Meta:
+        verbose_name = 'مهمة خلفية'
+        verbose_name_plural = 'المهام الخلفية'
+        ordering = ['-created_at']
+        indexes = [
+            # فهرس جزئي صغير يغطي استعلام سحب المهام المنتظرة فقط
+            models.Index(
+                fields=['-priority', 'run_at'],
+                name='job_queued_idx',
+                condition=models.Q(status='queued'),
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+
+# =============================================================================
+# 16. نماذج النصوص المستخرجة (TextExtraction / LectureText)
+# =============================================================================
+
+class TextExtraction(models.Model):
+    """
+    حالة استخراج النص لمحتوى ملف (حسب بصمته)، فلا يعاد الاستخراج
+    عند رفع نفس الملف مرة أخرى (انظر academy.extraction)
+    """
+    
+    class Status(models.TextChoices):
+        """حالة الاستخراج"""
+        PENDING = 'pending', 'في الانتظار'
+        DONE = 'done', 'مكتمل'
+        UNSUPPORTED = 'unsupported', 'نوع غير مدعوم'
+        FAILED = 'failed', 'فشل'
+    
+    content_digest = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name='بصمة المحتوى'
+    )
+    
+    status = models.CharField(
+        max_length=15,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name='الحالة'
+    )
+    
+    chunk_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='عدد المقاطع'
+    )
+    
+    error = models.TextField(
+        blank=True,
+        verbose_name='الخطأ'
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='تاريخ الإنشاء'
+    )
+    
+    extracted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='تاريخ الاستخراج'
+    )
+    
+    class Meta:
+        verbose_name = 'استخراج نص'
+        verbose_name_plural = 'عمليات استخراج النصوص'
+    
+    def __str__(self):
+        return f"{self.content_digest[:12]} ({self.get_status_display()})"
+
+
+class LectureText(models.Model):
+    """
+    مقطع مرتب من النص المستخرج من محتوى ملف محاضرة
+    """
+    
+    content_digest = models.CharField(
+        max_length=64,
+        verbose_name='بصمة المحتوى'
+    )
+    
+    position = models.PositiveIntegerField(
+        verbose_name='الترتيب'
+    )
+    
+    # رقم الصفحة/الشريحة التي جاء منها المقطع (إن وجد)
+    page = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='الصفحة'
+    )
+    
+    text = models.TextField(
+        verbose_name='النص'
+    )
+    
+    class Meta:
+        verbose_name = 'مقطع نص'
+        verbose_name_plural = 'نصوص المحاضرات'
+        ordering = ['content_digest', 'position']
+        unique_together = ['content_digest', 'position']
+    
+    def __str__(self):
+        return f"{self.content_digest[:12]} #{self.position}"
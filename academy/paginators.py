@@ -0,0 +1,49 @@
+"""
+Paginators مخصصة لنظام S-ACM
+============================
+"""
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator يستخدم تقدير PostgreSQL لعدد الصفوف (pg_class.reltuples)
+    بدلاً من COUNT(*) للجداول الكبيرة
+    
+    يستخدم التقدير فقط عندما يكون الاستعلام غير مفلتر (بدون بحث أو فلاتر)
+    ويتجاوز الحد ADMIN_ESTIMATED_COUNT_THRESHOLD، وإلا يعود إلى COUNT(*) العادي.
+    """
+    
+    @cached_property
+    def count(self):
+        estimate = self.estimated_count()
+        if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+            return estimate
+        return super().count
+    
+    def estimated_count(self):
+        """تقدير عدد الصفوف من إحصائيات PostgreSQL أو None إذا تعذر ذلك"""
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is None or query.where or query.distinct or query.combinator:
+            return None
+        
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        
+        # reltuples = -1 يعني أن الجدول لم يتم تحليله (ANALYZE) بعد
+        if row is None or row[0] is None or row[0] < 0:
+            return None
+        return row[0]
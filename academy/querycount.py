@@ -0,0 +1,85 @@
+"""
+عدّ استعلامات SQL واكتشاف N+1
+=============================
+QueryCounter يسجل كل استعلام عبر connection.execute_wrapper ويجمع الاستعلامات
+حسب شكلها (نص SQL قبل تعويض القيم)، فتكرار نفس الشكل عدة مرات في طلب واحد
+يدل غالباً على N+1 (مثل الوصول إلى enrollment.course.teacher داخل حلقة).
+
+يستخدم في:
+- QueryBudgetMiddleware: لكل طلب مع الحد المعلن عبر @query_budget(n)
+- الاختبارات: with count_queries() as counter / assert_query_budget(n)
+"""
+
+import re
+import threading
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+
+# قوائم IN بأطوال مختلفة تعتبر نفس الشكل
+IN_LIST = re.compile(r'\((?:%s, )*%s\)')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """تجاوز الـ View عدد الاستعلامات المسموح به"""
+
+
+def query_shape(sql):
+    """شكل الاستعلام: نص SQL مع توحيد قوائم IN"""
+    return IN_LIST.sub('(...)', sql)
+
+
+class QueryCounter:
+    """يمرر كـ execute_wrapper ويسجل أشكال الاستعلامات المنفذة"""
+    
+    def __init__(self):
+        self.shapes = Counter()
+        # قد يستدعى من عدة خيوط لنفس الطلب (academy.dashboards)
+        self.lock = threading.Lock()
+    
+    def __call__(self, execute, sql, params, many, context):
+        with self.lock:
+            self.shapes[query_shape(sql)] += 1
+        return execute(sql, params, many, context)
+    
+    @property
+    def count(self):
+        return sum(self.shapes.values())
+    
+    def repeated(self, threshold=None):
+        """الأشكال المتكررة threshold مرة أو أكثر (مرشحة لـ N+1)"""
+        threshold = threshold or settings.QUERY_BUDGET_REPEAT_THRESHOLD
+        return [(shape, times) for shape, times in self.shapes.most_common() if times >= threshold]
+    
+    def report(self, budget=None):
+        """وصف نصي لعدد الاستعلامات والأشكال المتكررة"""
+        lines = [f'{self.count} استعلام' + (f' (الحد {budget})' if budget is not None else '')]
+        for shape, times in self.repeated():
+            lines.append(f'  N+1? ×{times}: {shape}')
+        return '\n'.join(lines)
+    
+    def check(self, budget, label=''):
+        if budget is not None and self.count > budget:
+            raise QueryBudgetExceeded(f'{label} تجاوز حد الاستعلامات: {self.report(budget)}')
+
+
+@contextmanager
+def count_queries():
+    """عدّ الاستعلامات على جميع الاتصالات داخل الكتلة"""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+@contextmanager
+def assert_query_budget(budget, label=''):
+    """للاختبارات: فشل إذا نفذت الكتلة أكثر من budget استعلام"""
+    with count_queries() as counter:
+        yield counter
+    counter.check(budget, label)
+
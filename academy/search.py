@@ -0,0 +1,192 @@
+"""
+البحث النصي في المقررات وملفات المحاضرات
+========================================
+يحفظ نصاً مطبّعاً (Normalized) لكل مقرر وملف عند الحفظ، ويبحث فيه بفهرس:
+- PostgreSQL: عمود search_vector من نوع tsvector مع فهرس GIN
+- SQLite: جدول FTS5 افتراضي (academy_search_index) للتشغيل والاختبار محلياً
+- غير ذلك: بحث icontains بسيط دون ترتيب
+
+الفهارس (GIN وجدول FTS5) تنشأ في الترحيل 0010_full_text_search.
+
+التطبيع يوحد أشكال الهمزة والألف والتاء المربوطة والألف المقصورة ويحذف
+التشكيل والتطويل وأداة التعريف، ويطبق على النص وعلى عبارة البحث معاً.
+"""
+
+import re
+from functools import reduce
+
+from django.db import connection as default_connection
+from django.db.models import F, Value
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+
+# الحقول المفهرسة لكل نموذج مع وزن كل حقل (A أعلى من B)
+SEARCH_FIELDS = {
+    'course': (('name', 'A'), ('code', 'A'), ('description', 'B')),
+    'lecturefile': (('title', 'A'), ('chapter', 'B'), ('description', 'B')),
+}
+
+SQLITE_TABLE = 'academy_search_index'
+
+# التشكيل (فتحة، ضمة، كسرة، تنوين، شدة، سكون...) والتطويل
+DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+
+LETTER_VARIANTS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه',
+})
+
+# أداة التعريف مع حروف العطف والجر المتصلة بها
+ARTICLE = re.compile(r'^(?:وال|فال|بال|كال|لل|ال)(?=\w{2})')
+
+
+def normalize_tokens(text):
+    """تقسيم النص إلى كلمات مطبّعة"""
+    text = DIACRITICS.sub('', text or '').translate(LETTER_VARIANTS).lower()
+    return [ARTICLE.sub('', token) for token in re.findall(r'\w+', text)]
+
+
+def normalize(text):
+    """النص المطبّع ككلمات مفصولة بمسافات"""
+    return ' '.join(normalize_tokens(text))
+
+
+def weighted_documents(instance):
+    """النص المطبّع لكل وزن: {'A': '...', 'B': '...'}"""
+    documents = {'A': [], 'B': []}
+    for field, weight in SEARCH_FIELDS[instance._meta.model_name]:
+        documents[weight].append(normalize(getattr(instance, field)))
+    return {weight: ' '.join(filter(None, parts)) for weight, parts in documents.items()}
+
+
+# =============================================================================
+# محركات البحث حسب قاعدة البيانات
+# =============================================================================
+
+class SearchBackend:
+    """المحرك الافتراضي: icontains على الحقول الأصلية دون فهرس أو ترتيب"""
+    
+    def __init__(self, connection):
+        self.connection = connection
+    
+    def index(self, instance):
+        """تحديث فهرس صف واحد"""
+    
+    def remove(self, instance):
+        """حذف صف من الفهرس"""
+    
+    def search(self, queryset, query, limit):
+        from django.db.models import Q
+        
+        fields = [field for field, _ in SEARCH_FIELDS[queryset.model._meta.model_name]]
+        for token in query.split():
+            condition = Q()
+            for field in fields:
+                condition |= Q(**{f'{field}__icontains': token})
+            queryset = queryset.filter(condition)
+        return list(queryset[:limit])
+
+
+class PostgresSearchBackend(SearchBackend):
+    """tsvector موزون (إعداد simple لأن التطبيع العربي يتم في Python) مع فهرس GIN"""
+    
+    def index(self, instance):
+        vector = reduce(lambda left, right: left + right, [
+            SearchVector(Value(text), weight=weight, config='simple')
+            for weight, text in weighted_documents(instance).items()
+        ])
+        type(instance)._default_manager.filter(pk=instance.pk).update(search_vector=vector)
+    
+    def search(self, queryset, query, limit):
+        tokens = normalize_tokens(query)
+        if not tokens:
+            return []
+        # مطابقة بادئة الكلمة لدعم البحث أثناء الكتابة
+        search_query = SearchQuery(
+            ' & '.join(f'{token}:*' for token in tokens),
+            config='simple', search_type='raw'
+        )
+        return list(
+            queryset.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F('search_vector'), search_query))
+            .order_by('-rank', '-pk')[:limit]
+        )
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """جدول FTS5 مشترك بين النماذج مع ترتيب bm25"""
+    
+    def index(self, instance):
+        documents = weighted_documents(instance)
+        with self.connection.cursor() as cursor:
+            self._delete(cursor, instance)
+            cursor.execute(
+                f'INSERT INTO {SQLITE_TABLE} (kind, object_id, weight_a, weight_b) '
+                f'VALUES (%s, %s, %s, %s)',
+                [instance._meta.model_name, instance.pk, documents['A'], documents['B']]
+            )
+    
+    def remove(self, instance):
+        with self.connection.cursor() as cursor:
+            self._delete(cursor, instance)
+    
+    def _delete(self, cursor, instance):
+        cursor.execute(
+            f'DELETE FROM {SQLITE_TABLE} WHERE kind = %s AND object_id = %s',
+            [instance._meta.model_name, instance.pk]
+        )
+    
+    def search(self, queryset, query, limit):
+        from .stats import in_id_order
+        
+        tokens = normalize_tokens(query)
+        if not tokens:
+            return []
+        
+        # تقييد النتائج بالـ queryset داخل نفس الاستعلام قبل LIMIT
+        allowed_sql, allowed_params = queryset.order_by().values('pk').query.sql_with_params()
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT object_id FROM {SQLITE_TABLE} '
+                f'WHERE {SQLITE_TABLE} MATCH %s AND kind = %s AND object_id IN ({allowed_sql}) '
+                f'ORDER BY bm25({SQLITE_TABLE}, 0, 0, 4.0, 1.0) LIMIT %s',
+                [' '.join(f'"{token}"*' for token in tokens),
+                 queryset.model._meta.model_name, *allowed_params, limit]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        return in_id_order(queryset, ids)
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_backend(connection=None):
+    connection = connection or default_connection
+    return BACKENDS.get(connection.vendor, SearchBackend)(connection)
+
+
+def index_instance(instance):
+    get_backend().index(instance)
+
+
+def remove_instance(instance):
+    get_backend().remove(instance)
+
+
+def search(queryset, query, limit=20):
+    """البحث في queryset من Course أو LectureFile مرتباً حسب الصلة"""
+    return get_backend().search(queryset, query, limit)
+
+
+def rebuild_index(model, connection=None):
+    """إعادة فهرسة جميع صفوف نموذج (يعيد عدد الصفوف)"""
+    backend = get_backend(connection)
+    fields = [field for field, _ in SEARCH_FIELDS[model._meta.model_name]]
+    count = 0
+    for instance in model._default_manager.only('pk', *fields).iterator(chunk_size=500):
+        backend.index(instance)
+        count += 1
+    return count
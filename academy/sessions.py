@@ -0,0 +1,201 @@
+"""
+محرك الجلسات متعدد المستويات
+============================
+SESSION_ENGINE = 'academy.sessions' بدلاً من محرك قاعدة البيانات الافتراضي
+الذي يقرأ django_session في كل طلب لمستخدم مسجل:
+
+- L1: ذاكرة LRU داخل العملية لمدة قصيرة (SESSION_L1_TTL ثانية)
+- L2: التخزين المؤقت المشترك (SESSION_CACHE_ALIAS)
+- قاعدة البيانات: التخزين الدائم (نفس جدول django_session)
+
+الكتابة فقط عند تغير البيانات فعلاً: إضافة رسالة ثم عرضها في الطلب التالي
+(MessageMiddleware) أو تعيين نفس القيمة لا يكتب شيئاً. مدة الصلاحية تجدد
+بشكل كسول عند مرور SESSION_REFRESH_AFTER من عمر الجلسة بدلاً من كل طلب.
+
+L2 يجب أن يكون مشتركاً بين العمليات (Redis أو Memcached في CACHES): حذف
+الجلسة أو تعديلها يزيلها من L2 فتراها كل العمليات. إن كان SESSION_CACHE_ALIAS
+LocMemCache (لكل عملية) يتعطل L2 وتقرأ الجلسة من قاعدة البيانات بعد L1،
+لأن L2 محلي يبقي الجلسة المحذوفة صالحة في العمليات الأخرى حتى انتهائها
+(academy.sharedcache).
+
+تنبيه: L1 لكل عملية على حدة، فقد ترى عملية أخرى جلسة محذوفة أو معدلة
+لمدة SESSION_L1_TTL ثانية على الأكثر (0 لتعطيل L1).
+
+clear_expired (المستخدمة في الأمر clearsessions) تحذف الجلسات المنتهية على
+دفعات من SESSION_CLEAR_BATCH_SIZE صف بدلاً من DELETE واحد ضخم.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.utils import timezone
+
+from .metrics import record_cache
+from .sharedcache import shared_cache
+
+
+KEY_PREFIX = 'academy.sessions.'
+
+
+class LocalSessionCache:
+    """LRU داخل العملية: مفتاح الجلسة ← (البيانات المسلسلة، وقت الانتهاء، وقت التخزين)"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+    
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[2] > settings.SESSION_L1_TTL:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[:2]
+    
+    def set(self, key, dump, expires):
+        if settings.SESSION_L1_TTL <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (dump, expires, time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.SESSION_L1_MAX_ENTRIES:
+                self.entries.popitem(last=False)
+    
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_sessions = LocalSessionCache()
+
+
+class SessionStore(DBStore):
+    """جلسات قاعدة البيانات مع L1 داخل العملية و L2 في التخزين المؤقت"""
+    
+    def __init__(self, session_key=None):
+        # None إن لم يكن مشتركاً بين العمليات (L2 معطل)
+        self._cache = shared_cache(settings.SESSION_CACHE_ALIAS)
+        self._loaded_dump = None
+        self._refresh = False
+        super().__init__(session_key)
+    
+    def _dump(self, data):
+        return self.serializer().dumps(data)
+    
+    def _remember(self, dump, expires):
+        """تخزين الجلسة في L2 و L1"""
+        if self._cache is not None:
+            timeout = max(int(expires - time.time()), 1)
+            self._cache.set(KEY_PREFIX + self.session_key, (dump, expires), timeout)
+        local_sessions.set(self.session_key, dump, expires)
+    
+    def _forget(self, session_key):
+        if self._cache is not None:
+            self._cache.delete(KEY_PREFIX + session_key)
+        local_sessions.delete(session_key)
+    
+    def load(self):
+        entry = local_sessions.get(self.session_key)
+        record_cache('session-l1', entry is not None)
+        if entry is None and self._cache is not None:
+            entry = self._cache.get(KEY_PREFIX + self.session_key)
+            record_cache('session-l2', entry is not None)
+            if entry is not None:
+                local_sessions.set(self.session_key, *entry)
+        
+        if entry is None:
+            stored = self._get_session_from_db()
+            if stored is None:
+                self._session_key = None
+                return {}
+            data = self.decode(stored.session_data)
+            dump, expires = self._dump(data), stored.expire_date.timestamp()
+            self._remember(dump, expires)
+        else:
+            dump, expires = entry
+            if expires <= time.time():
+                self._forget(self.session_key)
+                self._session_key = None
+                return {}
+            data = self.serializer().loads(dump)
+        
+        self._loaded_dump = dump
+        
+        # تجديد الصلاحية الكسول: مرة واحدة بعد مرور جزء من عمر الجلسة
+        age = self.get_expiry_age(expiry=data.get('_session_expiry'))
+        if expires - time.time() < age * (1 - settings.SESSION_REFRESH_AFTER):
+            self._refresh = True
+            self.modified = True
+        return data
+    
+    def exists(self, session_key):
+        if local_sessions.get(session_key):
+            return True
+        if self._cache is not None and self._cache.get(KEY_PREFIX + session_key):
+            return True
+        return super().exists(session_key)
+    
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        
+        data = self._get_session(no_load=must_create)
+        dump = self._dump(data)
+        if not must_create and not self._refresh and dump == self._loaded_dump:
+            return
+        
+        super().save(must_create=must_create)
+        self._loaded_dump = dump
+        self._refresh = False
+        self._remember(dump, self.get_expiry_date().timestamp())
+    
+    def delete(self, session_key=None):
+        session_key = session_key or self.session_key
+        if session_key is None:
+            return
+        self._forget(session_key)
+        super().delete(session_key)
+    
+    # النسخ غير المتزامنة تمر بنفس المستويات
+    async def aload(self):
+        return await sync_to_async(self.load)()
+    
+    async def aexists(self, session_key):
+        return await sync_to_async(self.exists)(session_key)
+    
+    async def acreate(self):
+        return await sync_to_async(self.create)()
+    
+    async def asave(self, must_create=False):
+        return await sync_to_async(self.save)(must_create)
+    
+    async def adelete(self, session_key=None):
+        return await sync_to_async(self.delete)(session_key)
+    
+    @classmethod
+    def clear_expired(cls, batch_size=None):
+        """حذف الجلسات المنتهية على دفعات وإرجاع عددها"""
+        batch_size = batch_size or settings.SESSION_CLEAR_BATCH_SIZE
+        expired = cls.get_model_class().objects.filter(expire_date__lt=timezone.now())
+        deleted = 0
+        while True:
+            keys = list(expired.values_list('session_key', flat=True)[:batch_size])
+            if keys:
+                deleted += expired.model.objects.filter(session_key__in=keys).delete()[0]
+            if len(keys) < batch_size:
+                return deleted
+    
+    @classmethod
+    async def aclear_expired(cls):
+        return await sync_to_async(cls.clear_expired)()
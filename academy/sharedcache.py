@@ -0,0 +1,28 @@
+"""
+التخزين المؤقت المشترك بين العمليات
+===================================
+الجلسات (academy.sessions) ولقطات المستخدمين (academy.backends) وأرقام
+إصدار اللقطات (academy.snapshots) يجب أن تكون في تخزين مؤقت تراه كل
+العمليات (Redis أو Memcached في CACHES)، وإلا فإبطالها في عملية لا يصل
+إلى غيرها (مثل تسجيل الخروج أو إلغاء تفعيل حساب أو سحب صلاحية).
+
+LocMemCache لكل عملية على حدة و DummyCache لا يخزن شيئاً، فمع أي منهما
+تعود هذه الأجزاء إلى قاعدة البيانات مباشرة.
+"""
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared(alias):
+    """هل التخزين المؤقت alias مشترك بين العمليات"""
+    return not isinstance(caches[alias], PROCESS_LOCAL_BACKENDS)
+
+
+def shared_cache(alias):
+    """التخزين المؤقت alias إن كان مشتركاً، وإلا None"""
+    return caches[alias] if is_shared(alias) else None
@@ -0,0 +1,130 @@
+"""
+معالجات الإشارات (Signals) لنظام S-ACM
+=====================================
+"""
+
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .backends import INVALIDATING_FIELDS, cache_snapshot, invalidate_users
+from .capabilities import bump_version as bump_capabilities
+from .models import (
+    User, Department, Specialization, Course, Enrollment, LectureFile, PlatformStats, FileBlob,
+    RolePermission
+)
+from .taxonomy import bump_version as bump_taxonomy
+
+
+# الحقول التي تؤثر في إحصائيات المنصة عند تعديل صف موجود (academy.stats)
+STATS_FIELDS = frozenset({'role', 'is_active'})
+
+
+@receiver(pre_delete, sender=Enrollment)
+@receiver(pre_delete, sender=LectureFile)
+def lock_course_counters(sender, instance, **kwargs):
+    """
+    قفل الصف قبل حذفه وقراءة مساهمته المخزنة في عدادات مقرره
+    (الحذف المتزامن الثاني ينتظر ثم لا يجد الصف فلا ينقص العدادات مرة أخرى)
+    """
+    instance._deleted_counters = instance.lock_course_counters()
+
+
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_delete, sender=LectureFile)
+def release_course_counters(sender, instance, **kwargs):
+    """إنقاص عدادات المقرر عند حذف تسجيل أو ملف (بما في ذلك الحذف المتتالي)"""
+    instance.release_course_counters(getattr(instance, '_deleted_counters', (None, {})))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Department)
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=LectureFile)
+def mark_platform_stats_stale_on_save(sender, instance, created, update_fields=None, **kwargs):
+    """
+    تعليم إحصائيات المنصة كقديمة عند تغيير النماذج المعنية
+    الحفظ الجزئي لحقول لا تؤثر في الإحصائيات (مثل last_login عند الدخول) لا يغيرها
+    """
+    if created or update_fields is None or STATS_FIELDS.intersection(update_fields):
+        PlatformStats.mark_stale()
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Department)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=LectureFile)
+def mark_platform_stats_stale_on_delete(sender, instance, **kwargs):
+    """تعليم إحصائيات المنصة كقديمة عند الحذف"""
+    PlatformStats.mark_stale()
+
+
+@receiver(post_delete, sender=LectureFile)
+def release_file_blob(sender, instance, **kwargs):
+    """إزالة مرجع الملف المحذوف من نسخته المخزنة"""
+    FileBlob.objects.release(instance.file.name)
+
+
+@receiver(post_save, sender=LectureFile)
+def schedule_text_extraction(sender, instance, **kwargs):
+    """استخراج نص المحتوى الجديد في الخلفية (المحتوى المكرر يتم تجاهله)"""
+    from .extraction import schedule_extraction
+    
+    schedule_extraction(instance)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=LectureFile)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    """تحديث فهرس البحث عند تغير الحقول النصية فقط"""
+    from .search import SEARCH_FIELDS, index_instance
+    
+    fields = {field for field, _ in SEARCH_FIELDS[sender._meta.model_name]}
+    if update_fields is None or fields & set(update_fields):
+        index_instance(instance)
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=LectureFile)
+def remove_from_search_index(sender, instance, **kwargs):
+    from .search import remove_instance
+    
+    remove_instance(instance)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_snapshot_on_save(sender, instance, update_fields=None, **kwargs):
+    """
+    إبطال لقطة المصادقة المخزنة للمستخدم (academy.backends)
+    الحفظ الجزئي لحقول خارج اللقطة (مثل last_login) لا يبطلها
+    """
+    if update_fields is None or INVALIDATING_FIELDS.intersection(update_fields):
+        invalidate_users([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def invalidate_user_snapshot_on_delete(sender, instance, **kwargs):
+    invalidate_users([instance.pk])
+
+
+@receiver(user_logged_in)
+def cache_user_snapshot_on_login(sender, request, user, **kwargs):
+    """تخزين لقطة المستخدم عند الدخول (الصف محمل مسبقاً) فلا يقرأ في الطلب التالي"""
+    if not getattr(user, '_from_snapshot', False):
+        cache_snapshot(user)
+
+
+@receiver(post_save, sender=RolePermission)
+@receiver(post_delete, sender=RolePermission)
+def reload_capabilities(sender, instance, **kwargs):
+    """إعادة تحميل مصفوفة الصلاحيات في كل العمليات (academy.capabilities)"""
+    bump_capabilities()
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_save, sender=Specialization)
+@receiver(post_delete, sender=Department)
+@receiver(post_delete, sender=Specialization)
+def rebuild_taxonomy(sender, instance, **kwargs):
+    """إعادة بناء شجرة الأقسام والتخصصات في كل العمليات (academy.taxonomy)"""
+    bump_taxonomy()
@@ -0,0 +1,80 @@
+"""
+لقطات البيانات داخل العملية مع إصدار مشترك
+==========================================
+بيانات صغيرة نادرة التغير تقرأ في طلبات كثيرة (مصفوفة الصلاحيات، شجرة
+الأقسام والتخصصات) تبنى مرة واحدة لكل عملية وتحفظ في الذاكرة. لكل لقطة رقم
+إصدار في التخزين المؤقت المشترك يتغير عند تعديل بياناتها (bump من signals.py):
+
+- العملية التي عدلت تعيد البناء في الطلب التالي مباشرة
+- بقية العمليات تقارن إصدارها بالإصدار المشترك مرة كل check_interval ثانية
+  على الأكثر، فأغلب الطلبات لا تصل إلى التخزين المؤقت ولا قاعدة البيانات
+
+إن لم يكن التخزين المؤقت الافتراضي مشتركاً بين العمليات (LocMemCache، انظر
+academy.sharedcache) فلا يوجد إصدار مشترك، وتعيد كل عملية بناء اللقطة مرة كل
+check_interval ثانية، فيصل التعديل إلى كل العمليات خلال هذه المدة على الأكثر.
+"""
+
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from django.db import transaction
+
+from .sharedcache import shared_cache
+
+
+class VersionedSnapshot:
+    """قيمة تبنيها build() وتحفظ في العملية حتى يتغير الإصدار المشترك"""
+    
+    def __init__(self, key, build, interval_setting):
+        self.key = key
+        self.build = build
+        # اسم الإعداد الذي يحدد أقصى مدة قبل ملاحظة تعديل في عملية أخرى
+        self.interval_setting = interval_setting
+        self.lock = threading.Lock()
+        self.value = None
+        self.version = None
+        self.checked_at = 0.0
+    
+    def current_version(self):
+        """الإصدار المشترك (ينشأ إن لم يوجد)، أو None دون تخزين مؤقت مشترك"""
+        cache = shared_cache(DEFAULT_CACHE_ALIAS)
+        if cache is None:
+            return None
+        cache.add(self.key, uuid.uuid4().hex, None)
+        return cache.get(self.key)
+    
+    def get(self):
+        value = self.value
+        if value is not None and time.monotonic() - self.checked_at < getattr(settings, self.interval_setting):
+            return value
+        
+        with self.lock:
+            # الإصدار يقرأ قبل البناء: إن تغيرت البيانات أثناء البناء فاللقطة تحمل إصداراً قديماً
+            version = self.current_version()
+            # دون إصدار مشترك تعاد اللقطة بعد كل فترة
+            if self.value is None or version is None or self.version != version:
+                self.value = self.build()
+                self.version = version
+            self.checked_at = time.monotonic()
+            return self.value
+    
+    def expire(self):
+        """إجبار العملية على مقارنة الإصدار في الاستخدام التالي"""
+        self.checked_at = 0.0
+    
+    def bump(self):
+        """
+        إصدار جديد فوراً ثم مرة أخرى بعد اكتمال المعاملة الحالية
+        (قبل اكتمالها قد تبني عملية أخرى البيانات القديمة بالإصدار الجديد)
+        """
+        def bump():
+            cache = shared_cache(DEFAULT_CACHE_ALIAS)
+            if cache is not None:
+                cache.set(self.key, uuid.uuid4().hex, None)
+            self.expire()
+        
+        bump()
+        transaction.on_commit(bump)
@@ -0,0 +1,76 @@
+"""
+خدمة إحصائيات المنصة
+====================
+تحسب إحصائيات لوحة المسؤول باستعلام تجميع شرطي واحد لكل جدول وتخزنها
+في PlatformStats، بحيث يكون عرض لوحة التحكم بزمن ثابت مهما كبرت الجداول.
+
+يعاد الحساب في الخلفية (المهمة refresh_platform_stats في academy.tasks) عند
+تعليم اللقطة كقديمة بعد تغيير أحد النماذج (انظر signals.py)، أو عندما تصبح
+أقدم من PLATFORM_STATS_MAX_AGE ثانية. حتى ذلك تعرض اللقطة السابقة، ولا تحسب
+داخل الطلب إلا أول مرة (قبل وجود أي لقطة). عرض لقطة قديمة دون مهمة إعادة
+حساب في الطابور أو قيد التنفيذ (فشلت المهمة أو لم تضف) يضيف مهمة جديدة.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import User, Department, Course, LectureFile, PlatformStats
+
+
+RECENT_LIMIT = 5
+
+
+def compute_platform_stats():
+    """حساب الإحصائيات من الجداول الفعلية (استعلام واحد لكل جدول)"""
+    users = User.objects.aggregate(
+        total_users=Count('pk'),
+        total_students=Count('pk', filter=Q(role=User.Role.STUDENT)),
+        total_teachers=Count('pk', filter=Q(role=User.Role.TEACHER)),
+    )
+    
+    return {
+        **users,
+        'total_courses': Course.objects.filter(is_active=True).count(),
+        'total_departments': Department.objects.count(),
+        'total_files': LectureFile.objects.count(),
+        'recent_user_ids': list(
+            User.objects.order_by('-date_joined').values_list('pk', flat=True)[:RECENT_LIMIT]
+        ),
+        'recent_file_ids': list(
+            LectureFile.objects.order_by('-uploaded_at').values_list('pk', flat=True)[:RECENT_LIMIT]
+        ),
+    }
+
+
+def refresh_platform_stats():
+    """إعادة حساب اللقطة وحفظها"""
+    snapshot, _ = PlatformStats.objects.update_or_create(
+        pk=PlatformStats.SINGLETON_PK,
+        defaults={**compute_platform_stats(), 'refreshed_at': timezone.now()},
+    )
+    return snapshot
+
+
+def get_platform_stats():
+    """إرجاع اللقطة الحالية، وجدولة إعادة حسابها إذا انتهت صلاحيتها"""
+    snapshot = PlatformStats.objects.filter(pk=PlatformStats.SINGLETON_PK).first()
+    if snapshot is None:
+        return refresh_platform_stats()
+    
+    max_age = timedelta(seconds=settings.PLATFORM_STATS_MAX_AGE)
+    if snapshot.refreshed_at is None:
+        PlatformStats.schedule_refresh()
+    elif timezone.now() - snapshot.refreshed_at > max_age:
+        PlatformStats.mark_stale()
+    
+    return snapshot
+
+
+def in_id_order(queryset, ids):
+    """جلب الصفوف بالمفتاح الأساسي مع الحفاظ على ترتيب المعرفات"""
+    # الترتيب يستعاد هنا، فلا داعي لفرز قاعدة البيانات حسب الترتيب الافتراضي
+    rows = queryset.order_by().in_bulk(ids)
+    return [rows[pk] for pk in ids if pk in rows]
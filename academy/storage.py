@@ -0,0 +1,87 @@
+"""
+تخزين ملفات المحاضرات حسب المحتوى (Content-addressed storage)
+==============================================================
+كل ملف يحفظ مرة واحدة باسم مشتق من بصمة محتواه (SHA-256):
+    lectures/blobs/ab/cd/<sha256>.pdf
+
+فإذا رُفع نفس الملف لأكثر من مقرر أو عام دراسي يعاد استخدام نفس النسخة.
+البصمة تحسب أثناء كتابة الملف على دفعات دون تحميله كاملاً في الذاكرة.
+عدد المراجع لكل نسخة يحفظ في FileBlob ولا تحذف النسخة إلا بحذف آخر ملف يشير إليها.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, storages
+
+
+BLOB_NAME_RE = re.compile(r'(?:^|/)blobs/[0-9a-f]{2}/[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})(?:\.\w+)?$')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage يحفظ الملفات بأسماء مشتقة من بصمة المحتوى"""
+    
+    chunk_size = 64 * 1024
+    
+    def __init__(self, prefix='lectures', **kwargs):
+        super().__init__(**kwargs)
+        self.prefix = prefix.strip('/')
+    
+    def blob_name(self, digest, original_name):
+        """الاسم النهائي للنسخة المخزنة"""
+        extension = os.path.splitext(original_name)[1].lower()
+        return f"{self.prefix}/blobs/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+    
+    @staticmethod
+    def digest_for(name):
+        """استخراج البصمة من اسم الملف المخزن (أو '' للملفات القديمة)"""
+        match = BLOB_NAME_RE.search(name or '')
+        return match.group('digest') if match else ''
+    
+    def get_available_name(self, name, max_length=None):
+        # الاسم النهائي يحدد في _save حسب المحتوى
+        return name
+    
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        
+        if hasattr(content, 'temporary_file_path'):
+            # ملف مكتمل على القرص: نحسب البصمة ثم ننقله بدلاً من نسخه
+            source = content.temporary_file_path()
+            with open(source, 'rb') as handle:
+                for chunk in iter(lambda: handle.read(self.chunk_size), b''):
+                    digest.update(chunk)
+            is_temporary = False
+        else:
+            os.makedirs(self.location, exist_ok=True)
+            handle, source = tempfile.mkstemp(dir=self.location, suffix='.upload')
+            with os.fdopen(handle, 'wb') as output:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks(self.chunk_size):
+                    digest.update(chunk)
+                    output.write(chunk)
+            is_temporary = True
+        
+        final_name = self.blob_name(digest.hexdigest(), name)
+        full_path = self.path(final_name)
+        
+        if os.path.exists(full_path):
+            # نفس المحتوى مخزن مسبقاً
+            if is_temporary:
+                os.remove(source)
+        else:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            file_move_safe(source, full_path, allow_overwrite=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(full_path, self.file_permissions_mode)
+        
+        return final_name
+
+
+def lecture_storage():
+    """التخزين المستخدم لـ LectureFile.file (STORAGES['lectures'])"""
+    return storages['lectures']
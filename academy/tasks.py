@@ -0,0 +1,85 @@
+"""
+المهام الخلفية لنظام S-ACM
+==========================
+دوال تنفذ عبر طابور المهام (academy.jobs) بدلاً من داخل الطلب
+"""
+
+import os
+
+from django.core.management import call_command
+
+from .ai_cache import evict_ai_cache as evict_cache
+from .enrollments import deactivate_cohort, describe_counts, enroll_cohort
+from .extraction import run_extraction
+from .imports import import_students
+from .jobs import job
+from .models import Notification
+from .stats import refresh_platform_stats as refresh_stats
+
+
+@job
+def refresh_platform_stats():
+    """إعادة حساب لقطة إحصائيات لوحة المسؤول"""
+    refresh_stats()
+
+
+@job
+def clear_stale_uploads(hours=24):
+    """حذف جلسات الرفع المجزأ المتروكة"""
+    call_command('clear_stale_uploads', hours=hours)
+
+
+@job
+def evict_ai_cache():
+    """حذف ملخصات وأسئلة الذكاء الاصطناعي القديمة أو الأقل استخداماً"""
+    evict_cache()
+
+
+@job
+def extract_lecture_text(digest):
+    """استخراج نص محتوى ملف محاضرة (حسب البصمة) وحفظه"""
+    run_extraction(digest)
+
+
+@job
+def import_students_file(path, requested_by):
+    """
+    استيراد ملف طلاب مرفوع من لوحة التحكم ثم إشعار المسؤول بالنتيجة
+    الصفوف المرفوضة تحفظ بجانب الملف في <path>.errors.csv
+    """
+    with open(path, 'rb') as handle:
+        report = import_students(handle, path)
+    
+    content = report.summary()
+    if report.errors:
+        with open(f'{path}.errors.csv', 'w', encoding='utf-8', newline='') as errors:
+            report.write_errors(errors)
+        content += f'\nتقرير الأخطاء: {path}.errors.csv\n' + '\n'.join(
+            f'السطر {line} ({academic_id}): {message}'
+            for line, academic_id, message in report.errors[:20]
+        )
+    os.remove(path)
+    
+    Notification.objects.create(
+        title='اكتمل استيراد الطلاب',
+        content=content,
+        sender_id=requested_by,
+        recipient_id=requested_by,
+    )
+
+
+@job
+def cohort_enrollment(course_ids, cohort=None, deactivate=False, requested_by=None):
+    """تسجيل دفعة كبيرة في مقررات (أو إلغاء تسجيلها) ثم إشعار المسؤول بالنتيجة"""
+    if deactivate:
+        counts = deactivate_cohort(course_ids, cohort)
+    else:
+        counts = enroll_cohort(course_ids, cohort)
+    
+    if requested_by:
+        Notification.objects.create(
+            title='اكتمل التسجيل الجماعي',
+            content=describe_counts(counts),
+            sender_id=requested_by,
+            recipient_id=requested_by,
+        )
@@ -0,0 +1,88 @@
+"""
+شجرة الأقسام والتخصصات في الذاكرة
+=================================
+قائمة التخصصات تطلب مع كل تغيير للقسم في صفحة التسجيل، والشجرة نادراً ما
+تتغير، فتبنى لقطة واحدة لكل عملية (استعلامان) تحتوي الاستجابات مسلسلة مسبقاً
+مع ETag قوي لكل منها:
+
+- /api/taxonomy/: الشجرة كاملة (الأقسام وتخصصات كل قسم)
+- /api/specializations/?department_id=N: تخصصات قسم واحد
+
+تعاد اللقطة عند حفظ أو حذف قسم أو تخصص (signals.py عبر academy.snapshots)،
+وتلاحظ بقية العمليات التعديل خلال TAXONOMY_CHECK_INTERVAL ثانية على الأكثر،
+والاستجابات تحمل Cache-Control، فالمتصفحات والوسطاء يعيدون التحقق بـ
+If-None-Match ويحصلون على 304 دون جسم ما لم تتغير الشجرة.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from .models import Department, Specialization
+from .snapshots import VersionedSnapshot
+
+
+VERSION_KEY = 'academy.taxonomy.version'
+
+
+class Document:
+    """استجابة JSON مسلسلة مسبقاً مع ETag قوي"""
+    
+    __slots__ = ('body', 'etag')
+    
+    def __init__(self, data):
+        self.body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+    
+    def response(self, request):
+        """الاستجابة أو 304 إن طابق If-None-Match"""
+        response = HttpResponse(self.body, content_type='application/json')
+        response['ETag'] = self.etag
+        patch_cache_control(response, public=True, max_age=settings.TAXONOMY_MAX_AGE)
+        return get_conditional_response(request, etag=self.etag, response=response)
+
+
+EMPTY = Document([])
+
+
+class Taxonomy:
+    """لقطة ثابتة: الشجرة كاملة وتخصصات كل قسم"""
+    
+    def __init__(self, departments, specializations):
+        children = {pk: [] for pk, name in departments}
+        for pk, name, department_id in specializations:
+            children[department_id].append({'id': pk, 'name': name})
+        
+        self.tree = Document([
+            {'id': pk, 'name': name, 'specializations': children[pk]}
+            for pk, name in departments
+        ])
+        # المفتاح نص كما يصل في department_id
+        self.by_department = {str(pk): Document(items) for pk, items in children.items()}
+    
+    def specializations(self, department_id):
+        return self.by_department.get(department_id, EMPTY)
+    
+    @classmethod
+    def load(cls):
+        """بناء اللقطة باستعلامين (بترتيب الاسم كما في Meta.ordering)"""
+        departments = list(Department.objects.order_by('name').values_list('pk', 'name'))
+        specializations = list(
+            Specialization.objects.order_by('name').values_list('pk', 'name', 'department_id')
+        )
+        return cls(departments, specializations)
+
+
+taxonomy = VersionedSnapshot(VERSION_KEY, Taxonomy.load, 'TAXONOMY_CHECK_INTERVAL')
+
+
+def get_taxonomy():
+    return taxonomy.get()
+
+
+def bump_version():
+    """إعادة بناء اللقطة في كل العمليات بعد تعديل قسم أو تخصص"""
+    taxonomy.bump()
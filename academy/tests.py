@@ -1,3 +1,2120 @@
-from django.test import TestCase
+import io
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import timedelta
+from unittest.mock import Mock, patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib import admin
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, OperationalError, close_old_connections, connection, transaction
+from django.db.models import QuerySet, Sum
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    User, Department, Specialization, Course,
+    Enrollment, LectureFile, Notification,
+    AISummary, AIQuestion, InboxEntry, RolePermission, FileBlob, Job, PlatformStats, UploadSession,
+    TextExtraction, LectureText
+)
+from . import capabilities, imports, jobs, taxonomy, views
+from .ai_cache import evict_ai_cache, get_or_generate_questions, get_or_generate_summary, single_flight
+from .dashboards import aevaluate, evaluate, teacher_queries
+from .backends import CachedModelBackend, invalidate_users
+from .counters import CacheCounterBuffer, LocalCounterBuffer, counters
+from .downloads import RangeNotSatisfiable, parse_range
+from .extraction import iter_lecture_text, run_extraction, schedule_extraction
+from .enrollments import deactivate_cohort, enroll_cohort
+from .imports import ImportFileError, import_students
+from .management.commands import loadtest
+from .metrics import Histogram, MetricsRegistry, RequestMetrics, registry
+from .querycount import QueryBudgetExceeded, assert_query_budget, count_queries
+from .search import normalize, rebuild_index
+from .snapshots import VersionedSnapshot
+from .sessions import SessionStore, local_sessions
+from .stats import get_platform_stats, refresh_platform_stats
+
+
+class SharedCacheMixin:
+    """
+    تخزين مؤقت مشترك بين العمليات كما مع Redis في الإنتاج: FileBasedCache في
+    مجلد مؤقت، و other_worker كائن مستقل على نفس المجلد يمثل عملية أخرى
+    """
+    
+    @classmethod
+    def setUpClass(cls):
+        cache_dir = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir}
+        cls.enterClassContext(override_settings(CACHES={'default': backend, 'other_worker': backend}))
+        super().setUpClass()
+
+
+class MediaRootMixin:
+    """ملفات المحاضرات في مجلد مؤقت يحذف بعد اختبارات الصنف"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+        super().setUpClass()
+
+
+class AdminChangelistQueryBudgetTests(TestCase):
+    """عدد استعلامات قوائم لوحة التحكم ثابت ولا يعتمد على حجم الصفحة أو البيانات"""
+    
+    models = [
+        User, Department, Specialization, Course, Enrollment,
+        LectureFile, Notification, InboxEntry, AISummary, AIQuestion,
+    ]
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(
+            username='root', password='pass', role=User.Role.ADMIN
+        )
+        cls.seeded = 0
+    
+    def seed(self, count):
+        """إضافة count صفاً جديداً لكل جدول"""
+        for _ in range(count):
+            i = self.seeded = self.seeded + 1
+            teacher = User.objects.create(
+                username=f'teacher{i}', role=User.Role.TEACHER
+            )
+            department = Department.objects.create(name=f'قسم {i}', head=teacher)
+            specialization = Specialization.objects.create(
+                name=f'تخصص {i}', department=department
+            )
+            student = User.objects.create(
+                username=f'student{i}', department=department,
+                specialization=specialization
+            )
+            course = Course.objects.create(
+                name=f'مقرر {i}', code=f'C{i}', specialization=specialization,
+                level=1, teacher=teacher
+            )
+            Enrollment.objects.create(student=student, course=course)
+            lecture = LectureFile.objects.bulk_create([
+                LectureFile(
+                    title=f'ملف {i}', file=f'lectures/{i}.pdf',
+                    course=course, uploaded_by=teacher
+                )
+            ])[0]
+            Notification.objects.create(
+                title=f'إشعار {i}', content='-', sender=teacher, course=course
+            )
+            AISummary.objects.create(
+                lecture_file=lecture, summary_text='-', generated_by=student
+            )
+            AIQuestion.objects.create(
+                lecture_file=lecture, question_text='-', correct_answer='-',
+                generated_by=student
+            )
+    
+    def changelist_queries(self, model, per_page):
+        model_admin = admin.site._registry[model]
+        url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+        
+        with patch.object(model_admin, 'list_per_page', per_page):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+    
+    def test_queries_do_not_depend_on_page_size(self):
+        self.client.force_login(self.admin_user)
+        self.seed(6)
+        
+        for model in self.models:
+            with self.subTest(model=model.__name__):
+                self.assertEqual(
+                    self.changelist_queries(model, per_page=2),
+                    self.changelist_queries(model, per_page=100),
+                )
+    
+    def test_queries_do_not_depend_on_table_size(self):
+        self.client.force_login(self.admin_user)
+        self.seed(2)
+        small = {model: self.changelist_queries(model, per_page=100) for model in self.models}
+        
+        self.seed(8)
+        for model in self.models:
+            with self.subTest(model=model.__name__):
+                self.assertEqual(small[model], self.changelist_queries(model, per_page=100))
+
+
+class NotificationInboxTests(TestCase):
+    """توزيع الإشعارات على صناديق المستلمين وحالة القراءة"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='قسم')
+        specialization = Specialization.objects.create(name='تخصص', department=department)
+        cls.teacher = User.objects.create(username='teacher', role=User.Role.TEACHER, academic_id='T1')
+        cls.students = [
+            User.objects.create(username=f'student{i}', role=User.Role.STUDENT, academic_id=f'S{i}')
+            for i in range(3)
+        ]
+        cls.course = Course.objects.create(
+            name='مقرر', code='C1', specialization=specialization, level=1, teacher=cls.teacher
+        )
+        for student, active in zip(cls.students, (True, True, False)):
+            Enrollment.objects.create(student=student, course=cls.course, is_active=active)
+    
+    def notify(self, **fields):
+        return Notification.objects.create(title='إشعار', content='-', sender=self.teacher, **fields)
+    
+    def test_fan_out_to_active_students_and_recipient(self):
+        notification = self.notify(course=self.course, recipient=self.teacher)
+        recipients = set(InboxEntry.objects.filter(notification=notification).values_list('recipient', flat=True))
+        self.assertEqual(recipients, {self.teacher.pk, self.students[0].pk, self.students[1].pk})
+        
+        # الحفظ اللاحق لا يعيد التوزيع
+        notification.title = 'معدل'
+        notification.save()
+        self.assertEqual(InboxEntry.objects.filter(notification=notification).count(), 3)
+    
+    def test_failed_fan_out_does_not_keep_notification(self):
+        with patch.object(InboxEntry.objects, 'deliver', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.notify(course=self.course)
+        self.assertFalse(Notification.objects.exists())
+    
+    def test_unread_count_and_mark_read(self):
+        first, second = self.notify(course=self.course), self.notify(course=self.course)
+        student = self.students[0]
+        self.assertEqual(InboxEntry.objects.unread_for(student).count(), 2)
+        
+        self.client.force_login(student)
+        response = self.client.post(reverse('mark_notification_read', args=[first.pk]), {'next': '/profile/'})
+        self.assertRedirects(response, '/profile/', fetch_redirect_response=False)
+        self.assertEqual(
+            list(InboxEntry.objects.unread_for(student).values_list('notification', flat=True)), [second.pk]
+        )
+        # قراءة الطالب لا تغير حالة الآخرين
+        self.assertEqual(InboxEntry.objects.unread_for(self.students[1]).count(), 2)
+        
+        self.client.post(reverse('mark_all_notifications_read'))
+        self.assertEqual(InboxEntry.objects.unread_for(student).count(), 0)
+        self.assertTrue(InboxEntry.objects.get(recipient=student, notification=second).read_at)
+    
+    def test_next_outside_site_is_ignored(self):
+        self.client.force_login(self.students[0])
+        for url in ('https://evil.example/', '//evil.example/'):
+            response = self.client.post(reverse('mark_all_notifications_read'), {'next': url})
+            self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+
+
+class SearchTests(TestCase):
+    """البحث النصي مع التطبيع العربي وتقييد النتائج بمقررات الطالب"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        teacher = User.objects.create(username='teacher', role=User.Role.TEACHER)
+        cls.student = User.objects.create(username='student', role=User.Role.STUDENT)
+        department = Department.objects.create(name='قسم')
+        specialization = Specialization.objects.create(name='تخصص', department=department)
+        
+        cls.enrolled, cls.other = [
+            Course.objects.create(
+                name=name, code=code, specialization=specialization,
+                level=1, teacher=teacher
+            )
+            for name, code in [('مقدمة في البرمجة', 'CS101'), ('البرمجة المتقدمة', 'CS201')]
+        ]
+        Enrollment.objects.create(student=cls.student, course=cls.enrolled)
+        
+        # bulk_create لا يرسل الإشارات (ولا يوجد ملف فعلي)، لذا تتم الفهرسة يدوياً
+        LectureFile.objects.bulk_create([
+            LectureFile(
+                title='المحاضرة الأولى: المتغيرات', file=f'lectures/{course.code}.pdf',
+                course=course, uploaded_by=teacher
+            )
+            for course in (cls.enrolled, cls.other)
+        ])
+        rebuild_index(LectureFile)
+    
+    def search(self, query):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('search'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+    
+    def test_normalize_unifies_arabic_variants(self):
+        self.assertEqual(normalize('الْمُحاضَرَةُ'), normalize('محاضره'))
+        self.assertEqual(normalize('إدارة'), normalize('ادارة'))
+        self.assertEqual(normalize('الأولى'), normalize('اولي'))
+    
+    def test_results_are_limited_to_enrolled_courses(self):
+        results = self.search('برمجه')
+        self.assertEqual([course['id'] for course in results['courses']], [self.enrolled.id])
+        
+        results = self.search('المُتغيّرات')
+        self.assertEqual(
+            [lecture['course_id'] for lecture in results['files']], [self.enrolled.id]
+        )
+    
+    def test_index_follows_changes(self):
+        self.enrolled.name = 'فيزياء'
+        self.enrolled.save()
+        self.assertEqual(self.search('برمجة')['courses'], [])
+        self.assertEqual(len(self.search('فيزياء')['courses']), 1)
+
+
+class UserDirectoryTests(TestCase):
+    """البحث في دليل المستخدمين للإكمال التلقائي"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(
+            username='teacher', first_name='أحمد', last_name='سالم',
+            role=User.Role.TEACHER, academic_id='T100'
+        )
+        cls.students = [
+            User.objects.create(
+                username=f'student{i}', first_name=first, last_name='العلي',
+                email=f'student{i}@uni.edu', academic_id=f'2024{i:03d}'
+            )
+            for i, first in enumerate(['إبراهيم', 'أحمد', 'فاطمة'])
+        ]
+    
+    def autocomplete(self, **params):
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('user_autocomplete'), params)
+        self.assertEqual(response.status_code, 200)
+        return [result['id'] for result in response.json()['results']]
+    
+    def test_academic_id_prefix(self):
+        self.assertEqual(
+            self.autocomplete(q='2024'), [student.id for student in self.students]
+        )
+        self.assertEqual(self.autocomplete(q='2024002'), [self.students[2].id])
+    
+    def test_normalized_name_and_role_filter(self):
+        self.assertEqual(self.autocomplete(q='ابراهيم'), [self.students[0].id])
+        self.assertEqual(
+            set(self.autocomplete(q='احمد')), {self.teacher.id, self.students[1].id}
+        )
+        self.assertEqual(self.autocomplete(q='احمد', role='student'), [self.students[1].id])
+    
+    def test_email_and_name_changes(self):
+        self.assertEqual(self.autocomplete(q='student1@'), [self.students[1].id])
+        
+        student = self.students[2]
+        student.first_name = 'مريم'
+        student.save(update_fields=['first_name'])
+        self.assertEqual(self.autocomplete(q='فاطمه'), [])
+        self.assertEqual(self.autocomplete(q='مريم'), [student.id])
+
+
+def render_evaluating_context(request, template_name, context=None):
+    """بديل render يقيّم الـ querysets في السياق (كما يفعل القالب) دون قوالب"""
+    for value in (context or {}).values():
+        if isinstance(value, QuerySet):
+            list(value)
+    return HttpResponse()
+
+
+class DashboardQueryPlanTests(TestCase):
+    """
+    خطط تنفيذ استعلامات لوحات التحكم عند حجم بيانات مزروع:
+    لا مسح كامل للجداول ولا فرز إلا حيث يكون الفرز لا مفر منه
+    """
+    
+    TEACHERS = 40
+    STUDENTS = 1500
+    COURSES = 120
+    COURSES_PER_STUDENT = 5
+    FILES = 4000
+    NOTIFICATIONS = 30
+    
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(14)
+        department = Department.objects.create(name='قسم')
+        specialization = Specialization.objects.create(name='تخصص', department=department)
+        
+        cls.teachers = User.objects.bulk_create([
+            User(username=f'teacher{i}', role=User.Role.TEACHER, academic_id=f'T{i}')
+            for i in range(cls.TEACHERS)
+        ])
+        cls.students = User.objects.bulk_create([
+            User(username=f'student{i}', role=User.Role.STUDENT, academic_id=f'S{i}')
+            for i in range(cls.STUDENTS)
+        ])
+        cls.admin_user = User.objects.create(username='root', role=User.Role.ADMIN)
+        courses = Course.objects.bulk_create([
+            Course(
+                name=f'مقرر {i}', code=f'C{i}', specialization=specialization,
+                level=i % 4 + 1, teacher=cls.teachers[i % cls.TEACHERS],
+                is_active=i % 10 != 0
+            )
+            for i in range(cls.COURSES)
+        ])
+        Enrollment.objects.bulk_create([
+            Enrollment(student=student, course=course, is_active=rng.random() > 0.1)
+            for student in cls.students
+            for course in rng.sample(courses, cls.COURSES_PER_STUDENT)
+        ])
+        LectureFile.objects.bulk_create([
+            LectureFile(
+                title=f'ملف {i}', file=f'lectures/{i}.pdf',
+                course=rng.choice(courses), uploaded_by=rng.choice(cls.teachers),
+                is_active=rng.random() > 0.1
+            )
+            for i in range(cls.FILES)
+        ])
+        for i in range(cls.NOTIFICATIONS):
+            course = rng.choice(courses)
+            Notification.objects.create(
+                title=f'إشعار {i}', content='-', sender=course.teacher, course=course
+            )
+        
+        refresh_platform_stats()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    
+    def plan_problems(self, plan):
+        """الجداول الممسوحة بالكامل والفرز في خطة EXPLAIN"""
+        if connection.vendor == 'postgresql':
+            scans = re.findall(r'Seq Scan on (\w+)', plan)
+            sorts = re.findall(r'\bSort\b', plan)
+        else:
+            scans = re.findall(r'\bSCAN (\w+)$', plan, re.MULTILINE)
+            sorts = re.findall(r'USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY', plan)
+        tables = set(connection.introspection.table_names())
+        return [name for name in scans if name in tables], sorts
+    
+    def assertIndexedPlans(self, user, allow_sort=()):
+        """
+        فتح لوحة تحكم المستخدم وتشغيل EXPLAIN على كل استعلام SELECT نفذته
+        allow_sort: الجداول الرئيسية التي يُسمح لاستعلاماتها بالفرز
+        """
+        self.client.force_login(user)
+        with patch('academy.views.render', render_evaluating_context):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        
+        selects = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        self.assertTrue(selects)
+        for sql in selects:
+            with self.subTest(sql=sql):
+                with connection.cursor() as cursor:
+                    cursor.execute(connection.ops.explain_query_prefix() + ' ' + sql)
+                    plan = '\n'.join(' '.join(map(str, row)) for row in cursor.fetchall())
+                
+                scans, sorts = self.plan_problems(plan)
+                self.assertEqual(scans, [], plan)
+                main_table = re.search(r'FROM "(\w+)"', sql).group(1)
+                if main_table not in allow_sort:
+                    self.assertEqual(sorts, [], plan)
+    
+    def test_student_dashboard(self):
+        # آخر الملفات تُجمع من عدة مقررات، فالفرز (top-N) على ملفات مقررات الطالب فقط
+        self.assertIndexedPlans(self.students[7], allow_sort=('academy_lecturefile',))
+    
+    def test_teacher_dashboard(self):
+        # عدد الطلاب المميزين عبر عدة مقررات يتطلب تجميعاً
+        self.assertIndexedPlans(self.teachers[3], allow_sort=('academy_enrollment',))
+    
+    def test_admin_dashboard(self):
+        self.assertIndexedPlans(self.admin_user)
+    
+    async def test_async_dashboard_matches_sync(self):
+        """النسخة غير المتزامنة تعرض نفس السياق (بالتتابع داخل معاملة الاختبار)"""
+        rendered = []
+        
+        def capture(request, template_name, context=None):
+            rendered.append((template_name, context))
+            return HttpResponse()
+        
+        for user in (self.students[7], self.teachers[3], self.admin_user):
+            for view in (views.dashboard, views.async_dashboard):
+                request = AsyncRequestFactory().get('/dashboard/')
+                request.user = user
+                request.auser = lambda user=user: self.as_coroutine(user)
+                with patch('academy.views.render', capture):
+                    if view is views.async_dashboard:
+                        await view(request)
+                    else:
+                        await sync_to_async(view)(request)
+            (sync_template, sync_context), (async_template, async_context) = rendered[-2:]
+            with self.subTest(role=user.role):
+                self.assertEqual(async_template, sync_template)
+                self.assertEqual(async_context, sync_context)
+    
+    @staticmethod
+    async def as_coroutine(value):
+        return value
+
+
+@override_settings(QUERY_BUDGET_MODE='raise')
+class QueryBudgetTests(TestCase):
+    """Views المعلن لها @query_budget لا تتجاوز حدها، واكتشاف N+1"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role=User.Role.TEACHER)
+        cls.admin_user = User.objects.create(username='root', role=User.Role.ADMIN)
+        department = Department.objects.create(name='قسم')
+        specialization = Specialization.objects.create(name='تخصص', department=department)
+        cls.students = User.objects.bulk_create([
+            User(username=f'student{i}', academic_id=f'S{i}') for i in range(5)
+        ])
+        courses = [
+            Course.objects.create(
+                name=f'برمجة {i}', code=f'C{i}', specialization=specialization,
+                level=1, teacher=cls.teacher
+            )
+            for i in range(5)
+        ]
+        Enrollment.objects.bulk_create([
+            Enrollment(student=student, course=course)
+            for student in cls.students for course in courses
+        ])
+        for course in courses:
+            Notification.objects.create(
+                title='إشعار', content='-', sender=cls.teacher, course=course
+            )
+        refresh_platform_stats()
+    
+    def get(self, user, url, **params):
+        self.client.force_login(user)
+        with patch('academy.views.render', render_evaluating_context):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+    
+    def test_views_stay_within_budget(self):
+        student = self.students[0]
+        for user, url, params in [
+            (student, reverse('dashboard'), {}),
+            (student, reverse('search'), {'q': 'برمجة'}),
+            (self.teacher, reverse('dashboard'), {}),
+            (self.teacher, reverse('user_autocomplete'), {'q': 'student'}),
+            (self.admin_user, reverse('dashboard'), {}),
+        ]:
+            with self.subTest(user=user.username, url=url):
+                response = self.get(user, url, **params)
+                self.assertIn('X-Query-Count', response)
+    
+    def test_exceeding_budget_fails(self):
+        def search_one_by_one(queryset, query, limit):
+            # N+1: استعلام منفصل لكل نتيجة
+            return [
+                queryset.model.objects.get(pk=pk)
+                for pk in queryset.values_list('pk', flat=True)[:limit]
+            ]
+        
+        with patch('academy.views.search', search_one_by_one):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.get(self.students[0], reverse('search'), q='برمجة')
+    
+    def test_repeated_queries_are_reported(self):
+        with count_queries() as counter:
+            for enrollment in Enrollment.objects.filter(student=self.students[0]):
+                enrollment.course.teacher
+        self.assertTrue(counter.repeated())
+        
+        with count_queries() as counter:
+            list(Enrollment.objects.filter(student=self.students[0]).select_related('course__teacher'))
+        self.assertEqual(counter.repeated(), [])
+        
+        with self.assertRaises(QueryBudgetExceeded):
+            with assert_query_budget(2):
+                for enrollment in Enrollment.objects.filter(student=self.students[0]):
+                    enrollment.course.teacher
+
+
+class MetricsTests(TestCase):
+    """ترويسة Server-Timing ونقطة /metrics"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create(username='root', role=User.Role.ADMIN)
+        cls.student = User.objects.create(username='student')
+    
+    def setUp(self):
+        registry.reset()
+        # بناء لقطة الشجرة (استعلامان) في الطلب الأول
+        taxonomy.bump_version()
+    
+    def test_server_timing_and_prometheus_output(self):
+        self.client.force_login(self.admin_user)
+        response = self.client.get(reverse('get_specializations'), {'department_id': 1})
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="2 queries"')
+        
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn(
+            'sacm_request_duration_seconds_count{view="get_specializations",role="unknown"} 1', body
+        )
+        self.assertIn('sacm_db_queries_total{view="get_specializations",role="unknown"} 2', body)
+    
+    def test_metrics_requires_admin_or_token(self):
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        
+        with override_settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(response.status_code, 200)
+    
+    def test_histogram_quantiles(self):
+        histogram = Histogram()
+        for value in [0.004] * 50 + [0.2] * 50:
+            histogram.observe(value)
+        self.assertLessEqual(histogram.quantile(0.5), 0.005)
+        self.assertTrue(0.1 < histogram.quantile(0.9) <= 0.25)
+
+
+class SharedMetricsTests(SharedCacheMixin, TestCase):
+    """جمع قياسات كل العمليات عبر التخزين المؤقت المشترك"""
+    
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.addCleanup(registry.reset)
+    
+    def observe(self, worker, total):
+        metrics = RequestMetrics()
+        metrics.queries = 3
+        worker.observe_request('dashboard', 'student', total, metrics)
+    
+    def test_render_includes_other_processes(self):
+        # عملية أخرى تنشر عند أول طلب
+        other = MetricsRegistry()
+        self.observe(other, 0.2)
+        self.observe(registry, 0.004)
+        
+        body = registry.render()
+        self.assertIn('sacm_request_duration_seconds_count{view="dashboard",role="student"} 2', body)
+        self.assertIn('sacm_request_duration_seconds_bucket{view="dashboard",role="student",le="0.005"} 1', body)
+        self.assertIn('sacm_db_queries_total{view="dashboard",role="student"} 6', body)
+        # ما تعرضه أي عملية هو نفسه
+        self.assertEqual(other.render(), body)
+    
+    @override_settings(METRICS_PUBLISH_INTERVAL=3600)
+    def test_publish_interval_and_expired_processes(self):
+        other = MetricsRegistry()
+        self.observe(other, 0.2)
+        self.observe(other, 0.2)
+        self.observe(registry, 0.1)
+        # النشر التالي لـ other بعد الفترة: الطلب الثاني لم ينشر بعد
+        self.assertIn('sacm_request_duration_seconds_count{view="dashboard",role="student"} 2', registry.render())
+        
+        # خانة العملية المتوقفة انتهت صلاحيتها
+        cache.delete(other.slot_key(other.slot))
+        self.assertIn('sacm_request_duration_seconds_count{view="dashboard",role="student"} 1', registry.render())
+        self.assertEqual(cache.get(MetricsRegistry.first_key), registry.slot)
+
+
+class StudentImportTests(TestCase):
+    """الاستيراد الجماعي للطلاب من CSV"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='علوم الحاسب')
+        cls.specialization = Specialization.objects.create(name='هندسة البرمجيات', department=cls.department)
+        cls.teacher = User.objects.create(username='teacher', role=User.Role.TEACHER, academic_id='T1')
+    
+    def run_import(self, text, **kwargs):
+        handle = io.BytesIO(text.encode('utf-8'))
+        return import_students(handle, 'students.csv', workers=1, **kwargs)
+    
+    def test_create_update_and_row_errors(self):
+        report = self.run_import(
+            'academic_id,first_name,last_name,email,department,specialization,level,password\n'
+            '2025001,أحمد,العلي,a@uni.edu,علوم الحاسب,هندسة البرمجيات,1,secret123\n'
+            '2025002,سارة,الحسن,,علوم الحاسب,,2,\n'
+            '2025003,خالد,,,قسم غير موجود,,1,\n'
+            '2025004,مريم,,,,,7,\n'
+            '2025001,مكرر,,,,,1,\n'
+            'T1,مدرس,,,,,,\n',
+            default_password='default123',
+        )
+        self.assertEqual((report.created, report.updated), (2, 0))
+        self.assertEqual([line for line, _, _ in report.errors], [4, 5, 6, 7])
+        
+        student = User.objects.get(academic_id='2025001')
+        self.assertEqual(student.role, User.Role.STUDENT)
+        self.assertEqual(student.username, '2025001')
+        self.assertEqual(student.specialization, self.specialization)
+        self.assertEqual(student.directory_name, 'احمد علي 2025001')
+        self.assertTrue(student.check_password('secret123'))
+        self.assertTrue(User.objects.get(academic_id='2025002').check_password('default123'))
+        
+        # إعادة الاستيراد تحدث البيانات دون تغيير كلمة المرور
+        report = self.run_import('academic_id,first_name,level\n2025001,محمد,3\n')
+        self.assertEqual((report.created, report.updated, report.errors), (0, 1, []))
+        student.refresh_from_db()
+        self.assertEqual((student.first_name, student.level), ('محمد', 3))
+        self.assertTrue(student.check_password('secret123'))
+    
+    def test_invalid_header(self):
+        with self.assertRaises(ImportFileError):
+            self.run_import('name,level\nأحمد,1\n')
+    
+    def test_over_long_cells_are_row_errors(self):
+        report = self.run_import(
+            'academic_id,first_name,phone\n'
+            '2025001,أحمد,0500000000\n'
+            '2025002,سارة,0500000000000000000\n'
+            f"2025003,{'خ' * 151},\n"
+            f"{'9' * 21},مريم,\n",
+            default_password='default123',
+        )
+        self.assertEqual(report.created, 1)
+        self.assertEqual([line for line, _, _ in report.errors], [3, 4, 5])
+        self.assertIn('رقم الهاتف', report.errors[0][2])
+    
+    def test_conflict_after_checks_rejects_only_that_row(self):
+        User.objects.create(username='old', academic_id='2025003', role=User.Role.STUDENT)
+        hash_passwords = imports.hash_passwords
+        
+        def racing_hash(passwords, pool=None):
+            # تسجيل متزامن أخذ اسم المستخدم بعد التحقق وقبل الإدخال
+            User.objects.create(username='2025002', academic_id='X1', role=User.Role.STUDENT)
+            return hash_passwords(passwords, pool)
+        
+        with patch('academy.imports.hash_passwords', racing_hash):
+            report = self.run_import(
+                'academic_id,first_name\n2025001,أحمد\n2025002,سارة\n2025003,خالد\n',
+                default_password='default123',
+            )
+        self.assertEqual((report.created, report.updated), (1, 1))
+        self.assertEqual([(line, academic_id) for line, academic_id, _ in report.errors], [(3, '2025002')])
+        self.assertTrue(User.objects.filter(academic_id='2025001').exists())
+        self.assertEqual(User.objects.get(academic_id='2025003').first_name, 'خالد')
+        self.assertEqual(User.objects.get(username='2025002').academic_id, 'X1')
+
+
+class CohortEnrollmentTests(TestCase):
+    """التسجيل الجماعي للدفعات باستعلام INSERT ... SELECT"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='علوم الحاسب')
+        cls.software = Specialization.objects.create(name='هندسة البرمجيات', department=department)
+        cls.networks = Specialization.objects.create(name='الشبكات', department=department)
+        teacher = User.objects.create(username='teacher', role=User.Role.TEACHER, academic_id='T1')
+        cls.courses = [
+            Course.objects.create(
+                name=f'مقرر {i}', code=f'CS{i}', specialization=cls.software,
+                level=1, semester=Course.Semester.FIRST, teacher=teacher
+            )
+            for i in range(2)
+        ]
+        cls.course_ids = [course.pk for course in cls.courses]
+        cls.students = [
+            User.objects.create(
+                username=f'student{i}', academic_id=f'S{i}', level=level,
+                specialization=specialization, department=department
+            )
+            for i, (specialization, level) in enumerate([
+                (cls.software, 1), (cls.software, 1), (cls.software, 2), (cls.networks, 1),
+            ])
+        ]
+    
+    def test_matching_cohort_in_one_insert(self):
+        Enrollment.objects.create(student=self.students[0], course=self.courses[0], is_active=False)
+        
+        with self.assertNumQueries(5):
+            counts = enroll_cohort(self.course_ids)
+        
+        self.assertEqual(counts, {'enrolled': 3, 'reactivated': 1})
+        self.assertEqual(
+            set(Enrollment.objects.filter(is_active=True).values_list('student_id', 'course_id')),
+            {(student.pk, course) for student in self.students[:2] for course in self.course_ids}
+        )
+        self.assertEqual(
+            list(Course.objects.filter(pk__in=self.course_ids).values_list('students_count', flat=True)),
+            [2, 2]
+        )
+        # التكرار لا ينشئ تسجيلات جديدة
+        self.assertEqual(enroll_cohort(self.course_ids), {'enrolled': 0, 'reactivated': 0})
+    
+    def test_explicit_cohort_and_deactivation(self):
+        counts = enroll_cohort(self.course_ids[:1], {'specialization_id': self.software.pk})
+        self.assertEqual(counts['enrolled'], 3)
+        
+        self.assertEqual(
+            deactivate_cohort(self.course_ids[:1], {'level': 2}), {'deactivated': 1}
+        )
+        self.courses[0].refresh_from_db()
+        self.assertEqual(self.courses[0].students_count, 2)
+
+
+class SessionEngineTests(SharedCacheMixin, TestCase):
+    """محرك الجلسات: القراءة من L1/L2 والكتابة عند التغيير فقط"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role=User.Role.TEACHER, academic_id='T1')
+    
+    def session_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('user_autocomplete'), {'q': 'x', **params})
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries if 'django_session' in query['sql']]
+    
+    def test_reads_from_cache_and_skips_unchanged_writes(self):
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.session_queries(), [])
+        
+        # بعد انتهاء L1 تقرأ الجلسة من L2 دون قاعدة البيانات
+        local_sessions.clear()
+        self.assertEqual(self.session_queries(), [])
+    
+    def test_deleted_session_is_invalid_in_other_workers(self):
+        self.client.force_login(self.teacher)
+        key = self.client.session.session_key
+        self.assertTrue(SessionStore(key).exists(key))
+        
+        SessionStore(key).delete()
+        # العملية الأخرى (L1 منتهٍ) لا تجد الجلسة في L2 المشترك
+        local_sessions.clear()
+        with override_settings(SESSION_CACHE_ALIAS='other_worker'):
+            self.assertEqual(SessionStore(key).load(), {})
+    
+    def test_process_local_cache_disables_l2(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.client.force_login(self.teacher)
+            local_sessions.clear()
+            self.assertEqual(len(self.session_queries()), 1)
+    
+    def test_lazy_expiry_refresh(self):
+        self.client.force_login(self.teacher)
+        key = self.client.session.session_key
+        
+        with override_settings(SESSION_REFRESH_AFTER=0):
+            self.assertEqual(len(self.session_queries()), 1)
+        self.assertGreater(SessionStore(key).get_expiry_age(), 0)
+    
+    def test_clear_expired_in_batches(self):
+        expired = timezone.now() - timedelta(days=1)
+        Session.objects.bulk_create(
+            Session(session_key=f'expired{i}', session_data='', expire_date=expired) for i in range(5)
+        )
+        with self.assertNumQueries(6):
+            self.assertEqual(SessionStore.clear_expired(batch_size=2), 5)
+        self.assertFalse(Session.objects.filter(expire_date__lt=timezone.now()).exists())
+
+
+@override_settings(METRICS_TOKEN='')
+class CachedAuthenticationTests(SharedCacheMixin, TestCase):
+    """المصادقة من لقطة المستخدم المخزنة مع الإبطال عند الحفظ"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(
+            username='admin', password='old-pass', role=User.Role.ADMIN, academic_id='A1'
+        )
+    
+    def setUp(self):
+        self.assertTrue(self.client.login(username='admin', password='old-pass'))
+    
+    def get_metrics(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('metrics'))
+        return response.status_code, len(queries)
+    
+    def test_requests_do_not_read_users_table(self):
+        self.assertEqual(self.get_metrics(), (200, 0))
+        self.assertEqual(self.get_metrics(), (200, 0))
+    
+    def test_role_change_applies_immediately(self):
+        self.admin_user.role = User.Role.TEACHER
+        self.admin_user.save()
+        self.assertEqual(self.get_metrics(), (403, 1))
+    
+    def test_password_change_and_deactivation_log_out(self):
+        user = User.objects.get(pk=self.admin_user.pk)
+        user.set_password('new-pass')
+        user.save()
+        self.assertEqual(self.get_metrics()[0], 403)
+        
+        self.assertTrue(self.client.login(username='admin', password='new-pass'))
+        self.assertEqual(self.get_metrics()[0], 200)
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        invalidate_users([user.pk])
+        self.assertEqual(self.get_metrics()[0], 403)
+    
+    def test_deferred_fields_load_in_one_query(self):
+        self.client.get(reverse('metrics'))
+        user = CachedModelBackend().get_user(self.admin_user.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual((user.academic_id, user.email), ('A1', ''))
+    
+    def test_password_change_logs_out_other_workers(self):
+        # العملية الأخرى خزنت لقطتها قبل تغيير كلمة المرور
+        with override_settings(AUTH_USER_CACHE_ALIAS='other_worker'):
+            self.assertEqual(self.get_metrics(), (200, 0))
+        
+        user = User.objects.get(pk=self.admin_user.pk)
+        user.set_password('new-pass')
+        user.save()
+        
+        with override_settings(AUTH_USER_CACHE_ALIAS='other_worker'):
+            self.assertEqual(self.get_metrics()[0], 403)
+    
+    def test_process_local_cache_falls_back_to_database(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual(self.get_metrics(), (200, 1))
+            User.objects.filter(pk=self.admin_user.pk).update(is_active=False)
+            self.assertEqual(self.get_metrics()[0], 403)
+
+
+class CapabilityTests(TestCase):
+    """صلاحيات الأدوار من المصفوفة في الذاكرة مع إعادة التحميل عند التعديل"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role=User.Role.TEACHER, academic_id='T1')
+        cls.student = User.objects.create(username='student', role=User.Role.STUDENT, academic_id='S1')
+        cls.admin_user = User.objects.create_user(
+            username='admin', password='password', role=User.Role.ADMIN, academic_id='A1',
+            is_staff=True, is_superuser=True
+        )
+    
+    def setUp(self):
+        # التراجع عن معاملة الاختبار لا يمر بالإشارات
+        capabilities.bump_version()
+        self.addCleanup(capabilities.bump_version)
+    
+    def test_checks_do_not_query(self):
+        capabilities.get_matrix()
+        with self.assertNumQueries(0):
+            self.assertTrue(capabilities.has_capability(self.teacher, 'can_upload_files', 'can_use_ai'))
+            self.assertFalse(capabilities.has_capability(self.student, 'can_upload_files'))
+            self.assertTrue(capabilities.has_capability(self.student, 'can_use_ai'))
+        
+        matrix = capabilities.get_matrix()
+        with self.assertRaises(AttributeError):
+            matrix.masks = {}
+        with self.assertRaises(TypeError):
+            matrix.masks[User.Role.STUDENT] = 0
+    
+    def test_list_editable_save_reloads_matrix(self):
+        permission = RolePermission.objects.create(
+            role=User.Role.TEACHER, can_upload_files=True, can_use_ai=True
+        )
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.client.post(reverse('upload_init')).status_code, 400)
+        
+        self.client.force_login(self.admin_user)
+        response = self.client.post(reverse('admin:academy_rolepermission_changelist'), {
+            'form-TOTAL_FORMS': 1, 'form-INITIAL_FORMS': 1,
+            'form-0-id': permission.pk, 'form-0-can_use_ai': 'on', '_save': 'Save',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(capabilities.has_capability(self.teacher, 'can_upload_files'))
+        
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.client.post(reverse('upload_init')).status_code, 403)
+    
+    def other_process_matrix(self):
+        """مصفوفة عملية أخرى (لا تستقبل expire من الحفظ في هذه العملية)"""
+        return VersionedSnapshot(
+            capabilities.VERSION_KEY, capabilities.CapabilityMatrix.load, 'CAPABILITY_CHECK_INTERVAL'
+        )
+    
+    def test_other_processes_notice_changes(self):
+        other = self.other_process_matrix()
+        upload = capabilities.BITS['can_upload_files']
+        self.assertFalse(other.get().allows(User.Role.STUDENT, upload))
+        
+        RolePermission.objects.create(role=User.Role.STUDENT, can_upload_files=True)
+        self.assertTrue(capabilities.has_capability(self.student, 'can_upload_files'))
+        # حتى انتهاء الفترة تبقى مصفوفة العملية الأخرى كما هي
+        self.assertFalse(other.get().allows(User.Role.STUDENT, upload))
+        with override_settings(CAPABILITY_CHECK_INTERVAL=0):
+            self.assertTrue(other.get().allows(User.Role.STUDENT, upload))
+    
+    def test_unknown_capability(self):
+        from django.core.exceptions import ImproperlyConfigured
+        from .decorators import capability_required
+        
+        with self.assertRaises(ImproperlyConfigured):
+            capability_required('can_fly')
+
+
+class SharedCacheCapabilityTests(SharedCacheMixin, CapabilityTests):
+    """نفس الاختبارات مع إصدار مشترك في التخزين المؤقت (Redis في الإنتاج)"""
+    
+    def test_unchanged_version_is_not_reloaded(self):
+        other = self.other_process_matrix()
+        matrix = other.get()
+        with override_settings(CAPABILITY_CHECK_INTERVAL=0), self.assertNumQueries(0):
+            self.assertIs(other.get(), matrix)
+
+
+class ConcurrentDashboardQueryTests(SimpleTestCase):
+    """تنفيذ استعلامات اللوحة المستقلة بالتوازي"""
+    
+    def slow_query(self, value):
+        def query():
+            time.sleep(0.2)
+            return value, threading.get_ident()
+        return query
+    
+    async def test_latency_is_slowest_query_not_sum(self):
+        queries = {name: self.slow_query(name) for name in ('a', 'b', 'c')}
+        start = time.perf_counter()
+        results = await aevaluate(queries)
+        self.assertLess(time.perf_counter() - start, 0.4)
+        self.assertEqual([value for value, _ in results.values()], ['a', 'b', 'c'])
+        self.assertEqual(len({thread for _, thread in results.values()}), 3)
+    
+    @override_settings(DASHBOARD_QUERY_WORKERS=1)
+    async def test_sequential_without_workers(self):
+        results = await aevaluate({name: self.slow_query(name) for name in ('a', 'b')})
+        self.assertEqual(len({thread for _, thread in results.values()}), 1)
+
+
+@override_settings(DASHBOARD_QUERY_WORKERS=3)
+class ThreadedDashboardQueryTests(TransactionTestCase):
+    """استعلامات اللوحة في خيوط المجموعة على قاعدة البيانات فعلاً (دون معاملة الاختبار)"""
+    
+    def setUp(self):
+        self.teacher = User.objects.create(username='teacher', role=User.Role.TEACHER)
+        student = User.objects.create(username='student', role=User.Role.STUDENT)
+        department = Department.objects.create(name='قسم')
+        specialization = Specialization.objects.create(name='تخصص', department=department)
+        course = Course.objects.create(
+            name='مقرر', code='C1', specialization=specialization, level=1, teacher=self.teacher
+        )
+        Enrollment.objects.create(student=student, course=course)
+        LectureFile.objects.bulk_create([
+            LectureFile(title='محاضرة', file='lectures/a.pdf', course=course, uploaded_by=self.teacher)
+        ])
+    
+    def test_queries_run_in_pool_threads_with_request_wrappers(self):
+        threads = []
+        
+        def record(execute, sql, params, many, context):
+            threads.append(threading.get_ident())
+            return execute(sql, params, many, context)
+        
+        queries = teacher_queries(self.teacher)
+        with patch('academy.dashboards.close_old_connections', wraps=close_old_connections) as close, \
+                connection.execute_wrapper(record):
+            results = async_to_sync(aevaluate)(queries)
+        
+        self.assertEqual(results, evaluate(queries))
+        self.assertEqual(results['total_students'], 1)
+        self.assertEqual(results['total_files'], 1)
+        # كل الاستعلامات مرت بغلاف اتصال الطلب وكلها في خيوط المجموعة
+        self.assertEqual(len(threads), len(queries))
+        self.assertNotIn(threading.get_ident(), threads)
+        # قبل كل استعلام وبعده
+        self.assertEqual(close.call_count, 2 * len(queries))
+
+
+class TaxonomyTests(TestCase):
+    """شجرة الأقسام والتخصصات من اللقطة في الذاكرة مع ETag"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.it = Department.objects.create(name='تقنية المعلومات')
+        cls.cs = Department.objects.create(name='علوم الحاسب')
+        cls.networks = Specialization.objects.create(name='شبكات', department=cls.it)
+        cls.software = Specialization.objects.create(name='برمجيات', department=cls.it)
+    
+    def setUp(self):
+        # التراجع عن معاملة الاختبار لا يمر بالإشارات
+        taxonomy.bump_version()
+        self.addCleanup(taxonomy.bump_version)
+    
+    def test_tree_and_department_endpoints(self):
+        response = self.client.get(reverse('taxonomy'))
+        self.assertEqual(response.json(), [
+            {'id': self.it.pk, 'name': 'تقنية المعلومات', 'specializations': [
+                {'id': self.software.pk, 'name': 'برمجيات'},
+                {'id': self.networks.pk, 'name': 'شبكات'},
+            ]},
+            {'id': self.cs.pk, 'name': 'علوم الحاسب', 'specializations': []},
+        ])
+        self.assertIn('max-age=', response['Cache-Control'])
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('get_specializations'), {'department_id': self.it.pk})
+            self.assertEqual([item['name'] for item in response.json()], ['برمجيات', 'شبكات'])
+            for department_id in (self.cs.pk, 'x', ''):
+                response = self.client.get(reverse('get_specializations'), {'department_id': department_id})
+                self.assertEqual(response.json(), [])
+    
+    def test_not_modified_until_tree_changes(self):
+        etag = self.client.get(reverse('taxonomy'))['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        
+        response = self.client.get(reverse('taxonomy'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        
+        self.networks.name = 'الشبكات'
+        self.networks.save()
+        response = self.client.get(reverse('taxonomy'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'الشبكات')
+    
+    def test_other_processes_notice_changes(self):
+        # شجرة عملية أخرى (لا تستقبل expire من الحفظ في هذه العملية)
+        other = VersionedSnapshot(taxonomy.VERSION_KEY, taxonomy.Taxonomy.load, 'TAXONOMY_CHECK_INTERVAL')
+        etag = other.get().tree.etag
+        
+        Department.objects.create(name='نظم المعلومات')
+        self.assertEqual(other.get().tree.etag, etag)
+        with override_settings(TAXONOMY_CHECK_INTERVAL=0):
+            self.assertNotEqual(other.get().tree.etag, etag)
+
+
+class SharedCacheTaxonomyTests(SharedCacheMixin, TaxonomyTests):
+    """نفس الاختبارات مع إصدار مشترك في التخزين المؤقت (Redis في الإنتاج)"""
+
+
+class CounterBufferTests(TestCase):
+    """العدادات المؤجلة: التجميع والكتابة والأمر flush_counters"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        teacher = User.objects.create(username='teacher', role=User.Role.TEACHER)
+        department = Department.objects.create(name='قسم')
+        specialization = Specialization.objects.create(name='تخصص', department=department)
+        cls.course = Course.objects.create(
+            name='مقرر', code='C1', specialization=specialization, level=1, teacher=teacher
+        )
+        cls.lectures = LectureFile.objects.bulk_create([
+            LectureFile(title=f'ملف {i}', file=f'lectures/{i}.pdf', course=cls.course, uploaded_by=teacher)
+            for i in range(2)
+        ])
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+    
+    def download(self, buffer, lecture, times=1):
+        for _ in range(times):
+            buffer.increment(LectureFile, lecture.pk, 'download_count')
+            buffer.increment(Course, self.course.pk, 'downloads_count')
+    
+    def stored(self, lecture):
+        return LectureFile.objects.get(pk=lecture.pk).download_count
+    
+    def test_increments_are_buffered_until_flush(self):
+        buffer = LocalCounterBuffer(flush_interval=3600)
+        self.addCleanup(buffer._take)
+        first, second = self.lectures
+        self.download(buffer, first, times=3)
+        self.download(buffer, second)
+        
+        self.assertEqual(self.stored(first), 0)
+        self.assertEqual(buffer.value(LectureFile.objects.get(pk=first.pk), 'download_count'), 3)
+        
+        # استعلام UPDATE واحد لكل (نموذج، حقل) داخل معاملة
+        with self.assertNumQueries(4):
+            self.assertEqual(buffer.flush(), 3)
+        self.assertEqual((self.stored(first), self.stored(second)), (3, 1))
+        self.assertEqual(Course.objects.get(pk=self.course.pk).downloads_count, 4)
+        self.assertEqual(buffer.pending(LectureFile, first.pk, 'download_count'), 0)
+    
+    def test_failed_flush_is_logged_and_kept(self):
+        buffer = LocalCounterBuffer(flush_interval=0)
+        self.addCleanup(buffer._take)
+        lecture = self.lectures[0]
+        
+        with patch('academy.counters.apply_increments', side_effect=DatabaseError), \
+                self.assertLogs('academy.counters', 'ERROR'):
+            self.download(buffer, lecture)
+        self.assertEqual(buffer.pending(LectureFile, lecture.pk, 'download_count'), 1)
+        
+        buffer.flush()
+        self.assertEqual(self.stored(lecture), 1)
+    
+    def test_background_flusher(self):
+        buffer = LocalCounterBuffer(flush_interval=0.01)
+        self.addCleanup(buffer._take)
+        flushed = threading.Event()
+        
+        with patch.object(buffer, 'flush_safely', side_effect=flushed.set):
+            self.download(buffer, self.lectures[0])
+            self.assertTrue(flushed.wait(5))
+            buffer.flush_interval = 3600
+        # الطلب نفسه لم يكتب شيئاً
+        self.assertEqual(self.stored(self.lectures[0]), 0)
+    
+    def test_other_process_flushes_shared_increments(self):
+        first, second = self.lectures
+        self.download(CacheCounterBuffer(flush_interval=3600), first, times=2)
+        self.download(CacheCounterBuffer(flush_interval=3600), second)
+        
+        # الأمر يعمل في عملية لا تعرف أي مفتاح مسبقاً
+        out = io.StringIO()
+        with override_settings(COUNTER_BUFFER_BACKEND='cache'), \
+                patch('academy.management.commands.flush_counters.counters', CacheCounterBuffer(3600)):
+            call_command('flush_counters', stdout=out)
+        self.assertIn('3', out.getvalue())
+        self.assertEqual((self.stored(first), self.stored(second)), (2, 1))
+        
+        # زيادة بعد الكتابة تسجل المفتاح من جديد، ولا تكرر الزيادات المكتوبة
+        self.download(CacheCounterBuffer(flush_interval=3600), first)
+        self.assertEqual(CacheCounterBuffer(3600).flush(), 2)
+        self.assertEqual(self.stored(first), 3)
+        self.assertEqual(Course.objects.get(pk=self.course.pk).downloads_count, 4)
+    
+    def test_reserved_slot_is_retried_then_skipped(self):
+        buffer = CacheCounterBuffer(flush_interval=3600)
+        lecture = self.lectures[0]
+        cache.add(buffer.slots_key, 0, timeout=None)
+        # رقم خانة محجوز لم يكتب مفتاحه (تسجيل جار في عملية أخرى)
+        cache.incr(buffer.slots_key)
+        buffer.increment(LectureFile, lecture.pk, 'download_count')
+        
+        self.assertEqual(buffer.flush(), 0)
+        with self.assertLogs('academy.counters', 'WARNING'):
+            self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(self.stored(lecture), 1)
+    
+    def test_local_backend_command_warns(self):
+        out = io.StringIO()
+        with override_settings(COUNTER_BUFFER_BACKEND='local'):
+            call_command('flush_counters', stdout=out)
+        self.assertIn("'local'", out.getvalue())
+    
+    def test_full_save_keeps_counters_written_after_load(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media_root):
+            created = LectureFile.objects.create(
+                title='ملف', file=ContentFile(b'%PDF', name='lecture.pdf'),
+                course=self.course, uploaded_by=self.course.teacher
+            )
+            lecture = LectureFile.objects.get(pk=created.pk)
+            course = Course.objects.get(pk=self.course.pk)
+            buffer = LocalCounterBuffer(flush_interval=3600)
+            self.download(buffer, lecture, times=2)
+            buffer.flush()
+            
+            lecture.title = 'معدل'
+            lecture.save()
+            course.name = 'مقرر معدل'
+            course.save()
+        
+        lecture.refresh_from_db()
+        course.refresh_from_db()
+        self.assertEqual((lecture.title, lecture.download_count), ('معدل', 2))
+        self.assertEqual((course.name, course.downloads_count, course.files_count), ('مقرر معدل', 2, 1))
+
+
+class FileBlobTests(MediaRootMixin, TestCase):
+    """النسخ المشتركة حسب المحتوى: إزالة التكرار وعد المراجع والحذف"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role=User.Role.TEACHER)
+        department = Department.objects.create(name='قسم')
+        specialization = Specialization.objects.create(name='تخصص', department=department)
+        cls.course = Course.objects.create(
+            name='مقرر', code='C1', specialization=specialization, level=1, teacher=cls.teacher
+        )
+    
+    def upload(self, content=b'%PDF-1.4 lecture', name='lecture.pdf'):
+        return LectureFile.objects.create(
+            title=name, file=ContentFile(content, name=name), course=self.course, uploaded_by=self.teacher
+        )
+    
+    def ref_count(self, name):
+        return FileBlob.objects.get(name=name).ref_count
+    
+    def test_same_content_is_stored_once(self):
+        first, second = self.upload(), self.upload(name='copy.pdf')
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(second.original_name, 'copy.pdf')
+        self.assertEqual(self.ref_count(first.file.name), 2)
+        self.assertNotEqual(self.upload(b'other').file.name, first.file.name)
+    
+    def test_blob_is_deleted_with_last_reference(self):
+        first, second = self.upload(), self.upload()
+        name, storage = first.file.name, first.file.storage
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.ref_count(name), 1)
+        self.assertTrue(storage.exists(name))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(FileBlob.objects.filter(name=name).exists())
+        self.assertFalse(storage.exists(name))
+    
+    def test_reupload_before_delete_keeps_blob(self):
+        lecture = self.upload()
+        name = lecture.file.name
+        with self.captureOnCommitCallbacks() as callbacks:
+            lecture.delete()
+        self.assertEqual(self.ref_count(name), 0)
+        
+        # نفس المحتوى يرفع قبل تنفيذ الحذف المؤجل
+        self.upload()
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.ref_count(name), 1)
+        self.assertTrue(lecture.file.storage.exists(name))
+    
+    def test_blob_deleted_between_store_and_lock_is_restored(self):
+        name = self.upload().file.name
+        acquire = FileBlob.objects.acquire
+        
+        def racing_acquire(lecture, content):
+            # عملية أخرى حذفت النسخة بعد أن وجدها التخزين
+            lecture.file.storage.delete(lecture.file.name)
+            acquire(lecture, content)
+        
+        with patch.object(FileBlob.objects, 'acquire', racing_acquire):
+            lecture = self.upload()
+        self.assertEqual(lecture.file.name, name)
+        self.assertTrue(lecture.file.storage.exists(name))
+        with lecture.file.storage.open(name) as handle:
+            self.assertEqual(handle.read(), b'%PDF-1.4 lecture')
+    
+    def test_save_with_deferred_file_keeps_ref_count(self):
+        name = self.upload().file.name
+        lecture = LectureFile.objects.defer('file').get(file=name)
+        lecture.title = 'معدل'
+        lecture.save()
+        self.assertEqual(self.ref_count(name), 1)
+        
+        lecture = LectureFile.objects.only('pk', 'title').get(file=name)
+        lecture.file = ContentFile(b'new', name='new.pdf')
+        lecture.save()
+        self.assertFalse(FileBlob.objects.filter(name=name, ref_count__gt=0).exists())
+        self.assertEqual(self.ref_count(lecture.file.name), 1)
+
+
+class PlatformStatsTests(TestCase):
+    """لقطة إحصائيات المنصة: التعليم كقديمة مرة واحدة وإعادة الحساب في الخلفية"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create(username='student', role=User.Role.STUDENT)
+        Department.objects.create(name='قسم')
+    
+    def refresh_jobs(self):
+        return Job.objects.filter(name='academy.tasks.refresh_platform_stats')
+    
+    def run_jobs(self):
+        for queued in self.refresh_jobs().filter(status=Job.Status.QUEUED):
+            jobs.resolve(queued.name)(*queued.args, **queued.kwargs)
+            queued.delete()
+    
+    def test_first_request_computes_snapshot(self):
+        snapshot = get_platform_stats()
+        self.assertEqual((snapshot.total_users, snapshot.total_students, snapshot.total_departments), (1, 1, 1))
+        self.assertIsNotNone(snapshot.refreshed_at)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_platform_stats().pk, snapshot.pk)
+    
+    def test_changes_mark_stale_once_and_queue_refresh(self):
+        refresh_platform_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            Department.objects.create(name='قسم 2')
+        self.assertIsNone(PlatformStats.objects.get().refreshed_at)
+        self.assertEqual(self.refresh_jobs().count(), 1)
+        
+        # اللقطة قديمة مسبقاً: لا كتابة على صفها ولا مهمة جديدة
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(1):
+                PlatformStats.mark_stale()
+            Department.objects.create(name='قسم 3')
+        self.assertEqual(self.refresh_jobs().count(), 1)
+    
+    def test_stale_snapshot_is_served_until_refreshed(self):
+        refresh_platform_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create(username='teacher', role=User.Role.TEACHER)
+        
+        # اللقطة ثم التحقق من وجود مهمة إعادة الحساب
+        with self.assertNumQueries(2):
+            self.assertEqual(get_platform_stats().total_users, 1)
+        self.run_jobs()
+        snapshot = get_platform_stats()
+        self.assertEqual((snapshot.total_users, snapshot.total_teachers), (2, 1))
+        self.assertIsNotNone(snapshot.refreshed_at)
+    
+    def test_expired_snapshot_queues_refresh(self):
+        refresh_platform_stats()
+        PlatformStats.objects.update(refreshed_at=timezone.now() - timedelta(days=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(get_platform_stats().total_users, 1)
+        self.assertEqual(self.refresh_jobs().count(), 1)
+        
+        # الحفظ الجزئي لحقول لا تؤثر في الإحصائيات لا يعلمها كقديمة
+        self.run_jobs()
+        User.objects.get().save(update_fields=['last_login'])
+        self.assertIsNotNone(PlatformStats.objects.get().refreshed_at)
+    
+    @patch('academy.jobs.close_old_connections')
+    def test_failed_refresh_is_queued_again(self, close_old_connections):
+        refresh_platform_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            Department.objects.create(name='قسم 2')
+        queued = self.refresh_jobs().get()
+        self.refresh_jobs().update(attempts=1, max_attempts=1)
+        
+        with patch('academy.stats.compute_platform_stats', side_effect=DatabaseError('timeout')):
+            jobs.execute(queued.pk)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.Status.FAILED)
+        
+        # اللقطة القديمة تعرض وتضاف مهمة جديدة مرة واحدة
+        self.assertIsNone(get_platform_stats().refreshed_at)
+        get_platform_stats()
+        self.assertEqual(self.refresh_jobs().filter(status=Job.Status.QUEUED).count(), 1)
+        self.run_jobs()
+        self.assertEqual(get_platform_stats().total_departments, 2)
+
+
+class ChunkedUploadTests(MediaRootMixin, TestCase):
+    """الرفع المجزأ: البدء والأجزاء والاستكمال والإنهاء"""
+    
+    @classmethod
+    def setUpClass(cls):
+        upload_dir = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, upload_dir, ignore_errors=True)
+        cls.enterClassContext(override_settings(CHUNKED_UPLOAD_DIR=upload_dir, CHUNKED_UPLOAD_CHUNK_SIZE=4))
+        super().setUpClass()
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role=User.Role.TEACHER)
+        department = Department.objects.create(name='قسم')
+        specialization = Specialization.objects.create(name='تخصص', department=department)
+        cls.course = Course.objects.create(
+            name='مقرر', code='C1', specialization=specialization, level=1, teacher=cls.teacher
+        )
+    
+    def setUp(self):
+        # صلاحيات الأدوار الافتراضية (قد تكون مصفوفة العملية من اختبار سابق)
+        capabilities.bump_version()
+        self.addCleanup(capabilities.bump_version)
+        self.client.force_login(self.teacher)
+    
+    def start(self, size=10):
+        response = self.client.post(reverse('upload_init'), {
+            'course': self.course.pk, 'title': 'محاضرة', 'file_type': 'pdf',
+            'filename': 'lecture.pdf', 'size': size,
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+    
+    def put(self, upload_id, offset, data):
+        url = f"{reverse('upload_chunk', args=[upload_id])}?offset={offset}"
+        return self.client.put(url, data, content_type='application/octet-stream')
+    
+    def staged_chunks(self):
+        return list(UploadSession.objects.first().temp_path.parent.glob('*.chunk'))
+    
+    def test_chunks_resume_and_finalize(self):
+        upload_id = self.start()
+        self.assertEqual(self.put(upload_id, 0, b'%PDF').json()['offset'], 4)
+        
+        # إعادة إرسال جزء مكتوب: 409 مع offset الحالي للاستكمال منه
+        response = self.put(upload_id, 0, b'%PDF')
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 4))
+        self.assertEqual(self.client.get(reverse('upload_chunk', args=[upload_id])).json()['offset'], 4)
+        self.assertEqual(self.put(upload_id, 4, b'-1.4' * 2).status_code, 400)
+        
+        self.put(upload_id, 4, b'-1.4')
+        response = self.client.post(reverse('upload_finalize', args=[upload_id]))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.put(upload_id, 8, b' x').json()['offset'], 10)
+        self.assertEqual(self.staged_chunks(), [])
+        
+        session = UploadSession.objects.get()
+        response = self.client.post(reverse('upload_finalize', args=[upload_id]))
+        self.assertEqual(response.status_code, 201)
+        lecture = LectureFile.objects.get(pk=response.json()['id'])
+        with lecture.file.open() as handle:
+            self.assertEqual(handle.read(), b'%PDF-1.4 x')
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(session.temp_path.exists())
+        
+        # طلب إنهاء متزامن حمل الجلسة قبل حذفها لا ينشئ ملفاً ثانياً
+        with self.assertRaises(UploadSession.DoesNotExist):
+            session.finalize()
+        self.assertEqual(LectureFile.objects.count(), 1)
+    
+    def test_interrupted_chunk_is_not_staged(self):
+        self.start()
+        session = UploadSession.objects.get()
+        with self.assertRaises(ValueError):
+            session.receive_chunk(io.BytesIO(b'%P'), 4)
+        self.assertEqual(self.staged_chunks(), [])
+        self.assertEqual(UploadSession.objects.get().received_bytes, 0)
+    
+    def test_missing_or_invalid_content_length(self):
+        url = f"{reverse('upload_chunk', args=[self.start()])}?offset=0"
+        # طلب PUT دون جسم لا يحمل Content-Length
+        self.assertEqual(self.client.put(url).status_code, 400)
+        response = self.client.put(url, b'%PDF', content_type='application/octet-stream', CONTENT_LENGTH='abc')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UploadSession.objects.get().received_bytes, 0)
+    
+    def test_only_lock_conflicts_are_reported_as_busy(self):
+        upload_id = self.start()
+        locked = OperationalError('could not obtain lock')
+        locked.__cause__ = type('LockNotAvailable', (Exception,), {'sqlstate': '55P03'})()
+        
+        with patch.object(UploadSession, 'append_chunk', side_effect=locked):
+            self.assertEqual(self.put(upload_id, 0, b'%PDF').status_code, 409)
+        with patch.object(UploadSession, 'append_chunk', side_effect=OperationalError('disk I/O error')):
+            with self.assertRaises(OperationalError):
+                self.put(upload_id, 0, b'%PDF')
+        self.assertEqual(self.staged_chunks(), [])
+        self.assertEqual(self.put(upload_id, 0, b'%PDF').json()['offset'], 4)
+
+
+class CourseCounterTests(MediaRootMixin, TestCase):
+    """عدادات المقرر المخزنة عند الحفظ والحذف والأمر recount_courses"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role=User.Role.TEACHER)
+        department = Department.objects.create(name='قسم')
+        specialization = Specialization.objects.create(name='تخصص', department=department)
+        cls.course, cls.other = [
+            Course.objects.create(name=code, code=code, specialization=specialization, level=1, teacher=cls.teacher)
+            for code in ('C1', 'C2')
+        ]
+        cls.students = [User.objects.create(username=f'student{i}', role=User.Role.STUDENT) for i in range(3)]
+    
+    def counters(self, course):
+        return Course.objects.values_list('students_count', 'files_count', 'downloads_count').get(pk=course.pk)
+    
+    def test_enrollment_counters(self):
+        first, second, third = [
+            Enrollment.objects.create(student=student, course=self.course) for student in self.students
+        ]
+        self.assertEqual(self.counters(self.course), (3, 0, 0))
+        
+        first.is_active = False
+        first.save()
+        second.course = self.other
+        second.save()
+        self.assertEqual((self.counters(self.course), self.counters(self.other)), ((1, 0, 0), (1, 0, 0)))
+        
+        first.is_active = True
+        first.save()
+        third.delete()
+        Enrollment.objects.filter(pk=second.pk).delete()
+        self.assertEqual((self.counters(self.course), self.counters(self.other)), ((1, 0, 0), (0, 0, 0)))
+    
+    def test_stale_copies_change_counters_once(self):
+        enrollment, _, _ = [
+            Enrollment.objects.create(student=student, course=self.course) for student in self.students
+        ]
+        # نسختان محملتان في طلبين متزامنين
+        first, second = Enrollment.objects.get(pk=enrollment.pk), Enrollment.objects.get(pk=enrollment.pk)
+        first.is_active = second.is_active = False
+        first.save()
+        second.save()
+        self.assertEqual(self.counters(self.course), (2, 0, 0))
+        
+        first.delete()
+        second.delete()
+        self.assertEqual(self.counters(self.course), (2, 0, 0))
+    
+    def test_file_counters_use_stored_downloads(self):
+        lecture = LectureFile.objects.create(
+            title='ملف', file=ContentFile(b'%PDF', name='lecture.pdf'), course=self.course, uploaded_by=self.teacher
+        )
+        buffer = LocalCounterBuffer(flush_interval=3600)
+        for _ in range(3):
+            buffer.increment(LectureFile, lecture.pk, 'download_count')
+            buffer.increment(Course, self.course.pk, 'downloads_count')
+        buffer.flush()
+        self.assertEqual(self.counters(self.course), (0, 1, 3))
+        
+        # النسخة في الذاكرة لا تعرف التحميلات المكتوبة بعد تحميلها
+        lecture.course = self.other
+        lecture.is_active = False
+        lecture.save()
+        self.assertEqual((self.counters(self.course), self.counters(self.other)), ((0, 0, 0), (0, 0, 3)))
+        self.assertEqual(lecture.download_count, 3)
+        
+        # total_files في لوحة المدرس: كل ما رفعه، بما فيه غير النشط
+        self.assertEqual(teacher_queries(self.teacher)['total_files'](), 1)
+        
+        lecture.delete()
+        self.assertEqual(self.counters(self.other), (0, 0, 0))
+    
+    def test_recount_courses_repairs_drift(self):
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        Course.objects.filter(pk=self.course.pk).update(students_count=9, files_count=9, downloads_count=9)
+        
+        out = io.StringIO()
+        call_command('recount_courses', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertEqual((self.counters(self.course), self.counters(self.other)), ((1, 0, 0), (0, 0, 0)))
+        
+        out = io.StringIO()
+        call_command('recount_courses', 'C1', stdout=out)
+        self.assertIn('0', out.getvalue())
+
+
+@jobs.job
+def failing_job(message):
+    raise RuntimeError(message)
+
+
+class JobQueueTests(TestCase):
+    """طابور المهام: الحجز وإعادة المحاولة والمهام المتوقفة"""
+    
+    def setUp(self):
+        # execute يغلق الاتصالات القديمة، وداخل معاملة الاختبار يغلق اتصالها
+        patcher = patch('academy.jobs.close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_claim_by_priority_once(self):
+        low = jobs.enqueue('academy.tasks.evict_ai_cache')
+        high = jobs.enqueue('academy.tasks.evict_ai_cache', priority=5)
+        jobs.enqueue('academy.tasks.evict_ai_cache', run_at=timezone.now() + timedelta(hours=1))
+        
+        self.assertEqual(jobs.claim('worker-1', 10), [high.pk, low.pk])
+        self.assertEqual(jobs.claim('worker-2', 10), [])
+        claimed = Job.objects.get(pk=high.pk)
+        self.assertEqual((claimed.status, claimed.locked_by, claimed.attempts), (Job.Status.RUNNING, 'worker-1', 1))
+    
+    @override_settings(JOB_RETRY_BASE_DELAY=10, JOB_RETRY_MAX_DELAY=25)
+    def test_failed_job_is_retried_with_backoff_then_failed(self):
+        self.assertEqual([jobs.retry_delay(n).seconds for n in (1, 2, 3)], [10, 20, 25])
+        queued = jobs.enqueue(failing_job, 'boom', max_attempts=2)
+        
+        jobs.claim('worker', 1)
+        with self.assertLogs('academy.jobs', 'ERROR'):
+            self.assertFalse(jobs.execute(queued.pk))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.locked_by), (Job.Status.QUEUED, ''))
+        self.assertIn('boom', queued.last_error)
+        self.assertAlmostEqual(
+            (queued.run_at - timezone.now()).total_seconds(), 10, delta=5
+        )
+        # لم يحن موعدها بعد
+        self.assertEqual(jobs.claim('worker', 1), [])
+        
+        Job.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+        self.assertEqual(jobs.claim('worker', 1), [queued.pk])
+        with self.assertLogs('academy.jobs', 'ERROR'):
+            jobs.execute(queued.pk)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Job.Status.FAILED, 2))
+        self.assertIsNotNone(queued.finished_at)
+    
+    def test_requeue_stale_fails_exhausted_jobs(self):
+        long_ago = timezone.now() - timedelta(hours=2)
+        retry, exhausted, running = [jobs.enqueue(failing_job, 'x', max_attempts=3) for _ in range(3)]
+        Job.objects.filter(pk=retry.pk).update(status=Job.Status.RUNNING, locked_at=long_ago, attempts=1)
+        Job.objects.filter(pk=exhausted.pk).update(status=Job.Status.RUNNING, locked_at=long_ago, attempts=3)
+        Job.objects.filter(pk=running.pk).update(status=Job.Status.RUNNING, locked_at=timezone.now(), attempts=3)
+        
+        self.assertEqual(jobs.requeue_stale(3600), 1)
+        statuses = dict(Job.objects.values_list('pk', 'status'))
+        self.assertEqual(
+            [statuses[job.pk] for job in (retry, exhausted, running)],
+            [Job.Status.QUEUED, Job.Status.FAILED, Job.Status.RUNNING],
+        )
+        # المهمة التي استنفدت محاولاتها لا تحجز مجدداً
+        self.assertEqual(jobs.claim('worker', 10), [retry.pk])
+
+
+class LectureDownloadTests(MediaRootMixin, TestCase):
+    """تنزيل الملفات: النطاقات والطلبات الشرطية والتفويض لخادم الويب"""
+    
+    CONTENT = b'0123456789'
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role=User.Role.TEACHER)
+        department = Department.objects.create(name='قسم')
+        specialization = Specialization.objects.create(name='تخصص', department=department)
+        cls.course = Course.objects.create(
+            name='مقرر', code='C1', specialization=specialization, level=1, teacher=cls.teacher
+        )
+    
+    def setUp(self):
+        self.lecture = LectureFile.objects.create(
+            title='ملف', file=ContentFile(self.CONTENT, name='lecture.pdf'),
+            course=self.course, uploaded_by=self.teacher
+        )
+        self.url = reverse('download_lecture_file', args=[self.lecture.pk])
+        self.client.force_login(self.teacher)
+        # التحميلات المسجلة تبقى معلقة في ذاكرة العملية ولا تكتب بعد الاختبار
+        self.addCleanup(counters._take)
+    
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        response.body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response
+    
+    def test_parse_range(self):
+        for header in (None, '', 'bytes=', 'bytes=-', 'items=0-1', 'bytes=0-1,3-4'):
+            self.assertIsNone(parse_range(header, 10), header)
+        cases = {
+            'bytes=2-': (2, 9), 'bytes=2-4': (2, 4), 'bytes=2-100': (2, 9),
+            'bytes=-3': (7, 9), 'bytes=-20': (0, 9), ' bytes=0-0 ': (0, 0),
+        }
+        for header, expected in cases.items():
+            self.assertEqual(parse_range(header, 10), expected, header)
+        for header in ('bytes=10-', 'bytes=5-2', 'bytes=-0'):
+            with self.assertRaises(RangeNotSatisfiable, msg=header):
+                parse_range(header, 10)
+        for header in ('bytes=-3', 'bytes=0-'):
+            with self.assertRaises(RangeNotSatisfiable, msg=header):
+                parse_range(header, 0)
+    
+    def test_full_and_partial_content(self):
+        response = self.get()
+        self.assertEqual((response.status_code, response.body), (200, self.CONTENT))
+        self.assertEqual((response['Content-Length'], response['Accept-Ranges']), ('10', 'bytes'))
+        
+        response = self.get(range='bytes=2-4')
+        self.assertEqual((response.status_code, response.body), (206, b'234'))
+        self.assertEqual(response['Content-Range'], 'bytes 2-4/10')
+        
+        # النطاقات المتعددة غير مدعومة: الملف كاملاً
+        response = self.get(range='bytes=0-1,3-4')
+        self.assertEqual((response.status_code, response.body), (200, self.CONTENT))
+        
+        response = self.get(range='bytes=10-')
+        self.assertEqual((response.status_code, response['Content-Range']), (416, 'bytes */10'))
+    
+    def test_if_range(self):
+        etag = self.get()['ETag']
+        response = self.get(range='bytes=5-', if_range=etag)
+        self.assertEqual((response.status_code, response.body), (206, b'56789'))
+        
+        # الملف تغير منذ النسخة التي لدى العميل: يرسل كاملاً
+        response = self.get(range='bytes=5-', if_range='"other"')
+        self.assertEqual((response.status_code, response.body), (200, self.CONTENT))
+    
+    def test_not_modified(self):
+        response = self.get()
+        self.assertEqual(self.get(if_none_match=response['ETag']).status_code, 304)
+        self.assertEqual(self.get(if_modified_since=response['Last-Modified']).status_code, 304)
+        self.assertEqual(self.get(if_none_match='"other"').status_code, 200)
+    
+    @override_settings(LECTURE_FILE_SENDFILE='nginx', LECTURE_FILE_ACCEL_PREFIX='/protected/')
+    def test_accel_redirect_path_is_quoted(self):
+        # ملف رفع قبل التخزين حسب المحتوى (باسمه الأصلي)
+        name = 'lectures/legacy/محاضرة 1.pdf'
+        path = self.lecture.file.storage.path(name)
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as handle:
+            handle.write(self.CONTENT)
+        LectureFile.objects.filter(pk=self.lecture.pk).update(file=name, content_digest='')
+        
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.body, b'')
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected/lectures/legacy/%D9%85%D8%AD%D8%A7%D8%B6%D8%B1%D8%A9%201.pdf'
+        )
+
+
+WORD_XML = (
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+    '<w:p><w:r><w:t>الفقرة </w:t></w:r><w:r><w:t>الأولى</w:t></w:r></w:p>'
+    '<w:p><w:r><w:t>الفقرة الثانية</w:t></w:r></w:p>'
+    '</w:body></w:document>'
+)
+
+PRESENTATION_XML = (
+    '<p:presentation xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"'
+    ' xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<p:sldIdLst><p:sldId id="256" r:id="rId3"/><p:sldId id="257" r:id="rId2"/></p:sldIdLst>'
+    '</p:presentation>'
+)
+
+PRESENTATION_RELS = (
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId2" Target="slides/slide1.xml"/>'
+    '<Relationship Id="rId3" Target="slides/slide2.xml"/>'
+    '</Relationships>'
+)
+
+SLIDE_XML = (
+    '<p:sld xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"'
+    ' xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"><p:cSld><p:spTree>'
+    '<p:sp><p:txBody><a:p><a:r><a:t>{}</a:t></a:r></a:p><a:p/><a:p><a:r><a:t>{}</a:t></a:r></a:p></p:txBody></p:sp>'
+    '</p:spTree></p:cSld></p:sld>'
+)
+
+
+def office_package(parts):
+    """ملف Office Open XML مصغر (ZIP) من {المسار: XML}"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as package:
+        for name, xml in parts.items():
+            package.writestr(name, xml)
+    return buffer.getvalue()
+
+
+@override_settings(LECTURE_TEXT_CHUNK_CHARS=1000)
+class TextExtractionTests(MediaRootMixin, TestCase):
+    """استخراج النص: ملفات Word و PowerPoint وإعادة الفاشل وحذف النص اليتيم"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role=User.Role.TEACHER)
+        department = Department.objects.create(name='قسم')
+        specialization = Specialization.objects.create(name='تخصص', department=department)
+        cls.course = Course.objects.create(
+            name='مقرر', code='C1', specialization=specialization, level=1, teacher=cls.teacher
+        )
+    
+    def upload(self, content, name, file_type):
+        with self.captureOnCommitCallbacks(execute=True):
+            return LectureFile.objects.create(
+                title=name, file=ContentFile(content, name=name), file_type=file_type,
+                course=self.course, uploaded_by=self.teacher
+            )
+    
+    def extracted(self, lecture):
+        run_extraction(lecture.content_digest)
+        return TextExtraction.objects.get(content_digest=lecture.content_digest)
+    
+    def test_word_paragraphs(self):
+        lecture = self.upload(
+            office_package({'word/document.xml': WORD_XML}), 'lecture.docx', LectureFile.FileType.WORD
+        )
+        self.assertEqual(self.extracted(lecture).status, TextExtraction.Status.DONE)
+        self.assertEqual(list(iter_lecture_text(lecture)), ['الفقرة الأولى', 'الفقرة الثانية'])
+    
+    def test_powerpoint_slides_in_presentation_order(self):
+        lecture = self.upload(office_package({
+            'ppt/presentation.xml': PRESENTATION_XML,
+            'ppt/_rels/presentation.xml.rels': PRESENTATION_RELS,
+            'ppt/slides/slide1.xml': SLIDE_XML.format('ب', 'ج'),
+            'ppt/slides/slide2.xml': SLIDE_XML.format('أ', 'د'),
+        }), 'slides.pptx', LectureFile.FileType.POWERPOINT)
+        self.assertEqual(self.extracted(lecture).status, TextExtraction.Status.DONE)
+        pages = LectureText.objects.filter(content_digest=lecture.content_digest).values_list('page', 'text')
+        self.assertEqual(list(pages), [(1, 'أ\nد'), (2, 'ب\nج')])
+    
+    def test_legacy_binary_format_is_unsupported(self):
+        lecture = self.upload(b'\xd0\xcf\x11\xe0 legacy', 'old.doc', LectureFile.FileType.WORD)
+        self.assertEqual(self.extracted(lecture).status, TextExtraction.Status.UNSUPPORTED)
+    
+    def test_failed_extraction_is_retried_on_reupload(self):
+        lecture = self.upload(b'broken', 'broken.docx', LectureFile.FileType.WORD)
+        digest = lecture.content_digest
+        TextExtraction.objects.filter(content_digest=digest).update(
+            status=TextExtraction.Status.FAILED, error='خطأ'
+        )
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_extraction(lecture)
+            schedule_extraction(lecture)
+        extraction = TextExtraction.objects.get(content_digest=digest)
+        self.assertEqual(extraction.status, TextExtraction.Status.PENDING)
+        self.assertEqual(Job.objects.filter(name='academy.tasks.extract_lecture_text', args=[digest]).count(), 2)
+    
+    def test_text_is_deleted_with_last_file(self):
+        content = office_package({'word/document.xml': WORD_XML})
+        first = self.upload(content, 'first.docx', LectureFile.FileType.WORD)
+        second = self.upload(content, 'second.docx', LectureFile.FileType.WORD)
+        digest = first.content_digest
+        run_extraction(digest)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(LectureText.objects.filter(content_digest=digest).exists())
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(LectureText.objects.filter(content_digest=digest).exists())
+        self.assertFalse(TextExtraction.objects.filter(content_digest=digest).exists())
+    
+    def test_job_for_deleted_file_removes_text(self):
+        lecture = self.upload(office_package({'word/document.xml': WORD_XML}), 'a.docx', LectureFile.FileType.WORD)
+        digest = lecture.content_digest
+        run_extraction(digest)
+        LectureFile.objects.filter(pk=lecture.pk).delete()
+        
+        run_extraction(digest)
+        self.assertFalse(LectureText.objects.filter(content_digest=digest).exists())
+        self.assertFalse(TextExtraction.objects.filter(content_digest=digest).exists())
+
+
+class AIGenerationCacheTests(TestCase):
+    """تخزين التوليد: توليد واحد لكل مفتاح وحذف المدخلات القديمة"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role=User.Role.TEACHER)
+        department = Department.objects.create(name='قسم')
+        specialization = Specialization.objects.create(name='تخصص', department=department)
+        course = Course.objects.create(
+            name='مقرر', code='C1', specialization=specialization, level=1, teacher=cls.teacher
+        )
+        cls.lectures = LectureFile.objects.bulk_create([
+            LectureFile(
+                title=f'محاضرة {digest}', file=f'lectures/{digest}.pdf', content_digest=digest,
+                course=course, uploaded_by=cls.teacher
+            )
+            for digest in ('a' * 64, 'b' * 64, 'c' * 64)
+        ])
+    
+    def setUp(self):
+        cache.clear()
+    
+    @staticmethod
+    def questions(lecture, language):
+        return [
+            {'question_text': f'سؤال {number}', 'options': ['أ', 'ب'], 'correct_answer': 'أ'}
+            for number in range(3)
+        ]
+    
+    def test_concurrent_requests_compute_once(self):
+        calls, stored, results = [], [], []
+        
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            stored.append('نتيجة')
+            return stored[0]
+        
+        def request():
+            results.append(single_flight('key', lambda: stored[0] if stored else None, compute))
+        
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['نتيجة'] * 5)
+    
+    def test_questions_are_generated_once_and_reused(self):
+        lecture = self.lectures[0]
+        generate = Mock(wraps=self.questions)
+        
+        first = get_or_generate_questions(lecture, self.teacher, generate)
+        second = get_or_generate_questions(lecture, self.teacher, generate)
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual([q.question_text for q in second], ['سؤال 0', 'سؤال 1', 'سؤال 2'])
+        self.assertEqual([q.pk for q in second], [q.pk for q in first])
+    
+    def test_empty_question_set_is_an_error(self):
+        with self.assertRaises(ValueError):
+            get_or_generate_questions(self.lectures[0], self.teacher, lambda lecture, language: [])
+        self.assertFalse(AIQuestion.objects.exists())
+        # القفل المشترك حرر فالمحاولة التالية تولد مباشرة
+        questions = get_or_generate_questions(self.lectures[0], self.teacher, self.questions)
+        self.assertEqual(len(questions), 3)
+    
+    def test_racing_question_sets_keep_one(self):
+        lecture = self.lectures[0]
+        winner = []
+        
+        def racing_generate(lecture, language):
+            # طلب آخر أنهى نفس المفتاح بعد انتهاء مهلة القفل
+            winner.extend(get_or_generate_questions(lecture, self.teacher, self.questions))
+            return self.questions(lecture, language)
+        
+        # دون قفل مشترك ولا محلي: قيد التفرد وحده يمنع النتيجة المكررة
+        with patch('academy.ai_cache.cache.add', return_value=True), \
+                patch('academy.ai_cache._local_lock', side_effect=lambda key: threading.Lock()):
+            questions = get_or_generate_questions(lecture, self.teacher, racing_generate)
+        self.assertEqual([q.pk for q in questions], [q.pk for q in winner])
+        self.assertEqual(AIQuestion.objects.filter(lecture_file=lecture).count(), 3)
+    
+    def test_racing_summaries_keep_one(self):
+        lecture = self.lectures[0]
+        
+        def racing_generate(lecture, language):
+            get_or_generate_summary(lecture, self.teacher, lambda lecture, language: 'الأول')
+            return 'الثاني'
+        
+        # دون قفل مشترك ولا محلي: قيد التفرد وحده يمنع النتيجة المكررة
+        with patch('academy.ai_cache.cache.add', return_value=True), \
+                patch('academy.ai_cache._local_lock', side_effect=lambda key: threading.Lock()):
+            summary = get_or_generate_summary(lecture, self.teacher, racing_generate)
+        self.assertEqual(summary.summary_text, 'الأول')
+        self.assertEqual(AISummary.objects.count(), 1)
+    
+    @override_settings(AI_CACHE_MAX_ENTRIES=1)
+    def test_eviction_by_age_then_least_recently_used(self):
+        old, used, recent = self.lectures
+        for lecture in self.lectures:
+            get_or_generate_summary(lecture, self.teacher, lambda lecture, language: 'ملخص')
+            get_or_generate_questions(lecture, self.teacher, self.questions)
+        
+        now = timezone.now()
+        for lecture, last_used in ((old, now - timedelta(days=365)), (used, now - timedelta(days=1)), (recent, now)):
+            AISummary.objects.filter(lecture_file=lecture).update(last_used_at=last_used)
+            AIQuestion.objects.filter(lecture_file=lecture).update(last_used_at=last_used)
+        
+        self.assertEqual(evict_ai_cache(), 2 * (1 + 3))
+        self.assertQuerySetEqual(AISummary.objects.values_list('lecture_file', flat=True), [recent.pk])
+        self.assertEqual(set(AIQuestion.objects.values_list('lecture_file', flat=True)), {recent.pk})
+
+
+class SyntheticDataTests(MediaRootMixin, TestCase):
+    """الأمر generate_synthetic_data بأعداد صغيرة: التكرار بنفس البذرة واتساق العدادات"""
+    
+    options = {
+        'departments': 1, 'specializations': 2, 'teachers': 2, 'students': 5,
+        'courses_per_term': 1, 'enrollments_per_student': 3, 'files_per_course': 2,
+        'notifications': 4, 'batch_size': 3,
+    }
+    
+    def generate(self, **options):
+        call_command('generate_synthetic_data', stdout=io.StringIO(), **{**self.options, **options})
+    
+    def fingerprint(self):
+        """البيانات المولدة دون المفاتيح الأساسية (تختلف بين التشغيلات)"""
+        return {
+            'users': sorted(User.objects.values_list(
+                'username', 'first_name', 'last_name', 'academic_id', 'level', 'specialization__name', 'date_joined'
+            )),
+            'courses': sorted(Course.objects.values_list(
+                'name', 'level', 'semester', 'teacher__username', 'specialization__name'
+            )),
+            'enrollments': sorted(Enrollment.objects.values_list(
+                'student__username', 'course__name', 'course__semester', 'is_active'
+            )),
+            'files': sorted(LectureFile.objects.values_list(
+                'title', 'file', 'file_type', 'course__name', 'course__semester',
+                'download_count', 'is_active', 'uploaded_at'
+            )),
+            'inbox': sorted(InboxEntry.objects.values_list('recipient__username', 'notification__title')),
+        }
+    
+    def generated(self, **options):
+        """بصمة البيانات بعد تشغيل الأمر، ثم التراجع عنها"""
+        with transaction.atomic():
+            self.generate(**options)
+            fingerprint = self.fingerprint()
+            transaction.set_rollback(True)
+        return fingerprint
+    
+    def test_same_seed_generates_same_data(self):
+        first = self.generated()
+        self.assertEqual(len(first['users']), 7)
+        self.assertEqual(self.generated(), first)
+        self.assertNotEqual(self.generated(seed=7), first)
+    
+    def test_blobs_counters_and_inbox_are_consistent(self):
+        self.generate()
+        self.generate(prefix='second')
+        
+        self.assertEqual(
+            FileBlob.objects.aggregate(total=Sum('ref_count'))['total'], LectureFile.objects.count()
+        )
+        for blob in FileBlob.objects.all():
+            self.assertEqual(blob.ref_count, LectureFile.objects.filter(file=blob.name).count())
+        
+        # العدادات المخزنة تطابق الجداول (لا يوجد ما يصحح)
+        self.assertEqual(Course.objects.recount_counters(), 0)
+        
+        expected = sum(
+            Enrollment.objects.filter(course=notification.course, is_active=True).count()
+            for notification in Notification.objects.all()
+        )
+        self.assertGreater(expected, 0)
+        self.assertEqual(InboxEntry.objects.count(), expected)
+
+
+class LoadTestCommandTests(SimpleTestCase):
+    """الأمر loadtest: النسب المئوية والمقارنة بنتائج سابقة"""
+    
+    def result(self, p95_ms, rps):
+        return {'dashboard|student': {'p95_ms': p95_ms, 'rps': rps}}
+    
+    def compare(self, results, baseline, threshold=0.2):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'baseline.json')
+        with open(path, 'w', encoding='utf-8') as handle:
+            json.dump({'results': baseline}, handle)
+        loadtest.Command(stdout=io.StringIO()).compare(results, path, threshold)
+    
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(loadtest.percentile([], 95), 0.0)
+        self.assertEqual(loadtest.percentile(values, 0), 1)
+        self.assertEqual(loadtest.percentile(values, 50), 50)
+        self.assertEqual(loadtest.percentile(values, 95), 95)
+        self.assertEqual(loadtest.percentile(values, 100), 100)
+        self.assertEqual(loadtest.percentile([0.2], 99), 0.2)
+    
+    def test_compare_within_threshold(self):
+        self.compare(self.result(110, 90), self.result(100, 100))
+        # قياس غير موجود في النتائج السابقة لا يقارن
+        self.compare({'login|admin': {'p95_ms': 900, 'rps': 1}}, self.result(100, 100))
+    
+    def test_compare_raises_on_regression(self):
+        with self.assertRaisesMessage(CommandError, 'تراجع في الأداء في 1'):
+            self.compare(self.result(130, 100), self.result(100, 100))
+        with self.assertRaisesMessage(CommandError, 'تراجع في الأداء في 1'):
+            self.compare(self.result(100, 70), self.result(100, 100))
+        with self.assertRaisesMessage(CommandError, 'تراجع في الأداء في 2'):
+            self.compare(self.result(130, 70), self.result(100, 100))
+
+
+class LoadTestRunTests(TransactionTestCase):
+    """تشغيل loadtest قصير بعميل الاختبار (الخيوط ترى البيانات المحفوظة فعلاً)"""
+    
+    def setUp(self):
+        department = Department.objects.create(name='قسم')
+        specialization = Specialization.objects.create(name='تخصص', department=department)
+        student = User(
+            username='student', role=User.Role.STUDENT, department=department, specialization=specialization
+        )
+        student.set_password('password123')
+        student.save()
+        capabilities.bump_version()
+        taxonomy.bump_version()
+    
+    @patch('academy.views.render', render_evaluating_context)
+    def test_short_run_writes_output(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        output = os.path.join(directory, 'results.json')
+        
+        call_command('loadtest', duration=0.3, concurrency=1, output=output, stdout=io.StringIO())
+        with open(output, encoding='utf-8') as handle:
+            report = json.load(handle)
+        
+        self.assertEqual((report['mode'], report['concurrency']), ('test-client', 1))
+        results = report['results']
+        self.assertTrue(results)
+        for key, result in results.items():
+            self.assertEqual(key, f"{result['url_name']}|student")
+            self.assertGreater(result['requests'], 0)
+            self.assertEqual(result['errors'], 0, key)
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+            self.assertLessEqual(result['p95_ms'], result['p99_ms'])
@@ -3,6 +3,7 @@
 =========================
 """
 
+from django.conf import settings
 from django.urls import path
 from . import views
 
@@ -16,7 +17,27 @@ urlpatterns = [
     path('register/', views.user_register, name='register'),
     
     # لوحة التحكم
-    path('dashboard/', views.dashboard, name='dashboard'),
+    path(
+        'dashboard/',
+        views.async_dashboard if settings.ASYNC_DASHBOARDS else views.dashboard,
+        name='dashboard'
+    ),
+    
+    # ملفات المحاضرات
+    path('files/<int:file_id>/download/', views.download_lecture_file, name='download_lecture_file'),
+    
+    # الرفع المجزأ
+    path('api/uploads/', views.upload_init, name='upload_init'),
+    path('api/uploads/<uuid:upload_id>/', views.upload_chunk, name='upload_chunk'),
+    path('api/uploads/<uuid:upload_id>/finalize/', views.upload_finalize, name='upload_finalize'),
+    
+    # البحث
+    path('api/search/', views.search_api, name='search'),
+    path('api/users/autocomplete/', views.user_autocomplete, name='user_autocomplete'),
+    
+    # الإشعارات
+    path('notifications/<int:notification_id>/read/', views.mark_notification_read, name='mark_notification_read'),
+    path('notifications/read-all/', views.mark_all_notifications_read, name='mark_all_notifications_read'),
     
     # الملف الشخصي
     path('profile/', views.profile, name='profile'),
@@ -25,4 +46,8 @@ urlpatterns = [
     
     # API
     path('api/specializations/', views.get_specializations, name='get_specializations'),
+    path('api/taxonomy/', views.taxonomy_api, name='taxonomy'),
+    
+    # قياسات الأداء
+    path('metrics', views.metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -3,24 +3,42 @@ Views لنظام S-ACM
 =================
 """
 
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate, update_session_auth_hash
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Count, Q
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+from django.conf import settings
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.db import transaction, OperationalError
+from django.db.models import Exists, OuterRef
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST, require_safe, require_http_methods
 
 from .models import (
-    User, Department, Specialization, Course,
-    Enrollment, LectureFile, Notification
+    User, Course,
+    Enrollment, LectureFile, InboxEntry, UploadSession
  )
 from .forms import (
     LoginForm, StudentRegistrationForm, TeacherRegistrationForm,
-    UserProfileForm, ChangePasswordForm
+    UserProfileForm, ChangePasswordForm, ChunkedUploadInitForm
 )
+from .stats import get_platform_stats
+from .taxonomy import get_taxonomy
+from .dashboards import (
+    evaluate, aevaluate, student_queries, teacher_queries, admin_queries
+)
+from .downloads import lecture_file_response, is_first_request
+from .search import search
+from .directory import directory_search
+from .metrics import registry as metrics_registry
 from .decorators import (
     student_required, teacher_required, admin_required,
-    teacher_or_admin_required, role_required
+    teacher_or_admin_required, role_required, query_budget,
+    upload_files_required
 )
 
 
@@ -115,103 +133,254 @@ def dashboard(request):
 
 @login_required
 @student_required
+@query_budget(6)
 def student_dashboard(request):
     """لوحة تحكم الطالب"""
-    user = request.user
-    
-    # المقررات المسجل بها
-    enrollments = Enrollment.objects.filter(
-        student=user, is_active=True
-    ).select_related('course', 'course__teacher')
-    
-    # الإشعارات غير المقروءة
-    notifications = Notification.objects.filter(
-        Q(recipient=user) | Q(course__enrollments__student=user),
-        is_read=False
-    ).distinct()[:5]
-    
-    # آخر الملفات المرفوعة في مقرراته
-    recent_files = LectureFile.objects.filter(
-        course__enrollments__student=user,
-        is_active=True
-    ).order_by('-uploaded_at')[:5]
-    
-    context = {
-        'enrollments': enrollments,
-        'notifications': notifications,
-        'notifications_count': notifications.count(),
-        'recent_files': recent_files,
-    }
-    
+    context = evaluate(student_queries(request.user))
     return render(request, 'academy/student/dashboard.html', context)
 
 
 @login_required
 @teacher_required
+@query_budget(5)
 def teacher_dashboard(request):
     """لوحة تحكم المدرس"""
-    user = request.user
+    context = evaluate(teacher_queries(request.user))
+    return render(request, 'academy/teacher/dashboard.html', context)
+
+
+@login_required
+@admin_required
+@query_budget(5)
+def admin_dashboard(request):
+    """لوحة تحكم المسؤول"""
+    # إحصائيات عامة (لقطة مخزنة يعاد حسابها عند الحاجة فقط)
+    stats = get_platform_stats()
+    context = {'stats': stats, **evaluate(admin_queries(stats))}
+    return render(request, 'academy/admin/dashboard.html', context)
+
+
+@login_required
+async def async_dashboard(request):
+    """
+    لوحة التحكم تحت ASGI: نفس لوحات الأدوار مع تنفيذ استعلاماتها المستقلة
+    بالتوازي (academy.dashboards). تستخدم بدلاً من dashboard عند ASYNC_DASHBOARDS
+    """
+    user = await request.auser()
     
-    # المقررات التي يدرسها
-    courses = Course.objects.filter(
-        teacher=user, is_active=True
-    ).annotate(
-        students_count=Count('enrollments'),
-        files_count=Count('lecture_files')
+    if user.is_student:
+        view, template = student_dashboard, 'academy/student/dashboard.html'
+        context = await aevaluate(student_queries(user))
+    elif user.is_teacher:
+        view, template = teacher_dashboard, 'academy/teacher/dashboard.html'
+        context = await aevaluate(teacher_queries(user))
+    elif user.is_admin_user:
+        view, template = admin_dashboard, 'academy/admin/dashboard.html'
+        stats = await sync_to_async(get_platform_stats)()
+        context = {'stats': stats, **await aevaluate(admin_queries(stats))}
+    else:
+        view, template, context = None, 'academy/dashboard.html', {}
+    
+    request.query_budget = getattr(view, 'query_budget', None)
+    # القالب قد يصل إلى request.user والجلسة (استعلامات متزامنة)
+    return await sync_to_async(render)(request, template, context)
+
+
+# =============================================================================
+# ملفات المحاضرات
+# =============================================================================
+
+@login_required
+@query_budget(4)
+@require_safe
+def download_lecture_file(request, file_id):
+    """تنزيل ملف محاضرة (للطلاب المسجلين في المقرر، مدرس المقرر، والمسؤولين)"""
+    lecture = get_object_or_404(
+        LectureFile.objects.select_related('course'), pk=file_id
     )
     
-    # إحصائيات
-    total_students = Enrollment.objects.filter(
-        course__teacher=user, is_active=True
-    ).values('student').distinct().count()
+    if not lecture.is_accessible_by(request.user):
+        raise PermissionDenied
     
-    total_files = LectureFile.objects.filter(
-        uploaded_by=user
-    ).count()
+    response = lecture_file_response(request, lecture)
     
-    # آخر الملفات المرفوعة
-    recent_files = LectureFile.objects.filter(
-        uploaded_by=user
-    ).order_by('-uploaded_at')[:5]
+    if response.status_code in (200, 206) and is_first_request(request):
+        lecture.register_download()
     
-    context = {
-        'courses': courses,
-        'total_students': total_students,
-        'total_files': total_files,
-        'recent_files': recent_files,
+    return response
+
+
+# =============================================================================
+# الرفع المجزأ القابل للاستكمال (API)
+# =============================================================================
+
+# PostgreSQL: فشل select_for_update(nowait=True) لأن الصف مقفل
+LOCK_NOT_AVAILABLE = '55P03'
+
+
+def lock_not_available(error):
+    """هل الخطأ لأن الصف مقفل (وليس أي خطأ آخر في قاعدة البيانات)"""
+    cause = error.__cause__
+    return (getattr(cause, 'sqlstate', None) or getattr(cause, 'pgcode', None)) == LOCK_NOT_AVAILABLE
+
+
+def upload_status(session):
+    """حالة جلسة الرفع كما يراها العميل"""
+    return {
+        'id': str(session.pk),
+        'offset': session.received_bytes,
+        'size': session.total_size,
+        'chunk_size': settings.CHUNKED_UPLOAD_CHUNK_SIZE,
     }
+
+
+@login_required
+@teacher_or_admin_required
+@upload_files_required
+@require_POST
+def upload_init(request):
+    """بدء جلسة رفع مجزأ"""
+    form = ChunkedUploadInitForm(request.POST, user=request.user)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
     
-    return render(request, 'academy/teacher/dashboard.html', context)
+    data = form.cleaned_data
+    session = UploadSession.objects.create(
+        uploaded_by=request.user,
+        course=data['course'],
+        title=data['title'],
+        description=data['description'] or None,
+        chapter=data['chapter'] or None,
+        file_type=data['file_type'],
+        filename=data['filename'],
+        total_size=data['size'],
+    )
+    return JsonResponse(upload_status(session), status=201)
 
 
 @login_required
-@admin_required
-def admin_dashboard(request):
-    """لوحة تحكم المسؤول"""
+@teacher_or_admin_required
+@upload_files_required
+@require_http_methods(['GET', 'PUT', 'DELETE'])
+def upload_chunk(request, upload_id):
+    """
+    GET: حالة الجلسة (للاستكمال بعد الانقطاع)
+    PUT ?offset=N: إضافة جزء يبدأ عند N (يجب أن يساوي offset الحالي)
+    DELETE: إلغاء الجلسة
+    """
+    sessions = UploadSession.objects.filter(uploaded_by=request.user)
     
-    # إحصائيات عامة
-    stats = {
-        'total_users': User.objects.count(),
-        'total_students': User.objects.filter(role='student').count(),
-        'total_teachers': User.objects.filter(role='teacher').count(),
-        'total_courses': Course.objects.filter(is_active=True).count(),
-        'total_departments': Department.objects.count(),
-        'total_files': LectureFile.objects.count(),
-    }
+    if request.method == 'GET':
+        return JsonResponse(upload_status(get_object_or_404(sessions, pk=upload_id)))
     
-    # آخر المستخدمين المسجلين
-    recent_users = User.objects.order_by('-date_joined')[:5]
+    if request.method == 'DELETE':
+        get_object_or_404(sessions, pk=upload_id).discard()
+        return HttpResponse(status=204)
     
-    # آخر الملفات المرفوعة
-    recent_files = LectureFile.objects.order_by('-uploaded_at')[:5]
+    try:
+        length = int(request.META['CONTENT_LENGTH'])
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'يجب تحديد Content-Length'}, status=400)
+    try:
+        offset = int(request.GET.get('offset', ''))
+    except ValueError:
+        return JsonResponse({'error': 'يجب تحديد offset'}, status=400)
     
-    context = {
-        'stats': stats,
-        'recent_users': recent_users,
-        'recent_files': recent_files,
-    }
+    session = get_object_or_404(sessions, pk=upload_id)
+    if offset != session.received_bytes:
+        return JsonResponse(upload_status(session), status=409)
     
-    return render(request, 'academy/admin/dashboard.html', context)
+    if not 0 < length <= settings.CHUNKED_UPLOAD_CHUNK_SIZE \
+            or offset + length > session.total_size:
+        return JsonResponse({'error': 'حجم الجزء غير صالح'}, status=400)
+    
+    # قراءة الجزء من الشبكة قبل القفل، فالعميل البطيء لا يحجز صف الجلسة
+    try:
+        staged = session.receive_chunk(request, length)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    
+    try:
+        with transaction.atomic():
+            # قفل الجلسة حتى لا يضاف جزآن عند نفس offset
+            session = get_object_or_404(
+                sessions.select_for_update(nowait=True), pk=upload_id
+            )
+            if offset != session.received_bytes:
+                return JsonResponse(upload_status(session), status=409)
+            session.append_chunk(staged, length)
+    except OperationalError as error:
+        if not lock_not_available(error):
+            raise
+        return JsonResponse({'error': 'يتم رفع جزء آخر حالياً'}, status=409)
+    finally:
+        staged.unlink(missing_ok=True)
+    
+    return JsonResponse(upload_status(session))
+
+
+@login_required
+@teacher_or_admin_required
+@upload_files_required
+@require_POST
+def upload_finalize(request, upload_id):
+    """إنهاء الرفع وإنشاء ملف المحاضرة"""
+    session = get_object_or_404(
+        UploadSession.objects.select_related('course'),
+        pk=upload_id, uploaded_by=request.user
+    )
+    
+    if not session.is_complete:
+        return JsonResponse(upload_status(session), status=409)
+    
+    try:
+        lecture = session.finalize()
+    except UploadSession.DoesNotExist:
+        # أنهاها طلب متزامن آخر
+        return JsonResponse({'error': 'تم إنهاء جلسة الرفع مسبقاً'}, status=404)
+    except UploadSession.Incomplete:
+        return JsonResponse(upload_status(session), status=409)
+    except ValidationError as error:
+        session.discard()
+        return JsonResponse({'errors': error.messages}, status=400)
+    
+    return JsonResponse({
+        'id': lecture.pk,
+        'title': lecture.title,
+        'file_size': lecture.file_size,
+    }, status=201)
+
+
+# =============================================================================
+# الإشعارات
+# =============================================================================
+
+def next_url(request, default='dashboard'):
+    """عنوان next من الطلب إن كان داخل الموقع، وإلا default (منع إعادة التوجيه المفتوحة)"""
+    url = request.POST.get('next', '')
+    if url and url_has_allowed_host_and_scheme(
+        url, allowed_hosts={request.get_host()}, require_https=request.is_secure()
+    ):
+        return url
+    return default
+
+
+@login_required
+@query_budget(3)
+@require_POST
+def mark_notification_read(request, notification_id):
+    """تعليم إشعار واحد كمقروء للمستخدم الحالي"""
+    InboxEntry.objects.mark_read(request.user, [notification_id])
+    return redirect(next_url(request))
+
+
+@login_required
+@query_budget(3)
+@require_POST
+def mark_all_notifications_read(request):
+    """تعليم جميع إشعارات المستخدم الحالي كمقروءة"""
+    InboxEntry.objects.mark_read(request.user)
+    return redirect(next_url(request))
 
 
 # =============================================================================
@@ -259,18 +428,110 @@ def change_password(request):
     return render(request, 'academy/change_password.html', {'form': form})
 
 
+# =============================================================================
+# البحث
+# =============================================================================
+
+@login_required
+@student_required
+@query_budget(6)
+@require_safe
+def search_api(request):
+    """البحث في مقررات الطالب المسجل فيها وملفاتها مرتباً حسب الصلة"""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'courses': [], 'files': []})
+    
+    limit = settings.SEARCH_RESULTS_LIMIT
+    courses = Course.objects.filter(
+        Exists(Enrollment.objects.filter(
+            course=OuterRef('pk'), student=request.user, is_active=True
+        )),
+        is_active=True,
+    )
+    files = LectureFile.objects.filter(course__in=courses.values('pk'), is_active=True)
+    
+    return JsonResponse({
+        'courses': [
+            {'id': course.id, 'name': course.name, 'code': course.code}
+            for course in search(courses, query, limit)
+        ],
+        'files': [
+            {
+                'id': lecture.id,
+                'title': lecture.title,
+                'chapter': lecture.chapter,
+                'course_id': lecture.course_id,
+                'file_type': lecture.file_type,
+                'download_url': reverse('download_lecture_file', args=[lecture.id]),
+            }
+            for lecture in search(files, query, limit)
+        ],
+    })
+
+
+@login_required
+@teacher_or_admin_required
+@query_budget(3)
+@require_safe
+def user_autocomplete(request):
+    """الإكمال التلقائي للمستخدمين بالرقم الأكاديمي أو الاسم أو البريد"""
+    term = request.GET.get('q', '').strip()
+    role = request.GET.get('role')
+    if not term or (role and role not in User.Role.values):
+        return JsonResponse({'results': []})
+    
+    users = directory_search(
+        User.objects.filter(is_active=True).only(
+            'pk', 'username', 'first_name', 'last_name', 'academic_id', 'role'
+        ),
+        term, role=role, limit=settings.USER_AUTOCOMPLETE_LIMIT
+    )
+    return JsonResponse({'results': [
+        {
+            'id': user.id,
+            'text': user.get_full_name() or user.username,
+            'academic_id': user.academic_id,
+            'role': user.role,
+        }
+        for user in users
+    ]})
+
+
 # =============================================================================
 # API للتخصصات (AJAX)
 # =============================================================================
 
+@query_budget(2)
+@require_safe
 def get_specializations(request):
-    """جلب التخصصات حسب القسم (AJAX)"""
-    department_id = request.GET.get('department_id')
-    
-    if department_id:
-        specializations = Specialization.objects.filter(
-            department_id=department_id
-        ).values('id', 'name')
-        return JsonResponse(list(specializations), safe=False)
+    """جلب التخصصات حسب القسم (AJAX) من لقطة الشجرة في الذاكرة"""
+    # الاستعلامان لبناء اللقطة فقط (أول طلب في العملية أو بعد تعديل الشجرة)
+    department_id = request.GET.get('department_id', '')
+    return get_taxonomy().specializations(department_id).response(request)
+
+
+@query_budget(2)
+@require_safe
+def taxonomy_api(request):
+    """شجرة الأقسام والتخصصات كاملة مع ETag و Cache-Control"""
+    return get_taxonomy().tree.response(request)
+
+
+# =============================================================================
+# قياسات الأداء (Prometheus)
+# =============================================================================
+
+@require_safe
+def metrics(request):
+    """قياسات أداء كل العمليات بصيغة Prometheus النصية (academy.metrics)"""
+    token = settings.METRICS_TOKEN
+    if token:
+        if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            raise PermissionDenied
+    elif not (request.user.is_authenticated and request.user.is_admin_user):
+        raise PermissionDenied
     
-    return JsonResponse([], safe=False)
\ No newline at end of file
+    return HttpResponse(
+        metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
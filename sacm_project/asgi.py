@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sacm_project.settings')
+# لوحات التحكم غير المتزامنة (استعلامات متوازية) تحت ASGI
+os.environ.setdefault('ASYNC_DASHBOARDS', 'True')
 
 application = get_asgi_application()
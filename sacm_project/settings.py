@@ -26,6 +26,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'academy.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -33,6 +34,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'academy.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'sacm_project.urls'
@@ -67,6 +69,30 @@ DATABASES = {
     }
 }
 
+# التخزين المؤقت المشترك بين العمليات (Redis أو Memcached)
+# الجلسات ولقطات المستخدمين وأرقام إصدار الصلاحيات تتطلبه (academy.sharedcache)،
+# وبدونه (LocMem لكل عملية، للتطوير فقط) تقرأ من قاعدة البيانات مباشرة
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+elif os.getenv('MEMCACHED_LOCATION'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': os.getenv('MEMCACHED_LOCATION').split(','),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -89,11 +115,141 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# تنزيل ملفات المحاضرات (academy.downloads)
+# حجم الدفعة عند إرسال الملف عبر Django
+LECTURE_FILE_CHUNK_SIZE = int(os.getenv('LECTURE_FILE_CHUNK_SIZE', 64 * 1024))
+# تفويض الإرسال لخادم الويب في الإنتاج: '' أو 'nginx' (X-Accel-Redirect) أو 'apache' (X-Sendfile)
+LECTURE_FILE_SENDFILE = os.getenv('LECTURE_FILE_SENDFILE', '')
+# موقع nginx الداخلي الذي يشير إلى MEDIA_ROOT، مثال:
+#   location /protected-media/ { internal; alias /path/to/media/; }
+LECTURE_FILE_ACCEL_PREFIX = os.getenv('LECTURE_FILE_ACCEL_PREFIX', '/protected-media/')
+
+# الرفع المجزأ القابل للاستكمال لملفات المحاضرات
+# مجلد الملفات المؤقتة (يفضل أن يكون على نفس القرص مع MEDIA_ROOT لنقل الملف دون نسخه)
+CHUNKED_UPLOAD_DIR = os.getenv('CHUNKED_UPLOAD_DIR', BASE_DIR / 'uploads_tmp')
+# الحد الأقصى لحجم الجزء الواحد وللملف كاملاً (بالبايت)
+CHUNKED_UPLOAD_CHUNK_SIZE = int(os.getenv('CHUNKED_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+CHUNKED_UPLOAD_MAX_SIZE = int(os.getenv('CHUNKED_UPLOAD_MAX_SIZE', 1024 * 1024 * 1024))
+
+# العدادات المؤجلة (academy.counters) مثل download_count
+# 'local' لتجميعها في ذاكرة العملية، أو 'cache' في الذاكرة المؤقتة المشتركة
+COUNTER_BUFFER_BACKEND = os.getenv('COUNTER_BUFFER_BACKEND', 'local')
+# الفترة بالثواني بين عمليات الكتابة إلى قاعدة البيانات (0 = كتابة فورية)
+COUNTER_BUFFER_FLUSH_INTERVAL = float(os.getenv('COUNTER_BUFFER_FLUSH_INTERVAL', 10))
+
+# طابور المهام الخلفية (academy.jobs والأمر run_worker)
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+# إعادة المحاولة بعد 10 ثم 20 ثم 40 ثانية... حتى ساعة كحد أقصى
+JOB_RETRY_BASE_DELAY = int(os.getenv('JOB_RETRY_BASE_DELAY', 10))
+JOB_RETRY_MAX_DELAY = int(os.getenv('JOB_RETRY_MAX_DELAY', 3600))
+# المهام التي بقيت قيد التنفيذ أطول من ذلك (بالثواني) تعاد إلى الطابور
+JOB_STALE_TIMEOUT = int(os.getenv('JOB_STALE_TIMEOUT', 3600))
+JOB_WORKER_CONCURRENCY = int(os.getenv('JOB_WORKER_CONCURRENCY', 4))
+JOB_WORKER_POOL = os.getenv('JOB_WORKER_POOL', 'thread')
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 2))
+
+# التخزين المؤقت لتوليد الذكاء الاصطناعي (academy.ai_cache)
+# تغيير إصدار التعليمات أو النموذج يعني مفاتيح جديدة (لا يعاد استخدام التوليد القديم)
+AI_MODEL_NAME = os.getenv('GEMINI_MODEL', 'gemini-pro')
+AI_PROMPT_VERSION = os.getenv('AI_PROMPT_VERSION', '1')
+# أقصى مدة بالثواني لتوليد واحد (ينتظرها الطلب المتزامن لنفس المفتاح)
+AI_GENERATION_TIMEOUT = int(os.getenv('AI_GENERATION_TIMEOUT', 120))
+# حذف ما لم يستخدم منذ هذا العدد من الأيام، والحد الأقصى للملخصات ولمجموعات الأسئلة
+AI_CACHE_TTL_DAYS = int(os.getenv('AI_CACHE_TTL_DAYS', 90))
+AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', 5000))
+# تحديث وقت آخر استخدام مرة كل ساعة على الأكثر لكل مدخل
+AI_CACHE_TOUCH_INTERVAL = int(os.getenv('AI_CACHE_TOUCH_INTERVAL', 3600))
+
+# استخراج نصوص المحاضرات (academy.extraction): الحد الأقصى لطول المقطع بالحروف
+LECTURE_TEXT_CHUNK_CHARS = int(os.getenv('LECTURE_TEXT_CHUNK_CHARS', 2000))
+
+# الحد الأقصى لنتائج البحث لكل نوع (academy.search)
+SEARCH_RESULTS_LIMIT = int(os.getenv('SEARCH_RESULTS_LIMIT', 20))
+
+# عدد نتائج الإكمال التلقائي للمستخدمين (academy.directory)
+USER_AUTOCOMPLETE_LIMIT = int(os.getenv('USER_AUTOCOMPLETE_LIMIT', 10))
+
+# حدود الاستعلامات لكل View (academy.middleware.QueryBudgetMiddleware):
+# off أو warn (تحذير في السجل) أو raise (للاختبارات)
+QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'warn' if DEBUG else 'off')
+# تكرار نفس شكل الاستعلام هذا العدد من المرات في طلب واحد يعتبر N+1
+QUERY_BUDGET_REPEAT_THRESHOLD = int(os.getenv('QUERY_BUDGET_REPEAT_THRESHOLD', 3))
+
+# الاستيراد الجماعي للطلاب (academy.imports)
+# مجلد الملفات المرفوعة من لوحة التحكم حتى تعالجها المهمة الخلفية
+STUDENT_IMPORT_DIR = os.getenv('STUDENT_IMPORT_DIR', BASE_DIR / 'imports_tmp')
+STUDENT_IMPORT_BATCH_SIZE = int(os.getenv('STUDENT_IMPORT_BATCH_SIZE', 1000))
+# عدد العمليات لتجزئة كلمات المرور (1 = في نفس العملية)
+STUDENT_IMPORT_HASH_WORKERS = int(os.getenv('STUDENT_IMPORT_HASH_WORKERS', os.cpu_count() or 1))
+
+# التسجيل الجماعي للدفعات (academy.enrollments): الدفعات التي تتجاوز هذا العدد
+# من التسجيلات (طالب × مقرر) تنفذ كمهمة خلفية بدلاً من داخل الطلب
+COHORT_ENROLLMENT_SYNC_LIMIT = int(os.getenv('COHORT_ENROLLMENT_SYNC_LIMIT', 5000))
+
+# الجلسات: L1 داخل العملية ثم التخزين المؤقت ثم قاعدة البيانات (academy.sessions)
+SESSION_ENGINE = 'academy.sessions'
+# مدة بقاء الجلسة في L1 بالثواني (0 لتعطيله) وعدد الجلسات في L1 لكل عملية
+SESSION_L1_TTL = float(os.getenv('SESSION_L1_TTL', 5))
+SESSION_L1_MAX_ENTRIES = int(os.getenv('SESSION_L1_MAX_ENTRIES', 10000))
+# تجديد صلاحية الجلسة بعد مرور هذا الجزء من عمرها (بدلاً من الكتابة في كل طلب)
+SESSION_REFRESH_AFTER = float(os.getenv('SESSION_REFRESH_AFTER', 0.5))
+# عدد الجلسات المنتهية المحذوفة في كل دفعة (clearsessions)
+SESSION_CLEAR_BATCH_SIZE = int(os.getenv('SESSION_CLEAR_BATCH_SIZE', 5000))
+
+# لوحات التحكم غير المتزامنة (academy.dashboards): asgi.py يفعلها افتراضياً،
+# وتحت WSGI تبقى النسخة المتزامنة
+ASYNC_DASHBOARDS = os.getenv('ASYNC_DASHBOARDS') == 'True'
+# عدد الخيوط (ولكل خيط اتصال قاعدة بيانات) لتنفيذ استعلامات اللوحة بالتوازي (1 = بالتتابع)
+DASHBOARD_QUERY_WORKERS = int(os.getenv('DASHBOARD_QUERY_WORKERS', 4))
+
+# شجرة الأقسام والتخصصات في الذاكرة (academy.taxonomy): أقصى مدة بالثواني قبل
+# أن تلاحظ العملية تعديلاً في عملية أخرى، ومدة تخزين الاستجابة في المتصفح والوسطاء
+TAXONOMY_CHECK_INTERVAL = float(os.getenv('TAXONOMY_CHECK_INTERVAL', 5))
+TAXONOMY_MAX_AGE = int(os.getenv('TAXONOMY_MAX_AGE', 300))
+
+# رمز الوصول إلى /metrics لـ Prometheus (Authorization: Bearer ...)
+# بدونه تتاح القياسات للمسؤولين المسجلين فقط
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# نشر قياسات كل عملية في التخزين المؤقت المشترك كل METRICS_PUBLISH_INTERVAL ثانية،
+# وحذف قياسات العملية المتوقفة بعد METRICS_PROCESS_TTL ثانية (academy.metrics)
+METRICS_PUBLISH_INTERVAL = float(os.getenv('METRICS_PUBLISH_INTERVAL', 15))
+METRICS_PROCESS_TTL = int(os.getenv('METRICS_PROCESS_TTL', 86400))
+
+# أنظمة التخزين: ملفات المحاضرات تخزن حسب بصمة المحتوى دون تكرار (academy.storage)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'lectures': {
+        'BACKEND': 'academy.storage.ContentAddressedStorage',
+        'OPTIONS': {'prefix': 'lectures'},
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # ✅ تفعيل نموذج المستخدم المخصص
 AUTH_USER_MODEL = 'academy.User'
 
+# لوحة تحكم المدير: استخدام تقدير PostgreSQL لعدد الصفوف بدلاً من COUNT(*)
+# للجداول التي يتجاوز حجمها هذا الحد
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.getenv('ADMIN_ESTIMATED_COUNT_THRESHOLD', 100000))
+
+# مدة صلاحية لقطة إحصائيات لوحة المسؤول (بالثواني)
+PLATFORM_STATS_MAX_AGE = int(os.getenv('PLATFORM_STATS_MAX_AGE', 300))
+
+# المصادقة من لقطة المستخدم المخزنة مؤقتاً بدلاً من قراءة صفه في كل طلب (academy.backends)
+AUTHENTICATION_BACKENDS = ['academy.backends.CachedModelBackend']
+AUTH_USER_CACHE_ALIAS = os.getenv('AUTH_USER_CACHE_ALIAS', 'default')
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', 3600))
+
+# مصفوفة صلاحيات الأدوار في الذاكرة (academy.capabilities): أقصى مدة بالثواني
+# قبل أن تلاحظ العملية تعديل RolePermission في عملية أخرى
+CAPABILITY_CHECK_INTERVAL = float(os.getenv('CAPABILITY_CHECK_INTERVAL', 5))
+
 # إعدادات تسجيل الدخول
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'